@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Time the six arm segments of a client frame, drawn as polygons against the former rotated surfaces.
+
+    PYTHONPATH=$(pwd) python src/arm_draw_bench.py --frames 500
+"""
+import argparse
+import math
+import random
+import time
+import pygame
+from utils.create_arm import draw_arm_segment
+
+
+def draw_arm_segment_rotated(screen, start_pos, end_pos, width, color):
+    """Previous version: a new surface per call, rotated and blitted."""
+    dx = end_pos[0] - start_pos[0]
+    dy = end_pos[1] - start_pos[1]
+    angle = math.atan2(dy, dx)
+    length = math.sqrt(dx**2 + dy**2)
+    rect_surface = pygame.Surface((length, width), pygame.SRCALPHA)
+    pygame.draw.rect(rect_surface, color, (0, 0, length, width))
+    rotated_surface = pygame.transform.rotate(rect_surface, -math.degrees(angle))
+    rect = rotated_surface.get_rect()
+    rect.center = (start_pos[0] + dx/2, start_pos[1] + dy/2)
+    screen.blit(rotated_surface, rect)
+    pygame.draw.circle(screen, color, (int(start_pos[0]), int(start_pos[1])), 8)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Arm segment drawing benchmark")
+    parser.add_argument("--frames", type=int, default=500, help="random arm poses")
+    parser.add_argument("--repeat", type=int, default=4, help="passes over the poses")
+    args = parser.parse_args()
+
+    pygame.init()
+    screen = pygame.display.set_mode((800, 600))
+    rng = random.Random(0)
+    frames = []
+    for _ in range(args.frames): # random arm poses from both bases
+        segments = []
+        for base, color in (((50, 300), (255, 0, 0)), ((750, 300), (0, 0, 255))):
+            a1, a2 = rng.uniform(-math.pi, math.pi), rng.uniform(-math.pi, math.pi)
+            elbow = (base[0] + 250 * math.cos(a1), base[1] + 250 * math.sin(a1))
+            hand = (elbow[0] + 200 * math.cos(a2), elbow[1] + 200 * math.sin(a2))
+            segments += [(base, elbow, color), (elbow, hand, color), (hand, (hand[0] + 1, hand[1]), color)]
+        frames.append(segments)
+
+    n = args.repeat * len(frames)
+    for name, draw in (("rotated surfaces", draw_arm_segment_rotated), ("polygons", draw_arm_segment)):
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            for segments in frames:
+                screen.fill((255, 255, 255))
+                for start_pos, end_pos, color in segments:
+                    draw(screen, start_pos, end_pos, 5, color)
+        elapsed = time.perf_counter() - start
+        fill = screen.fill # the clear is timed alone to show the arms only
+        start = time.perf_counter()
+        for _ in range(n):
+            fill((255, 255, 255))
+        arms = (elapsed - (time.perf_counter() - start)) / n
+        print(f"{name}: {arms * 1e6:.0f} us per frame for six segments, {n / elapsed:.0f} frames per second with the clear")
+    pygame.quit()
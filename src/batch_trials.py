@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Play many trials with scripted bots, headlessly and without sockets, for a grid of configurations.
+
+    PYTHONPATH=$(pwd) python src/batch_trials.py --trials 200 --set max_force=150000,200000 --set object.mass=500,1000
+    PYTHONPATH=$(pwd) python src/batch_trials.py --trials 1000 --workers 8 --set crush_force_factor=0.3,0.45,0.6
+
+Keys are dotted paths into simulation.json, or into settings.json with a "settings." prefix.
+Each configuration reports its success rate, mean completion time, the share of trials failed
+by the crush rule, the longest time the contact force stayed above the crush threshold and the
+peak contact force.
+"""
+import argparse
+import csv
+import json
+import os
+from utils.batch import run_config
+from utils.bots import POLICIES
+from utils.sweep import config_grid
+
+# Settings
+config_set_path = os.path.join(os.path.dirname(__file__), "../config/settings.json")
+config_sim_path = os.path.join(os.path.dirname(__file__), "../config/simulation.json")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless batch trials with bot players")
+    parser.add_argument("--trials", type=int, default=100, help="trials per configuration")
+    parser.add_argument("--policy", default="squeeze_and_carry", choices=sorted(POLICIES))
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first trial, trial k uses seed + k")
+    parser.add_argument("--timeout", type=float, default=30.0, help="simulated seconds before a trial counts as failed")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=V1,V2",
+                        help="configuration values to try, e.g. crush_force_factor=0.4,0.5 (repeatable)")
+    parser.add_argument("--workers", type=int, default=1, help="processes the trials of a configuration are split over")
+    parser.add_argument("--csv", help="also write the results to this file")
+    args = parser.parse_args()
+
+    with open(config_set_path) as f:
+        settings = json.load(f)
+    with open(config_sim_path) as f:
+        cfg_simulation = json.load(f)
+
+    results = []
+    total_trials, total_elapsed = 0, 0.0
+    for overrides in config_grid(args.set):
+        result = run_config(settings, cfg_simulation, overrides, args.trials, args.policy, seed=args.seed, timeout=args.timeout, workers=args.workers)
+        results.append(dict(overrides, **result))
+        total_trials += result["trials"]
+        total_elapsed += result["elapsed"]
+        name = ", ".join(f"{key}={value}" for key, value in overrides.items()) or "defaults"
+        completion_time = f"{result['completion_time']:.2f} s" if result["completion_time"] is not None else "-"
+        print(f"{name}: success {100 * result['success_rate']:.1f} %, completion {completion_time}, "
+              f"crushed {100 * result['crush_rate']:.1f} %, over the crush threshold {result['overload_time']:.2f} s "
+              f"(max {result['max_overload_time']:.2f} s), peak force {result['peak_force']:.0f} (max {result['max_peak_force']:.0f})")
+    if total_elapsed > 0:
+        print(f"{total_trials} trials in {total_elapsed:.1f} s, {60 * total_trials / total_elapsed:.0f} trials per minute")
+
+    if args.csv and results:
+        with open(args.csv, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(results[0]))
+            writer.writeheader()
+            writer.writerows(results)
@@ -2,17 +2,29 @@
 # -*- coding: utf-8 -*-
 import numpy as np
 import json, os, time
-import socket, struct, threading
+import socket, threading
 from queue import Queue
 import pygame
 from utils.physics import Physics
 from utils.convert_pos import convert_pos
 from utils.thread_utils import client_networking_rec_thread, client_latency_thread
 from utils.create_arm import draw_arm_segment
+from utils.mailbox import LatestValue
+from utils import protocol
+from utils.snapshot_codec import SnapshotDecoder
+from utils.interpolation import SnapshotBuffer
+from utils.prediction import EndEffectorPredictor, two_link_elbow
+from utils.frame_profiler import FrameProfiler
+from utils.assets import AssetManager
+from utils.dirty_render import DirtyRenderer
+from utils.hud_text import CachedText, GlyphAtlas, FieldText
+from utils.haptic_servo import HapticServo
+from utils.contact_model import ContactModel
+from utils.virtual_haply import VirtualHaply, TRAJECTORIES
 
 # Link dimensions
 LINK_WIDTH = 5
-LINK_LENGTH_1 = 200  # This should match your arm segment length
+LINK_LENGTH_1 = 250  # This should match your arm segment length
 LINK_LENGTH_2 = 200
 JOINT_RADIUS = 8
 END_EFFECTOR_WIDTH = 20
@@ -38,12 +50,14 @@ image_warning = os.path.join("assets", "warning.png")
 image_correct = os.path.join("assets", "correct.png")
 image_wrong =os.path.join("assets", "wrong.png")
 
-background = pygame.image.load(image_path)
-asteroid = pygame.image.load(image_asteroid)
-blackhole = pygame.image.load(image_blackhole)
-warning = pygame.image.load(image_warning)
-correct = pygame.image.load(image_correct)
-wrong = pygame.image.load(image_wrong)
+# Images are loaded once, scaled variants are cached
+assets = AssetManager()
+assets.load("background", image_path)
+asteroid = assets.load("asteroid", image_asteroid)
+assets.load("blackhole", image_blackhole)
+assets.load("warning", image_warning)
+assets.load("correct", image_correct)
+assets.load("wrong", image_wrong)
 
 with open(config_set_path, "r") as file:
     settings = json.load(file)
@@ -68,6 +82,8 @@ force_scale = settings["haptic_device"]["force_scale"]
 hardware_scale = settings["haptic_device"]["hardware_scale"]
 vertical_offset = settings["haptic_device"]["vertical_offset"]
 device_connected = False
+servo = None # haptic servo thread, owns the device while it runs
+contact_model = None # local asteroid contact, rendered by the servo
 
 # Lobby arbitration
 server_ip = settings["server"]["ip"]
@@ -75,21 +91,28 @@ port = settings["server"]["port"]
 latency_port = settings["server"]["latency_port"]
 buffer_size = settings["server"]["buffer_size"]
 sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-sock.sendto(b"Hello", (server_ip, port))
+sock.sendto(protocol.pack(protocol.CONTROL, protocol.MSG_HELLO, 0), (server_ip, port))
 
 # Latency socket
 latency_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
 
 # Lobby loop
+physics = None
 running = True
 while running:
     try:
         data, addr = sock.recvfrom(buffer_size)
-        if "Game Start" in data.decode():
+        msg_type = protocol.message_type(data)
+        if msg_type == protocol.MSG_START:
             running = False
-        elif data.decode() in ['1', '2']:
-            player_number = int(data.decode())
+        elif msg_type == protocol.MSG_ASSIGN:
+            player_number = protocol.unpack(protocol.ASSIGN, data)[1]
             if DEBUG: print(f"Received player number: {player_number}")
+            if player_number == 1 and physics is None:
+                # Connect the device while waiting for the other player, the first data is awaited in a thread
+                emulator = cfg_usr["haptic"]["emulator"] # scripted hand trajectory of a virtual device, None for the real one
+                device_port = VirtualHaply(TRAJECTORIES[emulator]()) if emulator else None
+                physics = Physics(hardware_version=2, background_reader=cfg_usr["haptic"]["servo"], port=device_port, wait=False) # the servo reads the newest sample without waiting
 
     except socket.error:
         pass
@@ -101,8 +124,18 @@ G_ff = np.diag([1, 1])
 G_fb = np.diag([1 / max_force * force_scale, 1 / max_force * force_scale])
 # Connect the device
 if player_number == 1:
-    physics = Physics(hardware_version=2)
+    physics.wait_ready()
     device_connected = physics.is_device_connected()
+    if device_connected and cfg_usr["haptic"]["servo"]:
+        render_force = None
+        if cfg_usr["haptic"]["local_contact"]:
+            # Contact force computed at the servo rate from the server's asteroid model
+            contact_model = ContactModel(cfg_usr["haptic"]["blend"], cfg_usr["haptic"]["max_extrapolation"], max_force)
+            def render_force(device_pos, authoritative):
+                hand = convert_pos(screen_size, hardware_scale, vertical_offset, device_pos[4], whole_pixels=False)
+                return contact_model.blend(G_fb @ - contact_model.force(G_ff @ hand), authoritative)
+        # Device read and force write at a high rate, decoupled from the frame rate
+        servo = HapticServo(physics, cfg_usr["haptic"]["rate"], cfg_usr["haptic"]["report_interval"], DEBUG, render_force).start()
     os.environ['SDL_VIDEO_WINDOW_POS'] = "900,50"
     if DEBUG: print(f"Device connected: {device_connected}")
 if player_number == 2:
@@ -119,26 +152,50 @@ pygame.display.set_caption(f'Space Station Saver - Client {player_number}') # wi
 clock = pygame.time.Clock() # initialise clock
 FPS =  cfg_usr["FPS"] # refresh rate
 font = pygame.font.Font('freesansbold.ttf', 12) # printing text font and font size
-text = font.render('Waiting for data', True, (0, 0, 0), (255, 255, 255)) # printing text object
-textRect = text.get_rect()
+hud_text = 'Waiting for data'
+hud = CachedText(font, (0, 0, 0), (255, 255, 255)) # printing text object, rendered again when the text changes
+textRect = hud.render(hud_text).get_rect()
 textRect.topleft = (10, 10) # printing text position with respect to the top-left corner of the window
 TEXT_FONT = pygame.font.Font(font_path, 32)
 title = TEXT_FONT.render(f'SPACE STATION SAVER!', True, (0, 255, 0))
+# Score and countdown are composed from pre-rendered digits, no text is rasterized per frame
+score_field = FieldText(GlyphAtlas(TEXT_FONT, (0, 255, 255)), 'SCORE: {}/10')
+countdown_field = FieldText(GlyphAtlas(TEXT_FONT, (255, 255, 0)), '{}')
+succes_text = TEXT_FONT.render(f'SUCCES!', True, (255, 255, 0))
 
 # Simulation variables
 pm = np.zeros(2)
 player_1_pos = np.array([xc, yc])
 player_2_pos = np.array([xc, yc])
 
-# Queues and threads for networking
-network_queue = Queue()
+# Mailbox, queues and threads for networking
+state_decoder = SnapshotDecoder()
+state_mailbox = LatestValue() # newest state snapshot from the server
+cfg_interpolation = cfg_usr["interpolation"]
+snapshot_buffer = None
+if cfg_interpolation["enabled"]: # positions are drawn slightly in the past, interpolated between snapshots
+    snapshot_buffer = SnapshotBuffer(dt, cfg_interpolation["delay"], cfg_interpolation["max_extrapolation"])
+control_queue = Queue()
 latency_queue = Queue()
-network_thread = threading.Thread(target=client_networking_rec_thread, args=(sock, buffer_size, network_queue, DEBUG), daemon=True)
+network_thread = threading.Thread(target=client_networking_rec_thread, args=(sock, buffer_size, state_decoder, state_mailbox, control_queue, snapshot_buffer, DEBUG, contact_model.mailbox if contact_model is not None else None), daemon=True)
 latency_thread_instance = threading.Thread(target=client_latency_thread, args=(latency_sock, buffer_size, server_ip, latency_port, latency_queue, 1.0, DEBUG), daemon=True)
 network_thread.start()
 latency_thread_instance.start()
 
+# Static scene, only the regions of the moving elements are redrawn in dirty rectangle mode
+static_scene = assets.scaled("background", screen_size).copy()
+static_scene.blit(title, (screen_size[0]/2, 0))
+renderer = DirtyRenderer(window, cfg_usr["render"]["dirty_rects"])
+renderer.set_background(static_scene)
+trial_key = None # goal and asteroid size, a change means a new trial
+
 #Initialize variables
+predictor = EndEffectorPredictor() if cfg_usr["prediction"]["enabled"] else None
+# Frame stage timings, overlay toggled with the keybind
+cfg_profiler = cfg_usr["profiler"]
+profiler = FrameProfiler(["network", "events", "device", "trial end", "send", "images", "scene", "arms", "blackhole", "hud", "overlay", "flip", "wait"],
+                         1 / FPS, cfg_profiler["overlay"], cfg_profiler["log"].format(player=player_number) if cfg_profiler["log"] else None)
+input_buffer = protocol.new_buffer(protocol.INPUT)
 force_vector = np.array([0, 0])
 success = False
 fail = False
@@ -148,34 +205,48 @@ t_server = 0.0
 run = True
 start_time = time.time()
 last_timer_update = time.time()
+# Wait for the first state snapshot, there is nothing to draw before it
+while state_mailbox.peek() is None:
+    time.sleep(0.01)
 # MAIN LOOP
 while run:
+    profiler.start()
     t = i * dt
     # Receive data from server
-    while not network_queue.empty():
-        data, addr = network_queue.get()
-        try: # shutdown command
-            message = data.decode()
-            if message == "shutdown":
-                if DEBUG: print("Server shutdown")
-                run = False
-        except UnicodeDecodeError: # binary data
-            try:
-                t_server, i_server, \
-                p1_x, p1_y, p2_x, p2_y, pobj_x, pobj_y,\
-                rad_obj, blackhole_x, blackhole_y, \
-                score, success, fail, timer, \
-                force_vector1_x, force_vector1_y, force_vector2_x, force_vector2_y, \
-                arm1_link1_x, arm1_link1_y, arm1_link2_x, arm1_link2_y, \
-                arm2_link1_x, arm2_link1_y, arm2_link2_x, arm2_link2_y, \
-                end_effector1_x, end_effector1_y, end_effector2_x, end_effector2_y \
-                = struct.unpack('=fi2i2i2ii2iiiii2f2f2f2f2f2f2f2f', data)
-                # parse received data
-                player_1_pos, player_2_pos = np.array([p1_x, p1_y]), np.array([p2_x, p2_y])
-                if player_number == 1: force_vector = np.array([force_vector1_x, force_vector1_y])
-                else: force_vector = np.array([force_vector2_x, force_vector2_y])
-            except struct.error as e:
-                if DEBUG: print(f"Failed to unpack binary data: {e}")
+    while not control_queue.empty(): # shutdown command
+        msg_type, data = control_queue.get()
+        if msg_type == protocol.MSG_SHUTDOWN:
+            if DEBUG: print("Server shutdown")
+            run = False
+    sample = state_mailbox.take() # only the newest snapshot is decoded
+    if sample is not None:
+        i_server = sample[0]
+        t_server, \
+        p1_x, p1_y, p2_x, p2_y, pobj_x, pobj_y,\
+        rad_obj, blackhole_x, blackhole_y, \
+        score, success, fail, timer, \
+        force_vector1_x, force_vector1_y, force_vector2_x, force_vector2_y, \
+        arm1_link1_x, arm1_link1_y, arm1_link2_x, arm1_link2_y, \
+        arm2_link1_x, arm2_link1_y, arm2_link2_x, arm2_link2_y, \
+        end_effector1_x, end_effector1_y, end_effector2_x, end_effector2_y, \
+        input_ack1, input_ack2 \
+        = sample[2]
+        # parse received data
+        if predictor is not None: # correct the prediction with the newest authoritative end effector
+            if player_number == 1: predictor.reconcile(input_ack1, (end_effector1_x, end_effector1_y))
+            else: predictor.reconcile(input_ack2, (end_effector2_x, end_effector2_y))
+        if player_number == 1: force_vector = np.array([force_vector1_x, force_vector1_y])
+        else: force_vector = np.array([force_vector2_x, force_vector2_y])
+    # Smooth positions, flags and forces above are always the newest ones
+    smoothed = snapshot_buffer.sample() if snapshot_buffer is not None else None
+    predicted_ee = None
+    if smoothed is not None:
+        p1_x, p1_y, p2_x, p2_y, pobj_x, pobj_y = smoothed[1:7]
+        arm1_link1_x, arm1_link1_y, arm1_link2_x, arm1_link2_y, \
+        arm2_link1_x, arm2_link1_y, arm2_link2_x, arm2_link2_y, \
+        end_effector1_x, end_effector1_y, end_effector2_x, end_effector2_y = smoothed[18:30]
+    player_1_pos, player_2_pos = np.array([p1_x, p1_y]), np.array([p2_x, p2_y])
+    profiler.lap("network")
 
     
     # Pygame event handling
@@ -185,68 +256,75 @@ while run:
         elif event.type == pygame.KEYUP:
             if event.key == ord(cfg_usr["keybinds"]["quit_game"]): # force quit with q button
                 run = False
+            elif event.key == ord(cfg_usr["keybinds"]["toggle_profiler"]):
+                profiler.toggle_overlay()
+        elif event.type == pygame.WINDOWEXPOSED: # the window was covered, its content is lost
+            renderer.invalidate()
+    profiler.lap("events")
     
     # Haptic device force update
-    if device_connected: #set forces only if the device is connected
+    if servo is not None: # the servo thread writes the newest force at its own rate
+        servo.set_force(G_fb @ - force_vector)
+    elif device_connected: #set forces only if the device is connected
         physics.update_force(G_fb @ - force_vector)
     
     # Read mouse position
     # Haptic device position
-    if device_connected:
-        pA0,pB0,pA,pB,pE = physics.get_device_pos() #positions of the various points of the pantograph
+    device_pos = None
+    if servo is not None:
+        device_pos = servo.get_position() # newest sample of the servo, None before the first read
+    elif device_connected:
+        device_pos = physics.get_device_pos()
+    if device_pos is not None:
+        pA0,pB0,pA,pB,pE = device_pos #positions of the various points of the pantograph
         pm = convert_pos(pygame.display.get_surface().get_size(), hardware_scale, vertical_offset, pE) #convert the physical positions to screen coordinates
         pm = G_ff @ pm # apply position scaling
     else: # mouse position
         pm = np.array(pygame.mouse.get_pos())
+    profiler.lap("device")
 
     # Success/Fail conditions
     if success:
-        window.blit(correct, (0, 0))
+        window.blit(assets.scaled("correct", screen_size), (0, 0))
         pygame.display.flip()
         pygame.time.delay(1000)
-        background = pygame.image.load(image_path)
-        asteroid = pygame.image.load(image_asteroid)
-        blackhole = pygame.image.load(image_blackhole)
-        warning = pygame.image.load(image_warning)
-        correct = pygame.image.load(image_correct)
-        wrong = pygame.image.load(image_wrong)
         start_time = time.time()
+        renderer.invalidate()
     
     if fail:
-        window.blit(wrong, (0, 0))
+        window.blit(assets.scaled("wrong", screen_size), (0, 0))
         pygame.display.flip()
         #pygame.time.delay(1000)
-        background = pygame.image.load(image_path)
-        asteroid = pygame.image.load(image_asteroid)
-        blackhole = pygame.image.load(image_blackhole)
-        warning = pygame.image.load(image_warning)
-        correct = pygame.image.load(image_correct)
-        wrong = pygame.image.load(image_wrong)
+        renderer.invalidate()
+    if (blackhole_x, blackhole_y, rad_obj) != trial_key: # new trial, redraw everything
+        trial_key = (blackhole_x, blackhole_y, rad_obj)
+        renderer.invalidate()
+    profiler.lap("trial end")
 
     # Send data to server
-    packed_data = bytearray(struct.pack("=2i", pm[0], pm[1]))
-    sock.sendto(packed_data, (server_ip, port))
+    protocol.pack_into(protocol.INPUT, input_buffer, protocol.MSG_INPUT, i, int(pm[0]), int(pm[1]), state_decoder.last_tick)
+    sock.sendto(input_buffer, (server_ip, port))
 
-    # Rendering
-    # Load the background image (adjust the file path to your actual image path)
-    window.fill((255, 255, 255))  # Clear window
+    # Predict the own end effector from the inputs the server has not applied yet
+    if predictor is not None:
+        predictor.record_input(i, pm)
+        predicted_ee = predictor.predict(i, in_contact=bool(np.any(force_vector)))
+    profiler.lap("send")
 
-    background = pygame.transform.scale(background, screen_size)
-    correct = pygame.transform.scale(correct, screen_size)
-    wrong = pygame.transform.scale(wrong, screen_size)
+    # Rendering
+    # Background and title, or only the regions drawn in the previous frame in dirty rectangle mode
+    renderer.begin()
     
     scale_factor = 2.2
-    asteroid = pygame.transform.scale(asteroid, (rad_obj*scale_factor, rad_obj*scale_factor))
-    # Blit the background image first (ensure it's drawn before other elements)
-    window.blit(background, (0, 0))  # Position (0, 0) means the top-left corner of the window
-    window.blit(title, (screen_size[0]/2, 0))
+    asteroid = assets.scaled("asteroid", (rad_obj*scale_factor, rad_obj*scale_factor))
+    profiler.lap("images")
     asteroid_position_x = pobj_x - 1/2 *rad_obj*scale_factor
     asteroid_position_y = pobj_y - 1/2 *rad_obj*scale_factor
-    window.blit(asteroid, (asteroid_position_x , asteroid_position_y))
+    renderer.add(window.blit(asteroid, (asteroid_position_x , asteroid_position_y)))
 
-    pygame.draw.circle(window, (0, 255, 0), pm, 10)
-    pygame.draw.circle(window, (255, 0, 0), player_1_pos, 15)
-    pygame.draw.circle(window, (0, 0, 255), player_2_pos, 15)
+    renderer.add(pygame.draw.circle(window, (0, 255, 0), pm, 10))
+    renderer.add(pygame.draw.circle(window, (255, 0, 0), player_1_pos, 15))
+    renderer.add(pygame.draw.circle(window, (0, 0, 255), player_2_pos, 15))
     
     # Add force meter
     force_meter_bg = pygame.Rect(10, 25, 200, 20)  # Background rectangle
@@ -258,82 +336,111 @@ while run:
 
     force_meter_fill = pygame.Rect(10, 25, force_meter_fill_width, 20)
     max_force_line_x = 10 + 200 
-    pygame.draw.line(window, (255, 0, 0), (max_force_line_x, 25), (max_force_line_x, 45), 2)
+    renderer.add(pygame.draw.line(window, (255, 0, 0), (max_force_line_x, 25), (max_force_line_x, 45), 2))
+    renderer.add(force_meter_bg) # the fill shrinks, its whole area is restored
 
     if normalized_force < 0.25: 
         pygame.draw.rect(window, (0, 255, 0), force_meter_fill)  # Draw fill (green)
     elif 0.25 <= normalized_force < 0.5:
         pygame.draw.rect(window, (255, 255, 0), force_meter_fill)  # Draw fill (yellow)
     else:
-        warning = pygame.transform.scale(warning, (50, 50))
-        window.blit(warning, (pm[0], pm[1]))
+        warning = assets.scaled("warning", (50, 50))
+        renderer.add(window.blit(warning, (pm[0], pm[1])))
         pygame.draw.rect(window, (255, 0, 0), force_meter_fill)  # Draw fill (red)
     
     if timer != 3:
-        countdown = TEXT_FONT.render(f'{timer}', True, (255, 255, 0))  
-        window.blit(countdown, (asteroid_position_x, asteroid_position_y))
+        renderer.add(countdown_field.draw(window, (asteroid_position_x, asteroid_position_y), timer))
     if timer == 0:
-        countdown = TEXT_FONT.render(f'SUCCES!', True, (255, 255, 0))
-        window.blit(countdown, (asteroid_position_x, asteroid_position_y))
+        renderer.add(window.blit(succes_text, (asteroid_position_x, asteroid_position_y)))
+    profiler.lap("scene")
 
     # Get base positions (these would be fixed based on your setup)
     arm1_base_x, arm1_base_y = xc-350, yc  # Use the actual base coordinates from your setup
     arm2_base_x, arm2_base_y = xc+350, yc  # Use the actual base coordinates from your setup
 
+    # Own arm follows the predicted end effector, the elbow is solved with inverse kinematics
+    if predicted_ee is not None:
+        if player_number == 1:
+            arm1_link2_x, arm1_link2_y = two_link_elbow((arm1_base_x, arm1_base_y), predicted_ee, LINK_LENGTH_1, LINK_LENGTH_2, (arm1_link2_x, arm1_link2_y))
+            end_effector1_x, end_effector1_y = predicted_ee
+        else:
+            arm2_link2_x, arm2_link2_y = two_link_elbow((arm2_base_x, arm2_base_y), predicted_ee, LINK_LENGTH_1, LINK_LENGTH_2, (arm2_link2_x, arm2_link2_y))
+            end_effector2_x, end_effector2_y = predicted_ee
+
     # Draw complete arms with both links
     # Arm 1
-    draw_arm_segment(window, (arm1_base_x, arm1_base_y), (arm1_link1_x, arm1_link1_y), LINK_WIDTH, RED)
-    draw_arm_segment(window, (arm1_link1_x, arm1_link1_y), (arm1_link2_x, arm1_link2_y), LINK_WIDTH, RED)
-    draw_arm_segment(window, (arm1_link2_x, arm1_link2_y), (end_effector1_x, end_effector1_y), LINK_WIDTH, RED)
+    renderer.add(draw_arm_segment(window, (arm1_base_x, arm1_base_y), (arm1_link1_x, arm1_link1_y), LINK_WIDTH, RED))
+    renderer.add(draw_arm_segment(window, (arm1_link1_x, arm1_link1_y), (arm1_link2_x, arm1_link2_y), LINK_WIDTH, RED))
+    renderer.add(draw_arm_segment(window, (arm1_link2_x, arm1_link2_y), (end_effector1_x, end_effector1_y), LINK_WIDTH, RED))
 
     # Arm 2
-    draw_arm_segment(window, (arm2_base_x, arm2_base_y), (arm2_link1_x, arm2_link1_y), LINK_WIDTH, BLUE)
-    draw_arm_segment(window, (arm2_link1_x, arm2_link1_y), (arm2_link2_x, arm2_link2_y), LINK_WIDTH, BLUE)
-    draw_arm_segment(window, (arm2_link2_x, arm2_link2_y), (end_effector2_x, end_effector2_y), LINK_WIDTH, BLUE)
+    renderer.add(draw_arm_segment(window, (arm2_base_x, arm2_base_y), (arm2_link1_x, arm2_link1_y), LINK_WIDTH, BLUE))
+    renderer.add(draw_arm_segment(window, (arm2_link1_x, arm2_link1_y), (arm2_link2_x, arm2_link2_y), LINK_WIDTH, BLUE))
+    renderer.add(draw_arm_segment(window, (arm2_link2_x, arm2_link2_y), (end_effector2_x, end_effector2_y), LINK_WIDTH, BLUE))
 
     # Draw end effectors as squares
     # Draw end effectors as rectangles
     # For end effector 1
-    pygame.draw.rect(window, RED, 
+    renderer.add(pygame.draw.rect(window, RED, 
                     (end_effector1_x - END_EFFECTOR_WIDTH//2, 
                     end_effector1_y - END_EFFECTOR_HEIGHT//2, 
-                    END_EFFECTOR_WIDTH, END_EFFECTOR_HEIGHT))
+                    END_EFFECTOR_WIDTH, END_EFFECTOR_HEIGHT)))
 
     # For end effector 2
-    pygame.draw.rect(window, BLUE, 
+    renderer.add(pygame.draw.rect(window, BLUE, 
                     (end_effector2_x - END_EFFECTOR_WIDTH//2, 
                     end_effector2_y - END_EFFECTOR_HEIGHT//2, 
-                    END_EFFECTOR_WIDTH, END_EFFECTOR_HEIGHT))
+                    END_EFFECTOR_WIDTH, END_EFFECTOR_HEIGHT)))
+    profiler.lap("arms")
 
 
     # Draw blackhole
-    blackhole = pygame.transform.scale(blackhole, (rad_obj*scale_factor, rad_obj*scale_factor))
+    blackhole = assets.scaled("blackhole", (rad_obj*scale_factor, rad_obj*scale_factor))
     # Calculate the top-left corner to center the black hole at (blackhole_x, blackhole_y)
     blackhole_width, blackhole_height = blackhole.get_size()
     top_left_x = blackhole_x - blackhole_width // 2
     top_left_y = blackhole_y - blackhole_height // 2
 
     # Draw the black hole
-    window.blit(blackhole, (top_left_x, top_left_y))
+    renderer.add(window.blit(blackhole, (top_left_x, top_left_y)))
+    profiler.lap("blackhole")
     
     if DEBUG: print('score:', score)
     # score
 
-    score_text = TEXT_FONT.render(f'SCORE: {score}/10', True, (0, 255, 255))
-    window.blit(score_text, (10, 45) )
+    renderer.add(score_field.draw(window, (10, 45), score))
 
     # Latency
     if not latency_queue.empty():
         latency = latency_queue.get()
-        text = font.render("Ping: " + str(round(latency, 2)) + " ms" + " FPS: " + str(round(clock.get_fps())), True, (0, 0, 0), (255, 255, 255))
-    window.blit(text, textRect)
+        hud_text = "Ping: " + str(round(latency, 2)) + " ms" + " FPS: " + str(round(clock.get_fps()))
+        if snapshot_buffer is not None:
+            hud_text += " " + snapshot_buffer.report()
+        if predictor is not None:
+            hud_text += " " + predictor.report()
+    renderer.add(hud.draw(window, textRect, hud_text))
+    profiler.lap("hud")
+    renderer.add(profiler.draw(window, font))
+    profiler.lap("overlay")
 
     # Update pygame
-    pygame.display.flip() # update display
+    renderer.present() # update display, only the changed regions in dirty rectangle mode
+    profiler.lap("flip")
     clock.tick(FPS)
+    profiler.lap("wait")
+    profiler.end()
     i += 1
 
     if run == False:
         if DEBUG: print("Closing client...")
+        if DEBUG: print(f"State snapshots: {state_mailbox.report()}")
+        if DEBUG: print(f"Assets: {assets.report()}")
+        if DEBUG: print(f"Rendering: {renderer.report()}")
+        profiler.close()
+        if servo is not None:
+            if DEBUG: print(servo.report())
+            servo.stop()
+        if device_connected:
+            physics.close() # release the force
         sock.close()
         break
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Throughput of the Haply board messages: precompiled codecs against the former per-float conversion.
+
+    PYTHONPATH=$(pwd) python src/haply_io_bench.py --messages 100000
+
+Runs on a loopback serial port, no board needed. The codecs are checked to give the same
+bytes as the per-float conversion by tests/test_haply_board.py.
+"""
+import argparse
+import struct
+import time
+import serial
+from utils.HaplyHAPI import Board
+
+
+def rate(n, function, *args):
+    start = time.perf_counter()
+    for _ in range(n):
+        function(*args)
+    return n / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Haply message encode/decode throughput")
+    parser.add_argument("--messages", type=int, default=100000, help="messages per codec measurement")
+    parser.add_argument("--replies", type=int, default=20000, help="replies sent through the loopback port")
+    args = parser.parse_args()
+
+    port = serial.serial_for_url("loop://", timeout=1)
+    board = Board("benchmark", port, 0)
+    board.transmit(2, 5, bytearray(0), [0.0, 0.0])  # replies are then expected from device 5
+    port.reset_input_buffer()  # drop the echoed messages
+    torques = [0.0123, -0.0456]
+    reply = struct.pack('<B2f', 5, 97.3, 82.7)
+
+    def encode_per_float(communicationType, deviceID, bData, fData):
+        # transmit() before the codecs
+        outData = bytearray(2 + len(bData) + 4*len(fData))
+        outData[0] = communicationType
+        outData[1] = deviceID
+        outData[2:2+len(bData)] = bData
+        j = 2+len(bData)
+        for i in range(0, len(fData)):
+            outData[j:j+4] = board.float_to_bytes(fData[i])
+            j = j+4
+        return outData
+
+    def decode_per_float(inData, expected):
+        # receive() before the codecs
+        buf = inData[1:expected*4+1]
+        return [board.bytes_to_float(buf[i*4:i*4+4]) for i in range(expected)]
+
+    packer, outData = board.tx_codec(0, 2)
+    unpacker, _ = board.rx_codec(2)
+    n = args.messages
+    print(f"encode per float: {rate(n, encode_per_float, 2, 5, bytearray(0), torques):10.0f} messages/s")
+    print(f"encode codec:     {rate(n, packer.pack_into, outData, 0, 2, 5, b'', *torques):10.0f} messages/s")
+    print(f"decode per float: {rate(n, decode_per_float, reply, 2):10.0f} messages/s")
+    print(f"decode codec:     {rate(n, unpacker.unpack_from, reply):10.0f} messages/s")
+
+    # Write and read back through the loopback port, blocking reads and background reader
+    n = args.replies
+    start = time.perf_counter()
+    for _ in range(n):
+        port.write(reply)
+        board.receive(2, 5, 2)
+    print(f"loopback receive: {n / (time.perf_counter() - start):10.0f} replies/s")
+    board.start_reader(2)
+    start = time.perf_counter()
+    for _ in range(n):
+        port.write(reply)
+        while not board.data_available():
+            time.sleep(0)
+        board.receive(2, 5, 2)
+    print(f"loopback reader:  {n / (time.perf_counter() - start):10.0f} replies/s, samples: {board.samples}, overwritten: {board.overwritten}")
+    board.stop_reader()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Measure the haptic loop rate and the force latency against the virtual Haply device, no hardware needed.
+
+    PYTHONPATH=$(pwd) python src/haptic_bench.py --mode servo --rate 1000 --duration 10
+    PYTHONPATH=$(pwd) python src/haptic_bench.py --mode frame --fps 60
+    PYTHONPATH=$(pwd) python src/haptic_bench.py --mode instant --rate 2000 --duration 2
+
+In servo mode the device is run by the HapticServo thread as in the client, in frame mode by
+update_force and get_device_pos once per frame, as without the servo. The force target steps
+between zero and --force every --step-interval seconds, the latency is the time until the
+device receives torques for the new target. In instant mode the servo runs against a device
+that answers at once, which shows the rate and jitter the scheduling alone reaches on a machine.
+"""
+import argparse
+import threading
+import time
+import numpy as np
+from utils.physics import Physics
+from utils.haptic_servo import HapticServo
+from utils.virtual_haply import VirtualHaply, TRAJECTORIES
+from utils.profiler import Histogram
+
+
+def force_latencies(steps, forces, force):
+    """Time (ns) from each step of the target to the first force received at its new value."""
+    latencies = Histogram()
+    k = 0
+    for set_time, target in steps:
+        while k < len(forces) and forces[k][0] < set_time:
+            k += 1
+        for received, fx, fy in forces[k:]:
+            if (fx > force / 2) == bool(target):
+                latencies.record(int((received - set_time) * 1e9))
+                break
+    return latencies
+
+
+class InstantBoard:
+    def data_available(self):
+        return True
+
+
+class InstantPhysics:
+    """Device that has data at every read and takes every force at once, only the servo thread is timed."""
+    haplyBoard = InstantBoard()
+
+    def get_device_pos(self):
+        return (0.0, 0.0), (0.0, 0.0), (0.0, 0.07), (0.0, 0.07), (0.0, 0.1)
+
+    def write_force(self, f):
+        pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Haptic loop benchmark on a virtual Haply device")
+    parser.add_argument("--mode", default="servo", choices=["servo", "frame", "instant"])
+    parser.add_argument("--rate", type=int, default=1000, help="servo rate (Hz)")
+    parser.add_argument("--fps", type=int, default=60, help="frame rate of the frame mode")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument("--trajectory", default="circle", choices=sorted(TRAJECTORIES), help="scripted hand motion")
+    parser.add_argument("--force", type=float, default=1.0, help="force step (N)")
+    parser.add_argument("--step-interval", type=float, default=0.25, help="seconds between force steps")
+    args = parser.parse_args()
+
+    if args.mode == "instant":
+        servo = HapticServo(InstantPhysics(), args.rate, report_interval=0).start()
+        time.sleep(args.duration)
+        servo.stop()
+        print(servo.report())
+        raise SystemExit
+
+    device = VirtualHaply(TRAJECTORIES[args.trajectory](), record=True)
+    physics = Physics(hardware_version=2, background_reader=args.mode == "servo", port=device)
+    while not physics.haplyBoard.data_available(): # the first reply may still be on its way to the reader thread
+        time.sleep(0.001)
+    physics.get_device_pos() # the torques need the Jacobian of a read position
+    servo = HapticServo(physics, args.rate, report_interval=0).start() if args.mode == "servo" else None
+
+    steps = [] # (time, target on)
+    target = [np.zeros(2)] # newest force target, replaced by the stepping thread
+    running = True
+
+    def step_forces():
+        """Change the target at times unrelated to the loop, as snapshots arrive from the network."""
+        on = False
+        while running:
+            time.sleep(args.step_interval)
+            on = not on
+            target[0] = np.array([args.force if on else 0.0, 0.0])
+            steps.append((time.perf_counter(), on))
+            if servo is not None:
+                servo.set_force(target[0])
+    stepper = threading.Thread(target=step_forces, daemon=True)
+    stepper.start()
+
+    frames = Histogram() # frame periods of the frame mode (ns)
+    period = 1.0 / args.fps
+    start = last_frame = time.perf_counter()
+    while time.perf_counter() - start < args.duration:
+        if servo is not None:
+            time.sleep(0.01)
+            continue
+        now = time.perf_counter()
+        physics.update_force(target[0].copy()) # the frame loop of the client without the servo
+        physics.get_device_pos()
+        frames.record(int((now - last_frame) * 1e9))
+        last_frame = now
+        time.sleep(max(0.0, period - (time.perf_counter() - now)))
+    running = False
+    stepper.join()
+    if servo is not None:
+        servo.stop()
+    device.record = False # the zero force of close() is no answer to a step
+    physics.close()
+
+    if servo is not None:
+        print(servo.report())
+    else:
+        print(f"Frame loop: {1e9 * frames.count / frames.total:.0f} Hz (target {args.fps} Hz), "
+              f"period p99 {frames.percentile(99) / 1e6:.1f} ms")
+    latency = force_latencies(steps, device.forces, args.force).summary()
+    print(f"Force latency over {latency['count']} steps: mean {latency['mean'] / 1000:.2f} ms, "
+          f"p50 {latency['p50'] / 1000:.2f} ms, p99 {latency['p99'] / 1000:.2f} ms, max {latency['max'] / 1000:.2f} ms")
+    print(device.report())
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Time the NumPy pantograph kinematics against the scalar Physics and Pantograph routines.
+
+    PYTHONPATH=$(pwd) python src/kinematics_bench.py --samples 100000
+
+Their agreement is checked by tests/test_kinematics.py.
+"""
+import argparse
+import time
+import numpy as np
+from utils.HaplyHAPI import Pantograph
+from utils.physics import Physics
+from utils.kinematics import L1, L2, base_distance, forward_kinematics, inverse_kinematics
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Vectorized against scalar pantograph kinematics")
+    parser.add_argument("--samples", type=int, default=100000, help="positions of the vectorized calls")
+    parser.add_argument("--scalar-samples", type=int, default=10000, help="positions of the scalar loops")
+    parser.add_argument("--hardware-version", type=int, default=3, choices=[2, 3])
+    args = parser.parse_args()
+
+    d = base_distance(args.hardware_version)
+    pantograph = Pantograph(args.hardware_version)
+    physics = Physics.__new__(Physics) # only the link lengths, no device
+    physics.l1, physics.l2, physics.d = L1, L2, d
+    rng = np.random.default_rng(0)
+    targets = np.column_stack((rng.uniform(-0.05, 0.05, args.samples), rng.uniform(0.04, 0.12, args.samples)))
+
+    start = time.perf_counter()
+    angles = inverse_kinematics(targets, d)[0]
+    vectorized = (time.perf_counter() - start) / args.samples
+    start = time.perf_counter()
+    for target in targets[:args.scalar_samples]:
+        physics.derive_device_pos(list(target))
+    scalar = (time.perf_counter() - start) / args.scalar_samples
+    print(f"inverse kinematics: scalar {scalar * 1e6:.2f} us, vectorized {vectorized * 1e6:.3f} us per sample")
+
+    start = time.perf_counter()
+    forward_kinematics(angles, d, jacobian=True)
+    vectorized = (time.perf_counter() - start) / args.samples
+    start = time.perf_counter()
+    for a in angles[:args.scalar_samples]:
+        pantograph.forwardKinematics(a)
+        pantograph.torqueCalculation([1.0, 0.0])
+    scalar = (time.perf_counter() - start) / args.scalar_samples
+    print(f"forward kinematics and Jacobian: scalar {scalar * 1e6:.2f} us, vectorized {vectorized * 1e6:.3f} us per sample")
@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Cost of the TickProfiler instrumentation per call, disabled and enabled.
+
+    PYTHONPATH=$(pwd) python src/profiler_bench.py --iterations 200000
+"""
+import argparse
+from time import perf_counter_ns
+from utils.profiler import TickProfiler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tick profiler overhead benchmark")
+    parser.add_argument("--iterations", type=int, default=200000, help="timed loop iterations of four calls each")
+    args = parser.parse_args()
+
+    profiler = TickProfiler(report_interval=1e9)
+    n = args.iterations
+    for enabled in (False, True):
+        profiler.toggle(enabled)
+        start = perf_counter_ns()
+        for _ in range(n):
+            profiler.start()
+            profiler.lap("a")
+            profiler.lap("b")
+            profiler.end()
+        elapsed = perf_counter_ns() - start
+        print(f"{'enabled' if enabled else 'disabled'}: {elapsed / n / 4:.0f} ns per call")
+    print(profiler.format())
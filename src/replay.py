@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Re-simulate a recorded session headlessly from its input log, as fast as the CPU allows.
+
+    PYTHONPATH=$(pwd) python src/replay.py data/replays/session_<date>_<seed>.log
+
+The asteroid position of every tick is compared with the recording, so the first tick where
+the physics diverges points at a regression.
+"""
+import argparse
+import time
+import numpy as np
+from utils.game_session import GameSession
+from utils.input_log import read_input_log, EVENT_START_OBJECT, EVENT_FORCE_RESET, EVENT_SUCCESS, EVENT_FAIL
+
+def replay(path, tolerance=1e-3):
+    """Replay a log, returns a dict with the timing and the first diverging tick (None if identical)."""
+    header, rows = read_input_log(path)
+    session = GameSession(header["settings"], header["simulation"], seed=header["seed"], write_data=False)
+    pm1, pm2 = session.pm[1], session.pm[2]
+    first_divergence = None
+    max_error = 0.0
+    start = time.perf_counter()
+    for k, (p1, p2, events, ball_position) in enumerate(rows.tolist()):
+        # Inputs and the flags set outside the step logic, exactly as they were before the tick
+        pm1[0], pm1[1] = p1
+        pm2[0], pm2[1] = p2
+        if events & EVENT_START_OBJECT:
+            session.start_object()
+        session.force_reset = bool(events & EVENT_FORCE_RESET)
+        session.success = bool(events & EVENT_SUCCESS)
+        session.fail = bool(events & EVENT_FAIL)
+        session.tick()
+
+        # float32 recording, compare with the float32 of the replay
+        error = float(np.max(np.abs(np.float32(session.ball.body.position) - np.float32(ball_position))))
+        max_error = max(max_error, error)
+        if first_divergence is None and error > tolerance:
+            first_divergence = k
+    elapsed = time.perf_counter() - start
+    simulated = len(rows) * session.dt
+    return {
+        "ticks": len(rows), "simulated": simulated, "elapsed": elapsed,
+        "speedup": simulated / elapsed if elapsed > 0 else float("inf"),
+        "trials": session.trials, "score": session.score, "ball_position": tuple(session.ball.body.position),
+        "first_divergence": first_divergence, "max_error": max_error,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a recorded session from its input log")
+    parser.add_argument("log", help="input log written with server.replay.enabled in settings.json")
+    parser.add_argument("--tolerance", type=float, default=1e-3, help="allowed asteroid position difference (px)")
+    args = parser.parse_args()
+
+    result = replay(args.log, args.tolerance)
+    print(f"Replayed {result['ticks']} ticks ({result['simulated']:.1f} s) in {result['elapsed']:.2f} s, "
+          f"{result['speedup']:.0f}x faster than real time")
+    print(f"Trials: {result['trials']}, score: {result['score']}")
+    if result["first_divergence"] is None:
+        print(f"Identical to the recording (max error {result['max_error']:.2e} px)")
+    else:
+        print(f"Diverges from the recording at tick {result['first_divergence']} (max error {result['max_error']:.2f} px)")
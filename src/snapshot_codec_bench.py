@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Bandwidth per client of full against delta snapshots, for a synthetic session with acknowledgements and losses.
+
+    PYTHONPATH=$(pwd) python src/snapshot_codec_bench.py --seconds 60 --loss 0.02
+"""
+import argparse
+import math
+import random
+import time
+from utils import protocol
+from utils.snapshot_codec import SnapshotDecoder, SnapshotEncoder
+
+UDP_OVERHEAD = 28 # IPv4 + UDP headers
+
+
+def synthetic_state(k, rate):
+    """STATE values of tick k: players alternate 3 s of motion and 3 s of rest."""
+    moving = (k // (3 * rate)) % 2 == 0
+    phase = k / rate if moving else (k // (3 * rate)) * 3.0
+    ball = (400 + 150 * math.sin(0.5 * phase), 300 + 100 * math.cos(0.3 * phase))
+    arm = [200 + 80 * math.sin(phase + j) for j in range(12)]
+    contact = moving and k % 7 < 3
+    return (0.0, int(ball[0]) - 60, int(ball[1]), int(ball[0]) + 60, int(ball[1]),
+            int(ball[0]), int(ball[1]), 50, 520, 310,
+            k // 2000, 0, 0, 3,
+            int(900 * math.sin(phase)) if contact else 0, 0, int(-900 * math.sin(phase)) if contact else 0, 0,
+            *arm, k, k)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Snapshot delta encoding benchmark")
+    parser.add_argument("--seconds", type=float, default=60.0, help="simulated session length")
+    parser.add_argument("--rate", type=int, default=100, help="snapshots per second")
+    parser.add_argument("--loss", type=float, default=0.02, help="share of snapshots lost")
+    parser.add_argument("--ack-delay", type=int, default=5, help="ticks between sending a snapshot and its acknowledgement (~50 ms RTT)")
+    parser.add_argument("--keyframe-interval", type=int, default=50)
+    args = parser.parse_args()
+
+    rate = args.rate
+    ticks = int(args.seconds * rate)
+    rng = random.Random(0)
+    full_bytes = ticks * (protocol.STATE.size + UDP_OVERHEAD)
+    encoder = SnapshotEncoder(keyframe_interval=args.keyframe_interval)
+    decoder = SnapshotDecoder()
+    pending_acks = []
+    ack = protocol.NO_ACK
+    delta_bytes = 0
+    worst_error = 0.0
+    start = time.perf_counter()
+    for k in range(ticks):
+        values = synthetic_state(k, rate)
+        data = bytes(encoder.encode(k, values, ack))
+        delta_bytes += len(data) + UDP_OVERHEAD
+        if rng.random() >= args.loss:
+            decoded = decoder.decode(data)
+            if decoded is not None:
+                worst_error = max(worst_error, max(abs(a - b) for a, b in zip(decoded[1][1:30], values[1:30])))
+                pending_acks.append((k + args.ack_delay, decoded[0]))
+        while pending_acks and pending_acks[0][0] <= k:
+            ack = pending_acks.pop(0)[1]
+    elapsed = time.perf_counter() - start
+
+    seconds = ticks / rate
+    print(f"Full snapshots:  {full_bytes / seconds:8.0f} B/s per client ({protocol.STATE.size} B payload)")
+    print(f"Delta snapshots: {delta_bytes / seconds:8.0f} B/s per client ({encoder.report()})")
+    print(f"Reduction: {100 * (1 - delta_bytes / full_bytes):.1f} %, worst quantization error: {worst_error:.3f} px, "
+          f"missing baselines: {decoder.missing_baselines}")
+    print(f"Encode + decode: {elapsed / ticks * 1e6:.1f} us per snapshot")
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Parameter sweep with bot players over a process pool, with results cached on disk.
+
+    PYTHONPATH=$(pwd) python src/sweep.py --set crush_force_factor=0.3,0.45,0.6 --set object.mass=500,1000
+    PYTHONPATH=$(pwd) python src/sweep.py --sample crush_force_factor=0.3:0.6 --sample object.mass=500:2000 --samples 32
+
+Points are cached by the configuration they resolve to, the run arguments and the code version,
+so running a sweep again only computes the points that are new. Swept keys that change no
+outcome (success, completion, crushes, time above the crush threshold) are named at the end,
+and a best point is only reported if no other point ties with it.
+"""
+import argparse
+import csv
+import json
+import os
+import time
+from utils.bots import POLICIES
+from utils.sweep import ResultCache, best_point, config_grid, config_samples, keys_without_effect, run_sweep
+
+# Settings
+config_set_path = os.path.join(os.path.dirname(__file__), "../config/settings.json")
+config_sim_path = os.path.join(os.path.dirname(__file__), "../config/simulation.json")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parallel parameter sweep with bot players")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=V1,V2",
+                        help="grid values, e.g. crush_force_factor=0.4,0.5 (repeatable)")
+    parser.add_argument("--sample", action="append", default=[], metavar="KEY=LOW:HIGH",
+                        help="random uniform range, e.g. object.mass=500:2000 (repeatable)")
+    parser.add_argument("--samples", type=int, default=16, help="random points drawn from the --sample ranges")
+    parser.add_argument("--trials", type=int, default=100, help="trials per point")
+    parser.add_argument("--policy", default="squeeze_and_carry", choices=sorted(POLICIES))
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first trial and of the random points")
+    parser.add_argument("--timeout", type=float, default=30.0, help="simulated seconds before a trial counts as failed")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per core)")
+    parser.add_argument("--cache", default=os.path.join(os.path.dirname(__file__), "../data/sweep_cache"), help="result cache directory")
+    parser.add_argument("--no-cache", action="store_true", help="compute every point again")
+    parser.add_argument("--csv", help="also write the results to this file")
+    args = parser.parse_args()
+
+    with open(config_set_path) as f:
+        settings = json.load(f)
+    with open(config_sim_path) as f:
+        cfg_simulation = json.load(f)
+
+    # Random points are drawn for the --sample keys and crossed with the --set grid
+    points = config_grid(args.set)
+    if args.sample:
+        points = [dict(point, **sample) for point in points for sample in config_samples(args.sample, args.samples, args.seed)]
+
+    cache = None if args.no_cache else ResultCache(args.cache)
+    start = time.perf_counter()
+    results = run_sweep(settings, cfg_simulation, points, args.trials, args.policy, seed=args.seed, timeout=args.timeout,
+                        workers=args.workers, cache=cache, progress=lambda done, total: print(f"\r{done}/{total} points computed", end="", flush=True))
+    elapsed = time.perf_counter() - start
+    computed = sum(not result["cached"] for result in results)
+    if computed:
+        print()
+
+    def point_name(point):
+        return ", ".join(f"{key}={value:.4g}" if isinstance(value, float) else f"{key}={value}" for key, value in point.items()) or "defaults"
+
+    for point, result in zip(points, results):
+        completion_time = f"{result['completion_time']:.2f} s" if result["completion_time"] is not None else "-"
+        print(f"{point_name(point)}: success {100 * result['success_rate']:.1f} %, completion {completion_time}, "
+              f"crushed {100 * result['crush_rate']:.1f} %, over the crush threshold {result['overload_time']:.2f} s, "
+              f"peak force {result['peak_force']:.0f} ({result['peak_device_force']:.2f} N on the device)"
+              f"{' [cached]' if result['cached'] else ''}")
+    print(f"{len(points)} points ({computed} computed, {len(points) - computed} cached) in {elapsed:.1f} s")
+
+    for key in keys_without_effect(points, results):
+        print(f"{key} changes no outcome of these trials, only the forces")
+    if len(points) > 1:
+        best = best_point(results)
+        print(f"Best: {point_name(points[best])}" if best is not None else "Best: none, the highest success rate is tied")
+
+    if args.csv and results:
+        with open(args.csv, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(results[0]))
+            writer.writeheader()
+            writer.writerows(results)
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Time the recording of one tick of telemetry and check the trial file it leaves on disk.
+
+    PYTHONPATH=$(pwd) python src/telemetry_bench.py --ticks 30000
+"""
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+from utils.telemetry import TelemetryRecorder
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Telemetry recording benchmark")
+    parser.add_argument("--ticks", type=int, default=30000, help="ticks recorded in the trial")
+    parser.add_argument("--chunk-size", type=int, default=256, help="ticks between background flushes")
+    parser.add_argument("--max-ticks", type=int, default=60000, help="capacity of the trial file")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    recorder = TelemetryRecorder(directory, chunk_size=args.chunk_size, max_ticks=args.max_ticks)
+    recorder.start_trial(1)
+    row = ((1, 2), (3, 4), (1, 2), (3, 4), (0, 0), (0, 0), (0, 0), (0, 0), (400, 300), (0, 0), 50, (500, 300), 3, 0, False, False)
+    start = time.perf_counter()
+    for k in range(args.ticks):
+        recorder.record((k, k * 0.01) + row)
+    elapsed = time.perf_counter() - start
+    recorder.close()
+    path = os.path.join(directory, "trial_0001.npy")
+    data = np.load(path)
+    ticks = min(args.ticks, args.max_ticks)
+    assert len(data) == ticks and data["tick"][-1] == ticks - 1
+    print(f"Record: {elapsed / args.ticks * 1e6:.2f} us per tick, {recorder.report()}")
+    print(f"Trial file: {os.path.getsize(path)} bytes for {ticks} ticks")
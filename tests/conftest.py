@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The modules are imported as utils.x from the repository root, as with PYTHONPATH=$(pwd)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,45 @@
+import json
+import os
+import pytest
+from utils.batch import configure, run_config, run_trial
+from utils.bots import SqueezeAndCarry
+
+CONFIG = os.path.join(os.path.dirname(__file__), "..", "config")
+SEED = 9 # the asteroid is carried to a goal both hands reach and held there
+
+
+@pytest.fixture(scope="module")
+def configs():
+    with open(os.path.join(CONFIG, "settings.json")) as f:
+        settings = json.load(f)
+    with open(os.path.join(CONFIG, "simulation.json")) as f:
+        cfg_simulation = json.load(f)
+    return settings, cfg_simulation
+
+
+def trial(configs, crush_force_factor, **bot_args):
+    settings, cfg_simulation = configure(*configs, {"crush_force_factor": crush_force_factor})
+    return run_trial(settings, cfg_simulation, SqueezeAndCarry(**bot_args), SEED)
+
+
+def test_squeeze_is_crushed_below_the_mouse_joint_force(configs):
+    # The squeeze loads the contact up to the mouse joint max_force, 100000 of max_force 200000
+    success, completion_time, peak_force, crushed, overload_time = trial(configs, 0.45)
+    assert crushed and not success and completion_time is None
+    assert overload_time >= 1.0 # force_threshold_time
+    success, completion_time, peak_force, crushed, overload_time = trial(configs, 0.6)
+    assert success and not crushed and completion_time > 0
+    assert overload_time < 1.0
+
+
+def test_hold_without_pressing_is_not_crushed(configs):
+    success, _, _, crushed, overload_time = trial(configs, 0.45, squeeze=0.0)
+    assert success and not crushed and overload_time < 1.0
+
+
+def test_run_config_over_workers(configs):
+    results = [run_config(*configs, {"crush_force_factor": 0.45}, trials=2, seed=SEED, workers=workers) for workers in (1, 2)]
+    for result in results:
+        del result["elapsed"]
+    assert results[0] == results[1]
+    assert results[0]["crush_rate"] > 0 and results[0]["overload_time"] >= 0.5
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+from utils.contact_model import ContactModel, EFFECTOR_HALF_WIDTH
+
+
+def test_no_force_before_the_first_message():
+    assert np.array_equal(ContactModel().force((400.0, 300.0)), np.zeros(2))
+
+
+@pytest.mark.parametrize("x, depth", [(340, 0), (345, 5), (350, 10), (360, 20)])
+def test_penalty_force_pushes_the_hand_out(x, depth):
+    contact = ContactModel()
+    contact.mailbox.put((400.0, 300.0, 50.0, 0.0, 0.0, 4000.0))
+    f = contact.force((x, 300.0))
+    np.testing.assert_allclose(f, [-4000.0 * depth, 0.0])
+
+
+def test_force_is_limited():
+    contact = ContactModel(max_force=10000)
+    contact.mailbox.put((400.0, 300.0, 50.0, 0.0, 0.0, 4000.0))
+    assert np.linalg.norm(contact.force((370.0, 300.0))) == pytest.approx(10000)
+
+
+def test_center_inside_the_effector():
+    contact = ContactModel()
+    contact.mailbox.put((400.0, 300.0, 50.0, 0.0, 0.0, 4000.0))
+    f = contact.force((400.0 - EFFECTOR_HALF_WIDTH / 2, 300.0))
+    assert f[0] < 0 and f[1] == 0 and np.linalg.norm(f) == pytest.approx(4000.0 * 50)
+
+
+def test_asteroid_is_extrapolated_up_to_the_limit():
+    contact = ContactModel(max_extrapolation=0.1)
+    received = 10.0
+    contact.mailbox.put((400.0, 300.0, 50.0, 100.0, 0.0, 4000.0), timestamp=received) # moving away from the hand
+    hand = (345.0, 300.0) # 5 px deep at the time of the message
+    np.testing.assert_allclose(contact.force(hand, now=received), [-20000.0, 0.0])
+    np.testing.assert_allclose(contact.force(hand, now=received + 0.04), [-4000.0, 0.0]) # 4 px further, 1 px deep
+    np.testing.assert_allclose(contact.force(hand, now=received + 1.0), [0.0, 0.0])
+    contact.mailbox.put((400.0, 300.0, 50.0, -100.0, 0.0, 4000.0), timestamp=received) # toward the hand
+    np.testing.assert_allclose(contact.force(hand, now=received + 1.0), [-4000.0 * 15, 0.0]) # at most 0.1 s
+
+
+def test_blend():
+    contact = ContactModel(blend=0.8)
+    np.testing.assert_allclose(contact.blend(np.array([10.0, 0.0]), np.array([0.0, 10.0])), [8.0, 2.0])
@@ -0,0 +1,39 @@
+import pygame
+import pymunk
+import pytest
+from utils.create_arm import create_arm, draw_arm_segment
+
+WHITE = (255, 255, 255)
+RED = (255, 0, 0)
+
+
+def drawn(surface):
+    """Bounding rect of the pixels that are not white."""
+    mask = pygame.mask.from_threshold(surface, WHITE, (1, 1, 1, 255))
+    mask.invert()
+    rects = mask.get_bounding_rects()
+    return rects[0].unionall(rects[1:]) if rects else None
+
+
+@pytest.mark.parametrize("end", [(300, 100), (100, 300), (250, 250), (20, 40), (101, 100)])
+def test_segment_rect_covers_the_drawing(end):
+    screen = pygame.Surface((400, 400))
+    screen.fill(WHITE)
+    rect = draw_arm_segment(screen, (100, 100), end, 5, RED)
+    assert rect.contains(drawn(screen))
+    # The link reaches close to the end point
+    assert screen.get_at((round(100 + (end[0] - 100) * 0.9), round(100 + (end[1] - 100) * 0.9))) == RED
+
+
+def test_zero_length_segment_is_a_joint():
+    screen = pygame.Surface((100, 100))
+    screen.fill(WHITE)
+    rect = draw_arm_segment(screen, (50, 50), (50, 50), 5, RED)
+    assert rect == drawn(screen)
+
+
+def test_arm_bodies():
+    space = pymunk.Space()
+    arm1, arm2, effector = create_arm(space, (50, 300), 250, 200)
+    assert arm1.position == (50, 300) and arm2.position == (300, 300)
+    assert effector.body.position == (500, 300)
@@ -0,0 +1,65 @@
+import struct
+import time
+import serial
+from utils.HaplyHAPI import Board
+
+
+def loopback_board():
+    port = serial.serial_for_url("loop://", timeout=1)
+    board = Board("test", port, 0)
+    board.transmit(2, 5, bytearray(0), [0.0, 0.0]) # replies are then expected from device 5
+    port.reset_input_buffer() # drop the echoed messages
+    return board, port
+
+
+def encode_per_float(board, communicationType, deviceID, bData, fData):
+    """Message bytes as transmit() built them before the codecs."""
+    outData = bytearray([communicationType, deviceID]) + bytearray(bData)
+    for f in fData:
+        outData += board.float_to_bytes(f)
+    return outData
+
+
+def test_transmit_matches_per_float_encoding():
+    board, port = loopback_board()
+    messages = [(0, 0, b"", []), (1, 5, bytes([3, 1, 2, 3, 1, 2, 0, 0]), [0.0, 4096.0, 0.0, 4096.0]),
+                (2, 5, b"", [0.0123, -0.0456]), (2, 5, bytes([7]), [1e-30, -3.5e12, float("inf")])]
+    for message in messages:
+        board.transmit(*message)
+        expected = encode_per_float(board, *message)
+        assert port.read(len(expected)) == expected
+    assert port.in_waiting == 0
+
+
+def test_codecs_are_compiled_once():
+    board, _ = loopback_board()
+    assert board.tx_codec(0, 2) is board.tx_codec(0, 2)
+    assert board.rx_codec(2) is board.rx_codec(2)
+
+
+def test_receive_matches_per_float_decoding():
+    board, port = loopback_board()
+    for values in ([97.3, 82.7], [-180.0, 0.0], [1e-7, 3.4e38]):
+        reply = struct.pack('<B%df' % len(values), 5, *values)
+        port.write(reply)
+        expected = [board.bytes_to_float(reply[1 + 4 * i:5 + 4 * i]) for i in range(len(values))]
+        assert board.receive(2, 5, len(values)) == expected
+
+
+def test_reader_keeps_the_newest_reply():
+    board, port = loopback_board()
+    board.start_reader(2)
+    try:
+        port.write(struct.pack('<B2f', 5, 1.0, 2.0))
+        deadline = time.perf_counter() + 2.0
+        while not board.data_available() and time.perf_counter() < deadline:
+            time.sleep(0.001)
+        assert board.receive(2, 5, 2) == [1.0, 2.0]
+        assert not board.data_available()
+        port.write(struct.pack('<B2f', 5, 3.0, 4.0) + struct.pack('<B2f', 5, 5.0, 6.0))
+        while board.samples < 3 and time.perf_counter() < deadline:
+            time.sleep(0.001)
+        assert board.receive(2, 5, 2) == [5.0, 6.0]
+        assert board.samples == 3 and board.overwritten == 1
+    finally:
+        board.stop_reader()
@@ -0,0 +1,51 @@
+import pygame
+import pytest
+from utils.hud_text import CachedText, GlyphAtlas, FieldText
+
+WHITE = (255, 255, 255)
+
+
+@pytest.fixture(scope="module")
+def font():
+    pygame.font.init()
+    return pygame.font.Font(None, 32)
+
+
+def test_cached_text_renders_on_change(font):
+    screen = pygame.Surface((300, 100))
+    text = CachedText(font, WHITE)
+    for label in ("FPS: 60", "FPS: 60", "FPS: 59", "FPS: 59"):
+        rect = text.draw(screen, (10, 10), label)
+        assert rect.size == font.size(label)
+    assert text.renders == 2
+
+
+def test_atlas_renders_other_characters_once(font):
+    atlas = GlyphAtlas(font, WHITE)
+    assert set("0123456789") <= set(atlas.glyphs)
+    glyph = atlas.glyph("x")
+    assert atlas.glyph("x") is glyph and glyph.get_size() == font.size("x")
+
+
+def test_field_text_composes_on_change(font):
+    screen = pygame.Surface((300, 100))
+    field = FieldText(GlyphAtlas(font, WHITE), "SCORE: {}/10")
+    for score in (0, 0, 7, 7, 10):
+        rect = field.draw(screen, (0, 0), score)
+        # Parts and digits side by side: the width of the rendered words and glyphs
+        assert rect.width == font.size("SCORE: ")[0] + sum(font.size(c)[0] for c in str(score)) + font.size("/10")[0]
+        assert rect.height == font.get_height()
+    assert field.composes == 3
+
+
+def test_field_text_several_values(font):
+    screen = pygame.Surface((400, 100))
+    screen.fill((0, 0, 0))
+    field = FieldText(GlyphAtlas(font, WHITE), "{} rooms, {} fps")
+    rect = field.draw(screen, (5, 5), 3, 60)
+    assert rect.topleft == (5, 5)
+    assert rect.width == sum(font.size(part)[0] for part in ("3", " rooms, ", "6", "0", " fps"))
+    # Something was drawn inside the rect and nothing outside
+    drawn = pygame.mask.from_threshold(screen, (0, 0, 0), (1, 1, 1, 255))
+    drawn.invert()
+    assert drawn.count() > 0 and rect.contains(drawn.get_bounding_rects()[0].unionall(drawn.get_bounding_rects()))
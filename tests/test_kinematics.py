@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+from utils.HaplyHAPI import Pantograph
+from utils.physics import Physics
+from utils.kinematics import (L1, L2, base_distance, forward_kinematics, inverse_kinematics, joint_positions,
+                              forces_to_torques, torques_to_forces)
+
+TOLERANCE = 1e-9
+MARGIN = 0.0005 # distance margin of Physics.derive_device_pos (m)
+
+
+def targets(d):
+    """End effector targets over the workspace, out of reach, too close to the base and close to the singularities."""
+    rng = np.random.default_rng(0)
+    reach = L1 + L2 - MARGIN
+    near = [
+        (0.0, 0.08), (d / 2, 0.12), (-0.05, 0.1), (0.06, 0.05),
+        (0.0, reach - 1e-7), (d, reach - 1e-7), # arm A or B almost fully stretched
+        (reach * np.cos(0.3), reach * np.sin(0.3)), (d + reach * np.cos(2.5), reach * np.sin(2.5)),
+        (0.0, L2 - L1 + MARGIN), (d / 2, L2 - L1 + MARGIN + 1e-9), # lowest allowed height
+        (0.0, 0.3), (0.25, 0.01), (-0.2, -0.05), # out of reach
+        (0.001, 0.0), (d / 2, 0.005), # too close to the base
+        (1e-12, 0.1), (d + 1e-12, 0.1), # on the motor axes
+    ]
+    spread = np.column_stack((rng.uniform(-0.2, 0.2, 300), rng.uniform(-0.02, 0.2, 300)))
+    return np.vstack((near, spread))
+
+
+def scalar_physics(d):
+    physics = Physics.__new__(Physics) # only the link lengths, no device
+    physics.l1, physics.l2, physics.d = L1, L2, d
+    return physics
+
+
+def scalar_jacobian(pantograph, angles):
+    """Jacobian of Pantograph.torqueCalculation, one column per unit force."""
+    pantograph.forwardKinematics(list(angles))
+    pantograph.torqueCalculation([1.0, 0.0])
+    column_x = pantograph.get_torque()
+    pantograph.torqueCalculation([0.0, 1.0])
+    column_y = pantograph.get_torque()
+    return np.column_stack((column_x, column_y))
+
+
+@pytest.mark.parametrize("version", [2, 3])
+def test_inverse_kinematics_matches_derive_device_pos(version):
+    d = base_distance(version)
+    physics = scalar_physics(d)
+    goals = targets(d)
+    angles, reached = inverse_kinematics(goals, d)
+    pA, pB = joint_positions(angles, d)
+    for k, goal in enumerate(goals):
+        _, _, spA, spB, spE = physics.derive_device_pos(list(goal)) # the list is changed in place
+        np.testing.assert_allclose(reached[k], spE, rtol=0, atol=TOLERANCE)
+        np.testing.assert_allclose(pA[k], spA, rtol=0, atol=TOLERANCE)
+        np.testing.assert_allclose(pB[k], spB, rtol=0, atol=TOLERANCE)
+
+
+@pytest.mark.parametrize("version", [2, 3])
+def test_forward_kinematics_and_jacobian_match_pantograph(version):
+    d = base_distance(version)
+    pantograph = Pantograph(version)
+    angles, reached = inverse_kinematics(targets(d), d)
+    valid = np.any(angles != 0, axis=-1)
+    assert valid.sum() > 200
+    positions, J = forward_kinematics(angles[valid], d, jacobian=True)
+    np.testing.assert_allclose(positions, reached[valid], rtol=0, atol=TOLERANCE)
+    for k, a in enumerate(angles[valid]):
+        expected = scalar_jacobian(pantograph, a)
+        np.testing.assert_allclose(pantograph.get_coordinate(), positions[k], rtol=0, atol=TOLERANCE)
+        np.testing.assert_allclose(J[k], expected, rtol=1e-9, atol=TOLERANCE)
+
+
+def test_forces_round_trip_through_torques():
+    d = base_distance(3)
+    angles = inverse_kinematics(targets(d), d)[0]
+    J = forward_kinematics(angles[np.any(angles != 0, axis=-1)], d, jacobian=True)[1]
+    forces = np.random.default_rng(1).normal(size=(len(J), 2))
+    torques = forces_to_torques(J, forces)
+    np.testing.assert_allclose(torques, np.einsum("kij,kj->ki", J, forces))
+    back = torques_to_forces(J, torques)
+    regular = np.abs(np.linalg.det(J)) > 1e-9
+    np.testing.assert_allclose(back[regular], forces[regular], rtol=1e-6, atol=1e-6)
+
+
+def test_broadcast_shapes():
+    angles = np.tile([[120.0, 60.0]], (3, 4, 1))
+    positions, J = forward_kinematics(angles, jacobian=True)
+    assert positions.shape == (3, 4, 2) and J.shape == (3, 4, 2, 2)
+    np.testing.assert_allclose(forward_kinematics([120.0, 60.0]), positions[0, 0])
@@ -0,0 +1,40 @@
+from types import SimpleNamespace
+import serial.tools.list_ports
+from utils import physics
+from utils.physics import Physics
+from utils.virtual_haply import VirtualHaply
+
+
+def port(device, vid=None, pid=None, description=None, serial_number=None):
+    return SimpleNamespace(device=device, vid=vid, pid=pid, description=description, serial_number=serial_number)
+
+
+def test_board_found_from_usb_ids_without_description(monkeypatch):
+    ports = [port("/dev/ttyS0"), port("/dev/ttyACM0", 0x2341, 0x804D), port("/dev/ttyACM1", description="Arduino Zero (Native USB Port)")]
+    monkeypatch.setattr(serial.tools.list_ports, "comports", lambda: ports)
+    assert Physics.__new__(Physics).serial_ports() == ["/dev/ttyACM0", "/dev/ttyACM1"]
+
+
+def test_cached_port_first(monkeypatch):
+    ports = [port("/dev/ttyACM0", 0x2341, 0x804D, serial_number="A"), port("/dev/ttyACM1", 0x2341, 0x804D, serial_number="B")]
+    monkeypatch.setattr(serial.tools.list_ports, "comports", lambda: ports)
+    search = Physics.__new__(Physics).serial_ports
+    assert search({"port": "/dev/ttyACM1", "serial_number": "B"}) == ["/dev/ttyACM1"]
+    # Another board on the cached port name is not taken for the cached one
+    assert search({"port": "/dev/ttyACM1", "serial_number": "C"}) == ["/dev/ttyACM0", "/dev/ttyACM1"]
+
+
+def test_state_caches_the_port_but_not_the_calibration(monkeypatch, tmp_path):
+    ports = [port("/dev/ttyACM0", 0x2341, 0x804D, serial_number="A")]
+    monkeypatch.setattr(serial.tools.list_ports, "comports", lambda: ports)
+    state_file = str(tmp_path / "haply_state.json")
+    first = Physics(hardware_version=2, port=VirtualHaply(), state_file=state_file)
+    first.save_state("/dev/ttyACM0")
+    assert first.load_state() == {"port": "/dev/ttyACM0", "serial_number": "A"}
+    # An offset fixed in the code is used on the next start, the state file does not override it
+    calibration = {"actuators": physics.CALIBRATIONS[(2, False)]["actuators"],
+                   "encoders": [(1, physics.CCW, 240, 10752, 2), (2, physics.CW, -60, 10752, 1)]}
+    monkeypatch.setitem(physics.CALIBRATIONS, (2, False), calibration)
+    second = Physics(hardware_version=2, port=VirtualHaply(), state_file=state_file)
+    assert second.calibration == calibration
+    assert second.serial_ports(second.load_state()) == ["/dev/ttyACM0"]
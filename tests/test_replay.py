@@ -0,0 +1,38 @@
+import json
+import os
+from src.replay import replay
+from utils.bots import SqueezeAndCarry
+from utils.game_session import GameSession
+from utils.input_log import InputLog
+
+CONFIG = os.path.join(os.path.dirname(__file__), "..", "config")
+
+
+def test_replay_reproduces_a_recorded_session(tmp_path):
+    with open(os.path.join(CONFIG, "settings.json")) as f:
+        settings = json.load(f)
+    with open(os.path.join(CONFIG, "simulation.json")) as f:
+        cfg_simulation = json.load(f)
+    path = str(tmp_path / "session.log")
+    # Recorded as by the server, without the CSV files of write_data
+    session = GameSession(settings, cfg_simulation, seed=9, write_data=False)
+    session.input_log = InputLog(path, {"seed": session.seed, "settings": settings, "simulation": cfg_simulation})
+    bot = SqueezeAndCarry()
+    bot.reset(session)
+    session.start_object()
+    for k in range(1500):
+        if k == 600: # a trial cut short by the visualizer, the bot carries the asteroid of the next one
+            session.force_reset = True
+        for player_number, (x, y) in bot(session).items():
+            session.set_input(player_number, x, y, k)
+        session.tick()
+        if k == 600:
+            bot.reset(session)
+            session.start_object()
+    session.close()
+
+    result = replay(path, tolerance=0.0)
+    assert result["ticks"] == 1500
+    assert result["first_divergence"] is None and result["max_error"] == 0.0
+    assert (result["trials"], result["score"]) == (session.trials, session.score)
+    assert result["ball_position"] == tuple(session.ball.body.position)
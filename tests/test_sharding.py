@@ -0,0 +1,46 @@
+from queue import Queue
+from utils.rooms import Room
+from utils.sharding import Worker, WorkerPool, ROUTE_START
+
+
+def pool(n_workers, dt=0.01):
+    """WorkerPool with queue-only workers, no processes are forked."""
+    workers = WorkerPool.__new__(WorkerPool)
+    workers.dt = dt
+    workers.stats = Queue()
+    workers.workers = [Worker(worker_id, None, Queue()) for worker_id in range(n_workers)]
+    return workers
+
+
+def room(room_id):
+    new = Room(room_id)
+    new.players = {1: ("127.0.0.1", 5000 + 2 * room_id), 2: ("127.0.0.1", 5001 + 2 * room_id)}
+    return new
+
+
+def test_burst_is_spread_over_workers():
+    workers = pool(2)
+    assigned = [workers.assign(room(k)).worker_id for k in range(4)]
+    assert sorted(assigned) == [0, 0, 1, 1]
+    assert workers.workers[0].inbox.get_nowait()[0] == ROUTE_START
+
+
+def test_idle_rooms_still_count():
+    workers = pool(2)
+    workers.assign(room(0))
+    # The first report measures the room while it waits for its players
+    workers.stats.put((0, 1e-6, 1e-6, 1, 0))
+    workers.poll()
+    assert workers.assign(room(1)).worker_id == 1
+    assert workers.assign(room(2)).worker_id in (0, 1)
+    assert {len(worker.rooms) for worker in workers.workers} == {1, 2}
+
+
+def test_measured_load_wins_over_room_count():
+    workers = pool(2)
+    for k in range(2):
+        workers.assign(room(k))
+    workers.stats.put((0, 0.008, 0.009, 1, 0)) # a heavy room
+    workers.stats.put((1, 0.001, 0.001, 1, 0))
+    workers.poll()
+    assert [workers.assign(room(k)).worker_id for k in range(2, 5)] == [1, 1, 0]
@@ -0,0 +1,45 @@
+from utils import protocol
+from utils.snapshot_codec import SnapshotEncoder, SnapshotDecoder, HISTORY_SIZE, N_FIELDS
+
+
+def state(k):
+    values = [0] * N_FIELDS
+    values[0] = k * 0.01
+    values[5] = 100 + k % 50 # ball x
+    return values
+
+
+def test_delta_round_trip():
+    encoder, decoder = SnapshotEncoder(), SnapshotDecoder()
+    ack = protocol.NO_ACK
+    for k in range(200):
+        tick, values = decoder.decode(bytes(encoder.encode(k, state(k), ack)))
+        assert tick == k and values[5] == state(k)[5]
+        ack = tick
+    assert encoder.deltas > 0 and decoder.missing_baselines == 0
+
+
+def test_history_is_bounded_under_loss():
+    encoder, decoder = SnapshotEncoder(), SnapshotDecoder()
+    for k in range(10 * HISTORY_SIZE):
+        data = bytes(encoder.encode(k, state(k)))
+        if k % 3: # every third snapshot is lost
+            decoder.decode(data)
+    assert len(decoder.history) == HISTORY_SIZE
+    ticks = [entry[0] for entry in decoder.history if entry is not None]
+    assert min(ticks) > 7 * HISTORY_SIZE
+
+
+def delta(tick, base_tick):
+    """DELTA message without changed fields."""
+    return protocol.SNAPSHOT.pack(protocol.PROTOCOL_VERSION, protocol.MSG_DELTA, tick, base_tick, 0)
+
+
+def test_stale_baseline_is_missing():
+    encoder, decoder = SnapshotEncoder(), SnapshotDecoder()
+    for k in range(HISTORY_SIZE + 1):
+        decoder.decode(bytes(encoder.encode(k, state(k))))
+    assert decoder.decode(delta(HISTORY_SIZE + 1, HISTORY_SIZE))[1][5] == state(HISTORY_SIZE)[5]
+    # Tick 0 was overwritten by tick HISTORY_SIZE in its slot
+    assert decoder.decode(delta(HISTORY_SIZE + 2, 0)) is None
+    assert decoder.missing_baselines == 1
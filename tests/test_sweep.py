@@ -0,0 +1,67 @@
+import json
+import os
+import pytest
+from utils.batch import configure
+from utils.sweep import OUTCOMES, ResultCache, best_point, code_version, config_key, keys_without_effect, run_sweep
+
+CONFIG = os.path.join(os.path.dirname(__file__), "..", "config")
+RUN_ARGS = {"trials": 1, "policy": "idle", "policy_args": {}, "seed": 0, "timeout": 0.5}
+
+
+@pytest.fixture(scope="module")
+def configs():
+    with open(os.path.join(CONFIG, "settings.json")) as f:
+        settings = json.load(f)
+    with open(os.path.join(CONFIG, "simulation.json")) as f:
+        cfg_simulation = json.load(f)
+    return settings, cfg_simulation
+
+
+def result(success_rate, completion_time=10.0, crush_rate=0.0, overload_time=0.0):
+    return {"success_rate": success_rate, "completion_time": completion_time, "crush_rate": crush_rate,
+            "overload_time": overload_time, "max_overload_time": overload_time, "peak_device_force": 1.0}
+
+
+def test_keys_without_effect():
+    points = [{"crush_force_factor": c, "settings.haptic_device.force_scale": s} for c in (0.3, 0.6) for s in (3, 5)]
+    results = [result(0.5, crush_rate=0.2) if c == 0.3 else result(0.7) for c in (0.3, 0.6) for s in (3, 5)]
+    assert keys_without_effect(points, results) == ["settings.haptic_device.force_scale"]
+    assert set(OUTCOMES) <= set(results[0])
+
+
+def test_best_point_is_not_chosen_from_ties():
+    assert best_point([result(0.5), result(0.7, 12.0), result(0.7, 11.0)]) == 2
+    assert best_point([result(0.7), result(0.7), result(0.5)]) is None
+
+
+def test_result_cache_round_trip(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    assert cache.get("ab12") is None
+    cache.put("ab12", result(0.5))
+    assert cache.get("ab12") == result(0.5)
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert ResultCache(str(tmp_path)).get("ab12") == result(0.5) # on disk, not in memory
+
+
+def test_config_key_addresses_the_resolved_configuration(configs):
+    version = code_version()
+    assert version == code_version()
+    key = config_key(*configure(*configs, {"crush_force_factor": 0.5}), RUN_ARGS, version)
+    assert key == config_key(*configure(*configs, {"crush_force_factor": 0.5}), RUN_ARGS, version)
+    assert key != config_key(*configure(*configs, {"crush_force_factor": 0.4}), RUN_ARGS, version)
+    assert key != config_key(*configure(*configs, {"crush_force_factor": 0.5}), dict(RUN_ARGS, trials=2), version)
+    assert key != config_key(*configure(*configs, {"crush_force_factor": 0.5}), RUN_ARGS, "another version")
+
+
+def test_repeated_sweep_only_computes_new_points(configs, tmp_path):
+    cache = ResultCache(str(tmp_path))
+    run_args = {key: RUN_ARGS[key] for key in ("trials", "policy", "seed", "timeout")}
+    first = run_sweep(*configs, [{"object.mass": mass} for mass in (500, 1000)], workers=1, cache=cache, **run_args)
+    assert not any(r["cached"] for r in first)
+    computed = []
+    second = run_sweep(*configs, [{"object.mass": mass} for mass in (1000, 500, 2000)], workers=1, cache=cache,
+                       progress=lambda done, total: computed.append(total), **run_args)
+    assert [r["cached"] for r in second] == [True, True, False]
+    assert set(computed) == {1} # one point evaluated
+    assert {k: v for k, v in second[0].items() if k not in ("cached", "elapsed")} == \
+           {k: v for k, v in first[1].items() if k not in ("cached", "elapsed")}
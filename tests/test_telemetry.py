@@ -0,0 +1,35 @@
+import numpy as np
+from utils.telemetry import TelemetryRecorder
+
+ROW = ((1, 2), (3, 4), (1, 2), (3, 4), (0, 0), (0, 0), (0, 0), (0, 0), (400, 300), (0, 0), 50, (500, 300), 3, 0, False, False)
+
+
+def record(recorder, ticks):
+    for k in range(ticks):
+        recorder.record((k, k * 0.01) + ROW)
+
+
+def test_trial_files_hold_the_recorded_ticks(tmp_path):
+    recorder = TelemetryRecorder(str(tmp_path), chunk_size=64, max_ticks=1000)
+    recorder.start_trial(1)
+    record(recorder, 300)
+    recorder.start_trial(2)
+    record(recorder, 20)
+    recorder.close()
+    for trial, ticks in ((1, 300), (2, 20)):
+        data = np.load(tmp_path / f"trial_{trial:04d}.npy")
+        assert len(data) == ticks
+        np.testing.assert_array_equal(data["tick"], np.arange(ticks))
+        np.testing.assert_allclose(data["ball_position"][-1], (400, 300))
+
+
+def test_trial_started_again_is_not_truncated_while_recording(tmp_path):
+    # A forced reset starts the same trial again while the close of its first file is queued
+    recorder = TelemetryRecorder(str(tmp_path), chunk_size=256, max_ticks=8000)
+    recorder.start_trial(1)
+    record(recorder, 10)
+    recorder.start_trial(1)
+    record(recorder, 5000) # far past the length the first file is shrunk to
+    recorder.close()
+    data = np.load(tmp_path / "trial_0001.npy")
+    assert len(data) == 5000 and data["tick"][-1] == 4999
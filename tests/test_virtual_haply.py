@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+from utils.physics import Physics
+from utils.virtual_haply import VirtualHaply, hold_trajectory, circle_trajectory
+
+
+def held_device(position=(0.0, 0.08), **kwargs):
+    """A device held still by a stiff hand, the forces barely move the end effector between read and write."""
+    return VirtualHaply(hold_trajectory(position), hand_stiffness=1e5, hand_damping=200.0, **kwargs)
+
+
+@pytest.mark.parametrize("position", [(0.0, 0.08), (0.04, 0.1), (-0.05, 0.06)])
+def test_force_round_trip_through_physics(position):
+    device = held_device(position)
+    physics = Physics(hardware_version=2, port=device, state_file=None)
+    assert device.configured and device.replies > 0
+    for f in ([1.0, 0.0], [0.0, -2.0], [0.5, 0.5], [-1.5, 0.8]):
+        pE = physics.get_device_pos()[4] # the torques use the Jacobian of the position read
+        np.testing.assert_allclose(pE, device.position, atol=1e-5)
+        physics.update_force(list(f))
+        np.testing.assert_allclose(device.force, [f[0], -f[1]], atol=0.02) # screen axes, y is flipped for the device
+    physics.close()
+    np.testing.assert_allclose(device.force, [0.0, 0.0], atol=1e-9)
+
+
+def test_position_follows_the_trajectory():
+    device = VirtualHaply(circle_trajectory(period=1.0))
+    physics = Physics(hardware_version=2, port=device, state_file=None)
+    positions = []
+    for _ in range(200):
+        physics.update_force([0.0, 0.0])
+        positions.append(physics.get_device_pos()[4])
+    physics.close()
+    positions = np.array(positions)
+    assert np.ptp(positions[:, 0]) > 0.01 and np.ptp(positions[:, 1]) > 0.01
+    assert device.torque_messages == device.replies
+
+
+def test_recorded_forces():
+    device = held_device(record=True)
+    physics = Physics(hardware_version=2, port=device, state_file=None)
+    start = len(device.forces)
+    physics.get_device_pos()
+    physics.update_force([1.0, 0.0])
+    physics.close()
+    (t1, fx, fy), (t2, zx, zy) = device.forces[start:]
+    assert t2 >= t1 and fx == pytest.approx(1.0, abs=0.02) and (zx, zy) == (0.0, 0.0)
+
+
+@pytest.mark.parametrize("version", [2, 3])
+def test_reachable_workspace(version):
+    device = VirtualHaply(hardware_version=version)
+    reach = device.l1 + device.l2
+    for p in np.random.default_rng(0).uniform(-0.3, 0.3, (2000, 2)):
+        x, y = device.reachable(list(p))
+        assert np.hypot(x, y) < reach and np.hypot(x - device.d, y) < reach and y > device.l2 - device.l1
+        assert device.reachable([x, y]) == pytest.approx([x, y], abs=1e-12)
+    assert device.reachable([0.0, 0.08]) == [0.0, 0.08]
@@ -11,6 +11,7 @@ import math
 import sys
 from typing import List
 import array
+import threading
 
 
 class Actuator:
@@ -84,6 +85,11 @@ class Actuator:
 class Board:
     """Define Board system
 
+    Messages are packed and unpacked with precompiled little-endian struct codecs (the
+    board sends floats LSB first) into reusable buffers. With start_reader() a background
+    thread reads every reply of the board and keeps only the newest, so receive() returns
+    without waiting on the serial port.
+
     Returns:
         [type]: [description]
     """
@@ -95,11 +101,20 @@ class Board:
 
         Args:
             app (string): name of the app
-            port (string): com port
+            port (string or serial.Serial): com port, or an open serial-like object
             baud (int): rate
         """
         self.__applet = app
-        self.__port = serial.Serial(port, baud)
+        self.__port = serial.Serial(port, baud) if isinstance(port, str) else port
+        self.__tx_codecs = {}  # (len(bData), len(fData)) -> (codec, buffer)
+        self.__rx_codecs = {}  # expected -> (codec, buffer)
+        self.__reader = None
+        self.__reading = False
+        self.__sample = None  # (sequence, data) newest reply read by the reader thread
+        self.__read_seq = 0  # sequence of the newest reply returned by receive()
+        self.__first_sample = threading.Event()
+        self.samples = 0  # replies read by the reader thread
+        self.overwritten = 0  # replies replaced by a newer one before they were received
         self.__reset_board()
 
     def floatToBits(self,f):
@@ -130,45 +145,95 @@ class Board:
         val = self.bitsToFloat(temp)
         return val
 
-
+    def tx_codec(self, nBytes, nFloats):
+        """Codec and send buffer of a message with nBytes bytes and nFloats floats, compiled once."""
+        codec = self.__tx_codecs.get((nBytes, nFloats))
+        if codec is None:
+            # communication type, device ID, bytes, floats (LSB first, as float_to_bytes)
+            packer = struct.Struct('<BB%ds%df' % (nBytes, nFloats))
+            codec = self.__tx_codecs[(nBytes, nFloats)] = (packer, bytearray(packer.size))
+        return codec
+
+    def rx_codec(self, expected):
+        """Codec and receive buffer of a reply with expected floats, compiled once."""
+        codec = self.__rx_codecs.get(expected)
+        if codec is None:
+            # device ID, floats (LSB first, as bytes_to_float)
+            unpacker = struct.Struct('<B%df' % expected)
+            codec = self.__rx_codecs[expected] = (unpacker, bytearray(unpacker.size))
+        return codec
 
     def transmit(self, communicationType, deviceID, bData, fData):
-        outData = bytearray(2 + len(bData) + 4*len(fData))
-        segments = bytearray(4)
-
-        outData[0] = communicationType
-        outData[1] = deviceID
+        packer, outData = self.tx_codec(len(bData), len(fData))
         self.__deviceID = deviceID
-        outData[2:2+len(bData)] = bData
-        j = 2+len(bData)
-        # TODO: replace with a single pack
-        for i in range(0, len(fData)):
-            # store the floats into the bytearray one by one
-            segments = self.float_to_bytes(fData[i])#bytearray(struct.pack('!f', fData[i]))
-            outData[j:j+4] = segments
-            j = j+4
+        packer.pack_into(outData, 0, communicationType, deviceID, bytes(bData), *fData)
         wrote = self.__port.write(outData)
 
-    def receive(self, communicationType, deviceID, expected):
-        inData = bytearray(1+4*expected)
-        data = [None]*expected
-        inData = self.__port.read(1+4*expected)
-        if(inData[0] != deviceID):
+    def __read_reply(self, expected):
+        """Read one reply into the reusable buffer, returns its floats, None if the reader was stopped."""
+        unpacker, inData = self.rx_codec(expected)
+        view = memoryview(inData)
+        n = 0
+        while n < len(inData):
+            read = self.__port.readinto(view[n:])
+            if not read:
+                if self.__reader is not None and not self.__reading:
+                    return None
+                continue  # read timeout of the reader thread
+            n += read
+        values = unpacker.unpack_from(inData)
+        if(values[0] != self.__deviceID):
             sys.stderr.write("Error, another device expects this data!\n")
-        buf = inData[1:expected*4+1]
-        for i in range(0, expected):
-            data[i] = self.bytes_to_float(buf[i*4:i*4+4])
-        #data = struct.unpack('!'+str(expected)+'f', buf)
-        #print(expected)
-        #print(data)
+        return list(values[1:])
+
+    def receive(self, communicationType, deviceID, expected):
+        if self.__reader is None:
+            return self.__read_reply(expected)
+        # The reader thread keeps the newest reply, only the very first one is waited for
+        self.__first_sample.wait()
+        seq, data = self.__sample
+        self.__read_seq = seq
         return data
 
     def data_available(self):
+        if self.__reader is not None:
+            sample = self.__sample
+            return sample is not None and sample[0] > self.__read_seq
         available = False
         if(self.__port.in_waiting > 0):
             available = True
         return available
 
+    def start_reader(self, expected):
+        """Read every reply of expected floats in a background thread, receive() then returns the newest."""
+        if self.__reader is not None:
+            return
+        self.__port.timeout = 0.1  # lets the thread see stop_reader()
+        self.__reading = True
+        self.__reader = threading.Thread(target=self.__reader_loop, args=(expected,), name="haply reader", daemon=True)
+        self.__reader.start()
+
+    def stop_reader(self):
+        if self.__reader is None:
+            return
+        self.__reading = False
+        self.__reader.join()
+        self.__reader = None
+        self.__port.timeout = None
+
+    def __reader_loop(self, expected):
+        seq = 0
+        while self.__reading:
+            data = self.__read_reply(expected)
+            if data is None:
+                break
+            seq += 1
+            if self.__sample is not None and self.__sample[0] > self.__read_seq:
+                self.overwritten += 1
+            self.__sample = (seq, data)  # a single assignment, the reader of the slot always sees a whole reply
+            self.samples += 1
+            self.__first_sample.set()
+
     def __reset_board(self):
         communicationType = 0
         deviceID = 0
@@ -313,6 +378,9 @@ class Device:
     def __init__(self, deviceID, deviceLink):
         self.__deviceID = deviceID
         self.__deviceLink = deviceLink
+        # Port assignments of this device, the class attributes are shared by every Device
+        self.__actuatorPositions = bytearray([0, 0, 0, 0])
+        self.__encoderPositions = bytearray([0, 0, 0, 0])
 
     def add_actuator(self, actuator, rotation, port):
         error = False
@@ -516,12 +584,12 @@ class Device:
 
     def __actuator_assignment(self, actuator, port):
         if(self.__actuatorPositions[port - 1] > 0):
-            sys.stderr.println("warning, double check actuator port usage")
+            sys.stderr.write("warning, double check actuator port usage\n")
         self.__actuatorPositions[port-1] = actuator
 
     def __encoder_assignment(self, encoder, port):
         if(self.__encoderPositions[port - 1] > 0):
-            sys.stderr.println("warning, double check encoder port usage")
+            sys.stderr.write("warning, double check encoder port usage\n")
         self.__encoderPositions[port - 1] = encoder
 
     def device_read_data(self):
@@ -540,6 +608,10 @@ class Device:
                                 1].set_value(device_data[dataCount])
                 dataCount += 1
 
+    def device_start_reader(self):
+        """Read the device data in a background thread of the board, see Board.start_reader."""
+        self.__deviceLink.start_reader(self.__sensorsActive + self.__encodersActive)
+
     def device_read_request(self):
         self.__communicationType = 2
         pulses = bytearray(self.__pwmsActive)
@@ -746,4 +818,4 @@ class Pantograph(Mechanisms):
         return [self.__tau1, self.__tau2]
 
     def get_angle(self):
-        return [self.__th1, self.__th2]
\ No newline at end of file
+        return [self.__th1, self.__th2]
@@ -0,0 +1,52 @@
+from collections import OrderedDict
+import pygame
+
+class AssetManager:
+    """Images loaded once, converted to the display format, and their scaled variants in a bounded LRU cache.
+
+    Variants are always scaled from the original image, so they never lose quality, and
+    are keyed by (asset, size). The asteroid and blackhole sizes come from a small range
+    of radii, so the cache stays small and hits once every radius has been seen.
+    """
+    def __init__(self, max_variants=64):
+        self.max_variants = max_variants
+        self.images = {} # name -> original surface
+        self.converted = set() # names converted to the display format
+        self.variants = OrderedDict() # (name, size) -> scaled surface, least recently used first
+        self.hits = 0
+        self.misses = 0
+
+    def load(self, name, path):
+        """Load an image from disk, once, returns the original surface."""
+        if name not in self.images:
+            self.images[name] = pygame.image.load(path)
+        return self.images[name]
+
+    def get(self, name):
+        """Original image, converted to the display format once a display mode is set."""
+        image = self.images[name]
+        if name not in self.converted and pygame.display.get_surface() is not None:
+            image = self.images[name] = image.convert_alpha() if image.get_flags() & pygame.SRCALPHA else image.convert()
+            self.converted.add(name)
+        return image
+
+    def scaled(self, name, size):
+        """Image scaled to size (w, h), from the cache if it was scaled to that size before."""
+        key = (name, (int(size[0]), int(size[1])))
+        surface = self.variants.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.variants.move_to_end(key)
+            return surface
+        self.misses += 1
+        image = self.get(name)
+        surface = image if image.get_size() == key[1] else pygame.transform.scale(image, key[1])
+        self.variants[key] = surface
+        if len(self.variants) > self.max_variants:
+            self.variants.popitem(last=False)
+        return surface
+
+    def report(self):
+        lookups = self.hits + self.misses
+        return (f"{len(self.images)} images, {len(self.variants)} scaled variants, "
+                f"hit rate: {100 * self.hits / lookups if lookups else 0:.1f} % ({self.hits}/{lookups})")
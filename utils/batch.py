@@ -0,0 +1,97 @@
+import copy
+import math
+import time
+import multiprocessing
+import numpy as np
+from utils.game_session import GameSession
+from utils.bots import POLICIES
+
+def set_config_value(settings, cfg_simulation, key, value):
+    """Set a dotted key, e.g. "object.mass" in simulation.json or "settings.haptic_device.force_scale"."""
+    config = cfg_simulation
+    if key.startswith("settings."):
+        config, key = settings, key[len("settings."):]
+    *path, name = key.split(".")
+    for part in path:
+        config = config[part]
+    if name not in config:
+        raise ValueError(f"Unknown configuration key {key}")
+    config[name] = value
+
+def configure(settings, cfg_simulation, overrides):
+    """Copies of both configurations with the overrides applied."""
+    settings, cfg_simulation = copy.deepcopy(settings), copy.deepcopy(cfg_simulation)
+    for key, value in overrides.items():
+        set_config_value(settings, cfg_simulation, key, value)
+    return settings, cfg_simulation
+
+def run_trial(settings, cfg_simulation, policy, seed, timeout=30.0):
+    """Play one trial with a bot policy, returns (success, completion time, peak force, crushed, overload time).
+
+    crushed is True if the trial failed by the crush rule, the overload time is the longest
+    time (s) the contact force of a player stayed above the crush threshold.
+    """
+    session = GameSession(settings, cfg_simulation, seed=seed, write_data=False)
+    policy.reset(session)
+    session.start_object()
+    crush_force = session.max_force * session.crush_force_factor
+    peak_force = 0.0
+    overload, longest_overload = 0, 0 # ticks
+    max_ticks = int(timeout / session.dt)
+    width = session.screen_size[0]
+    ball = session.ball.body
+    while session.i < max_ticks and not (session.success or session.fail):
+        if not -session.ball.radius < ball.position[0] < width + session.ball.radius:
+            break # there are no side walls, an asteroid off the screen is lost
+        for player_number, (x, y) in policy(session).items():
+            session.set_input(player_number, x, y, session.i)
+        session.tick(state=False)
+        f1, f2 = session.f1, session.f2
+        force = max(math.hypot(f1[0], f1[1]), math.hypot(f2[0], f2[1]))
+        peak_force = max(peak_force, force)
+        overload = overload + 1 if force > crush_force else 0
+        longest_overload = max(longest_overload, overload)
+    completion_time = session.now() - session.start_time if session.success else None
+    return session.success, completion_time, peak_force, session.fail, longest_overload * session.dt
+
+def _run_trials(task):
+    """Trials of one worker process: (settings, cfg_simulation, policy, policy_args, seeds, timeout)."""
+    settings, cfg_simulation, policy, policy_args, seeds, timeout = task
+    bot = POLICIES[policy](**policy_args)
+    return [run_trial(settings, cfg_simulation, bot, seed, timeout) for seed in seeds]
+
+def run_config(settings, cfg_simulation, overrides=None, trials=100, policy="squeeze_and_carry", policy_args=None, seed=0, timeout=30.0, workers=1):
+    """Run a number of bot trials for one configuration, returns the summary as a dict.
+
+    With workers > 1 the trials are split over that many processes.
+    """
+    settings, cfg_simulation = configure(settings, cfg_simulation, overrides or {})
+    seeds = range(seed, seed + trials)
+    start = time.perf_counter()
+    if workers > 1 and trials > 1:
+        # Chunks of consecutive seeds, results come back in seed order
+        size = max(1, trials // (4 * workers))
+        tasks = [(settings, cfg_simulation, policy, policy_args or {}, seeds[k:k + size], timeout) for k in range(0, trials, size)]
+        with multiprocessing.Pool(workers) as pool:
+            outcomes = [outcome for outcomes in pool.map(_run_trials, tasks) for outcome in outcomes]
+    else:
+        outcomes = _run_trials((settings, cfg_simulation, policy, policy_args or {}, seeds, timeout))
+    elapsed = time.perf_counter() - start
+    successes = [outcome[0] for outcome in outcomes]
+    times = [outcome[1] for outcome in outcomes if outcome[0]]
+    peak_forces = [outcome[2] for outcome in outcomes]
+    overload_times = [outcome[4] for outcome in outcomes]
+    return {
+        "trials": trials,
+        "success_rate": sum(successes) / trials if trials else 0.0,
+        "completion_time": float(np.mean(times)) if times else None,
+        # Trials failed by the crush rule, and how long the force stayed above the crush threshold (s)
+        "crush_rate": sum(outcome[3] for outcome in outcomes) / trials if trials else 0.0,
+        "overload_time": float(np.mean(overload_times)) if overload_times else 0.0,
+        "max_overload_time": float(np.max(overload_times)) if overload_times else 0.0,
+        "peak_force": float(np.mean(peak_forces)) if peak_forces else 0.0,
+        "max_peak_force": float(np.max(peak_forces)) if peak_forces else 0.0,
+        # Peak force as rendered by the haptic device, scaled as in the client (N)
+        "peak_device_force": float(np.mean(peak_forces)) / cfg_simulation["max_force"] * settings["haptic_device"]["force_scale"] if peak_forces else 0.0,
+        "elapsed": elapsed,
+    }
@@ -0,0 +1,213 @@
+import math
+
+END_EFFECTOR_HALF_WIDTH = 10 # half of the 20 x 80 px end effector box
+END_EFFECTOR_HALF_HEIGHT = 40
+END_EFFECTOR_EDGE = 10 # closest the end effectors get to the top and bottom of the screen (px)
+ARM_REACH = 250 + 200 - 10 # link lengths of create_arm minus a margin, the arm cannot be fully stretched
+
+def _distance(a, b):
+    return math.hypot(a[0] - b[0], a[1] - b[1])
+
+def _segment_distance(point, a, b):
+    """Distance between point and the segment from a to b."""
+    dx, dy = b[0] - a[0], b[1] - a[1]
+    length = dx * dx + dy * dy
+    t = 0.0 if length == 0 else min(max(((point[0] - a[0]) * dx + (point[1] - a[1]) * dy) / length, 0.0), 1.0)
+    return math.hypot(a[0] + t * dx - point[0], a[1] + t * dy - point[1])
+
+def _touch(ball, radius, nx, ny):
+    """End effector center touching the asteroid so that pushing it moves the asteroid along (nx, ny).
+
+    The box is held upright: close to the axes a face touches the asteroid, otherwise a corner.
+    """
+    bx, by = ball
+    if abs(ny) < 0.1:
+        return bx - math.copysign(radius + END_EFFECTOR_HALF_WIDTH, nx), by
+    if abs(nx) < 0.1:
+        return bx, by - math.copysign(radius + END_EFFECTOR_HALF_HEIGHT, ny)
+    return (bx - nx * radius - math.copysign(END_EFFECTOR_HALF_WIDTH, nx),
+            by - ny * radius - math.copysign(END_EFFECTOR_HALF_HEIGHT, ny))
+
+
+class SqueezeAndCarry:
+    """Scripted policy for both players: push the asteroid to the blackhole, then squeeze it there.
+
+    The mouse joint moves an end effector at about follow * (distance to its mouse input) px/s,
+    with follow = (1 - error_bias^dt) / dt, so an input placed ahead of an end effector that
+    touches the asteroid sets the velocity the asteroid is pushed to. The asteroid floats
+    without friction and is carried by regulating its velocity: the desired velocity points at
+    the goal and slows down close to it, and one hand pushes from the side opposite to the
+    needed velocity change while the other waits beside the asteroid. Once the asteroid is
+    slow over the goal both hands hold it from the left and the right, if both reach it, and
+    press squeeze px into it when both touch. Pressing against the other hand loads the contact
+    up to the mouse joint max_force for as long as the hold lasts, which is what the crush
+    threshold is tested with; squeeze 0 holds without pressing. Hands travel around the
+    asteroid rather than through it, and each mouse input leads its end effector by at most
+    lead px, which bounds how fast the hands travel.
+    """
+    def __init__(self, squeeze=2.0, max_speed=40.0, gain=0.8, clearance=15.0, lead=40.0, hold_radius=45.0, hold_speed=40.0, tilt=20.0):
+        self.squeeze = squeeze # depth of the mouse inputs into the asteroid while holding (px)
+        self.max_speed = max_speed # fastest the asteroid is carried (px/s)
+        self.gain = gain # desired speed per px of distance to the goal (1/s)
+        self.clearance = clearance # distance kept from the asteroid by a hand that does not touch it (px)
+        self.lead = lead # largest distance between a mouse input and its end effector (px)
+        self.hold_radius = hold_radius # distance to the goal below which the asteroid is held (px)
+        self.hold_speed = hold_speed # fastest the asteroid may move to be held (px/s)
+        self.tilt = tilt # depth of the corners under or over the asteroid that steer it while held (px)
+        self.follow = 1.0 # end effector speed per px between it and its mouse input (1/s), set by reset()
+        self.height = 600 # screen height (px), set by reset()
+        self.bases = {} # arm bases of both players, set by reset()
+        self.pusher = None # player pushing the asteroid
+        self.holding = False
+        self.closed = False # both hands beside the asteroid while holding
+
+    def reset(self, session):
+        joint = session.mouse_joint1
+        self.follow = (1 - joint.error_bias ** session.dt) / session.dt
+        self.height = session.screen_size[1]
+        self.bases = {1: tuple(session.arm1_link1.position), 2: tuple(session.arm2_link1.position)} # the links turn around them
+        self.pusher = None
+        self.holding = False
+
+    def _reachable(self, point, base):
+        return (_distance(point, base) <= ARM_REACH
+                and END_EFFECTOR_EDGE <= point[1] <= self.height - END_EFFECTOR_EDGE)
+
+    def _steer(self, hand, base, target, lead=None):
+        """Mouse input moving an end effector straight toward its target, leading it by at most lead px."""
+        hx, hy = hand
+        dx, dy = target[0] - hx, target[1] - hy
+        length = math.hypot(dx, dy)
+        lead = self.lead if lead is None else lead
+        if length > lead:
+            dx, dy = dx * lead / length, dy * lead / length
+        # The arm cannot follow further than it reaches, a stretched arm is folded by pulling it sideways
+        ox, oy = hx + dx - base[0], hy + dy - base[1]
+        reach = math.hypot(ox, oy)
+        if reach > ARM_REACH:
+            ox, oy = ox * ARM_REACH / reach, oy * ARM_REACH / reach
+            if abs(hy - base[1]) < 1.0:
+                oy -= self.lead
+        y = min(max(base[1] + oy, END_EFFECTOR_EDGE), self.height - END_EFFECTOR_EDGE)
+        return int(round(base[0] + ox)), int(round(y))
+
+    def _go(self, hand, base, target, ball, radius, velocity):
+        """Mouse input moving an end effector to its target, around the asteroid if it is in the way.
+
+        The arm links collide with the asteroid too, so a hand goes around the half of the
+        asteroid that faces its base. Distances are measured with y scaled by
+        (radius + half width) / (radius + half height), where the upright box keeps clear of
+        the asteroid on a circle.
+        """
+        hx, hy = hand
+        bx, by = ball
+        scale = (radius + END_EFFECTOR_HALF_WIDTH) / (radius + END_EFFECTOR_HALF_HEIGHT)
+        px, py = hx - bx, (hy - by) * scale
+        dx, dy = target[0] - hx, (target[1] - hy) * scale
+        length = math.hypot(dx, dy)
+        if length > 1e-9:
+            along = min(max(-(px * dx + py * dy) / length, 0.0), length)
+            if math.hypot(px + dx * along / length, py + dy * along / length) < radius + END_EFFECTOR_HALF_WIDTH + 1:
+                # Along a circle around the asteroid, angles taken from the direction of the base
+                orbit = radius + END_EFFECTOR_HALF_WIDTH + self.clearance
+                ref = math.atan2((base[1] - by) * scale, base[0] - bx)
+                start = (math.atan2(py, px) - ref + math.pi) % (2 * math.pi) - math.pi
+                turn = (math.atan2(py + dy, px + dx) - ref + math.pi) % (2 * math.pi) - math.pi - start
+                if abs(start) > math.pi / 2: # behind the asteroid, only at the start of a trial: around its trailing side
+                    trailing = (math.atan2(-velocity[1] * scale, -velocity[0]) - ref + math.pi) % (2 * math.pi) - math.pi
+                    way = math.copysign(1.0, (trailing - start + math.pi) % (2 * math.pi) - math.pi)
+                    turn = (turn + math.pi) % (2 * math.pi) - math.pi
+                    if turn * way < 0:
+                        turn += way * 2 * math.pi
+                angle = ref + start + math.copysign(min(abs(turn), 0.5), turn)
+                target = bx + orbit * math.cos(angle), by + orbit * math.sin(angle) / scale
+        return self._steer(hand, base, target)
+
+    def __call__(self, session):
+        """Mouse positions of both players for the next tick, {player number: (x, y)}."""
+        shape = session.ball
+        radius = shape.radius
+        ball = bx, by = shape.body.position
+        vx, vy = shape.body.velocity
+        hands = {1: session.end_effector_shape1.body.position, 2: session.end_effector_shape2.body.position}
+        bases = self.bases
+        ex, ey = session.blackhole_x - bx, session.blackhole_y - by
+        distance = math.hypot(ex, ey)
+        # Velocity the asteroid should have, toward the goal and slower close to it
+        speed = min(self.max_speed, self.gain * distance) / distance if distance > 1e-9 else 0.0
+        wx, wy = ex * speed, ey * speed
+        contact = radius + END_EFFECTOR_HALF_WIDTH
+        sides = {1: (bx - contact, by), 2: (bx + contact, by)}
+        outside = {1: (sides[1][0] - self.clearance, by), 2: (sides[2][0] + self.clearance, by)}
+
+        # Hold from both sides once the asteroid is slow over the goal, if both hands reach it
+        if self.holding:
+            self.holding = (distance < session.error_margin and abs(vy) < 2 * self.hold_speed
+                            and all(self._reachable(sides[k], bases[k]) for k in sides))
+        elif distance < self.hold_radius and math.hypot(vx, vy) < self.hold_speed and all(self._reachable(sides[k], bases[k]) for k in sides):
+            self.holding = True
+            self.closed = False
+            self.pusher = None
+        if self.holding:
+            # Closed on both sides of the goal, slowly. Up and down the asteroid is steered with the
+            # corners: hands lower than it push it up, hands higher push it down.
+            self.closed = self.closed or all(_distance(hands[k], sides[k]) < 1.5 * self.clearance for k in sides)
+            dvy = wy - vy
+            lift = 0.0 if abs(dvy) < 2.0 else -math.copysign(self.tilt, dvy)
+            offset = 0.0 if lift == 0.0 else -math.copysign(END_EFFECTOR_HALF_HEIGHT, dvy)
+            reach = math.sqrt(radius**2 - lift**2) + END_EFFECTOR_HALF_WIDTH
+            shift = wx / self.follow # both hands move along at the velocity toward the goal
+            inputs = {}
+            for k, sign in ((1, -1.0), (2, 1.0)):
+                if not self.closed:
+                    inputs[k] = self._go(hands[k], bases[k], outside[k], ball, radius, (vx, vy))
+                else:
+                    inputs[k] = self._steer(hands[k], bases[k], (bx + sign * (reach - self.squeeze) + shift, by + offset + lift))
+            return inputs
+
+        # Velocity change needed, pushed by a hand from the opposite side
+        inputs = {}
+        cx, cy = wx - vx, wy - vy
+        magnitude = math.hypot(cx, cy)
+        if magnitude > (1.0 if self.pusher else 3.0):
+            nx, ny = cx / magnitude, cy / magnitude
+            touch = _touch(ball, radius, nx, ny)
+            # The arm links hit the asteroid too, a hand only pushes where its arm passes beside the asteroid
+            reachable = [k for k in bases if self._reachable(touch, bases[k])
+                         and _segment_distance(ball, bases[k], touch) > radius + 5]
+            if self.pusher not in reachable:
+                self.pusher = min(reachable, key=lambda k: _distance(hands[k], touch)) if reachable else None
+            k = self.pusher
+            if k is not None:
+                if _distance(hands[k], touch) > 1.5 * self.clearance:
+                    inputs[k] = self._go(hands[k], bases[k], (touch[0] - nx * self.clearance, touch[1] - ny * self.clearance), ball, radius, (vx, vy))
+                else:
+                    # Touching, the end effector moves at the desired velocity along n and takes the asteroid with it
+                    push = (wx * nx + wy * ny) / self.follow
+                    inputs[k] = self._steer(hands[k], bases[k], (touch[0] + nx * push, touch[1] + ny * push))
+        else:
+            self.pusher = None
+
+        # The other hand waits beside the asteroid, ready to hold it, or between its base and the asteroid
+        for k, base in bases.items():
+            if k in inputs:
+                continue
+            if self._reachable(outside[k], base):
+                inputs[k] = self._go(hands[k], base, outside[k], ball, radius, (vx, vy))
+            else:
+                gap = _distance(ball, base)
+                scale = max(0.0, min(ARM_REACH, gap - contact - 2 * self.clearance)) / gap if gap > 1e-9 else 0.0
+                inputs[k] = self._go(hands[k], base, (base[0] + (bx - base[0]) * scale, base[1] + (by - base[1]) * scale), ball, radius, (vx, vy))
+        return inputs
+
+
+class Idle:
+    """Both hands stay where they are, a baseline for the other policies."""
+    def reset(self, session):
+        pass
+
+    def __call__(self, session):
+        return {1: tuple(session.end_effector_shape1.body.position), 2: tuple(session.end_effector_shape2.body.position)}
+
+
+POLICIES = {"squeeze_and_carry": SqueezeAndCarry, "idle": Idle}
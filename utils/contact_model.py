@@ -0,0 +1,56 @@
+import math
+import time
+import numpy as np
+from utils.mailbox import LatestValue
+
+# Half size of the end effector box (px), see create_arm
+EFFECTOR_HALF_WIDTH = 10
+EFFECTOR_HALF_HEIGHT = 40
+
+class ContactModel:
+    """Local copy of the asteroid contact, so the haptic servo computes the contact force at its own rate.
+
+    The server sends the asteroid center, radius, velocity and a contact stiffness every tick
+    (MSG_CONTACT). The asteroid is moved on from the newest message with its velocity, at most
+    max_extrapolation seconds, and the penetration of the hand's effector box into it gives a
+    penalty force, in the convention of the server's force (pushing the hand out, game units).
+    blend() mixes it with the authoritative force that arrives once per snapshot, a full round
+    trip late: the local part keeps the contact stiff and smooth, the server part keeps the
+    effects the local model does not know about, such as the other player pushing.
+    """
+    def __init__(self, blend=0.8, max_extrapolation=0.1, max_force=None):
+        self.weight = blend # share of the local force
+        self.max_extrapolation = max_extrapolation
+        self.max_force = max_force
+        self.mailbox = LatestValue() # (center x, center y, radius, velocity x, velocity y, stiffness), written by the network thread
+
+    def force(self, hand, now=None):
+        """Penalty force on the hand at screen position hand, zero without contact or before the first message."""
+        slot = self.mailbox.peek()
+        if slot is None:
+            return np.zeros(2)
+        _, received, (x, y, radius, vx, vy, stiffness) = slot
+        age = min((time.perf_counter() if now is None else now) - received, self.max_extrapolation)
+        x += vx * age
+        y += vy * age
+        # Closest point of the effector box to the asteroid center
+        qx = min(max(x, hand[0] - EFFECTOR_HALF_WIDTH), hand[0] + EFFECTOR_HALF_WIDTH)
+        qy = min(max(y, hand[1] - EFFECTOR_HALF_HEIGHT), hand[1] + EFFECTOR_HALF_HEIGHT)
+        dx, dy = qx - x, qy - y
+        distance = math.hypot(dx, dy)
+        if distance >= radius:
+            return np.zeros(2)
+        if distance == 0: # center inside the box, push along the line between the centers
+            dx, dy = hand[0] - x, hand[1] - y
+            distance = math.hypot(dx, dy) or 1.0
+            depth = radius
+        else:
+            depth = radius - distance
+        magnitude = stiffness * depth
+        if self.max_force is not None:
+            magnitude = min(magnitude, self.max_force)
+        return np.array([dx, dy]) * (magnitude / distance)
+
+    def blend(self, local, authoritative):
+        return self.weight * local + (1 - self.weight) * authoritative
+
@@ -1,10 +1,12 @@
-def convert_pos(window_size, window_scale, vertical_offset, positions):
+def convert_pos(window_size, window_scale, vertical_offset, positions, whole_pixels=True):
     device_origin = (int(window_size[0]/2.0 + 0.038/2.0*window_scale),0)
     #invert x because of screen axes
     # 0---> +X
     # |
     # |
     # v +Y
-    x = int(device_origin[0]-positions[0]*window_scale)
-    y = int(device_origin[1]+positions[1]*window_scale)-vertical_offset
-    return [x,y]
\ No newline at end of file
+    x = device_origin[0]-positions[0]*window_scale
+    y = device_origin[1]+positions[1]*window_scale
+    if whole_pixels:
+        return [int(x),int(y)-vertical_offset]
+    return [x,y-vertical_offset] #sub-pixel position, e.g. for force rendering
\ No newline at end of file
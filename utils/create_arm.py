@@ -72,26 +72,21 @@ def create_arm(space, base_pos, length1, length2):
     return arm1, arm2, end_effector_shape
 
 def draw_arm_segment(screen, start_pos, end_pos, width, color):
-    # Calculate angle and length
+    """Draw a link as a filled polygon, the rectangle of the given width along the segment, and its joint.
+
+    Returns the rect covering what was drawn."""
     dx = end_pos[0] - start_pos[0]
     dy = end_pos[1] - start_pos[1]
-    angle = math.atan2(dy, dx)
-    length = math.sqrt(dx**2 + dy**2)
-    
-    # Create a surface for the rectangle
-    rect_surface = pygame.Surface((length, width), pygame.SRCALPHA)
-    pygame.draw.rect(rect_surface, color, (0, 0, length, width))
-    
-    # Rotate the surface
-    rotated_surface = pygame.transform.rotate(rect_surface, -math.degrees(angle))
-    
-    # Calculate position to blit
-    rect = rotated_surface.get_rect()
-    rect.center = (start_pos[0] + dx/2, start_pos[1] + dy/2)
-    
-    # Draw on screen
-    screen.blit(rotated_surface, rect)
+    length = math.hypot(dx, dy)
+    if length > 0:
+        # Half width normal to the segment
+        nx = -dy / length * width / 2
+        ny = dx / length * width / 2
+        link = pygame.draw.polygon(screen, color, ((start_pos[0] + nx, start_pos[1] + ny), (end_pos[0] + nx, end_pos[1] + ny),
+                                            (end_pos[0] - nx, end_pos[1] - ny), (start_pos[0] - nx, start_pos[1] - ny)))
     
     # Draw joint circles
     JOINT_RADIUS = 8
-    pygame.draw.circle(screen, color, (int(start_pos[0]), int(start_pos[1])), JOINT_RADIUS)
\ No newline at end of file
+    joint = pygame.draw.circle(screen, color, (int(start_pos[0]), int(start_pos[1])), JOINT_RADIUS)
+    return joint.union(link) if length > 0 else joint
+
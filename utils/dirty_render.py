@@ -0,0 +1,61 @@
+import pygame
+
+class DirtyRenderer:
+    """Redraw only the regions that changed: the moving elements of this frame and of the previous one.
+
+    The static scene (background and title) is kept in a cached surface. Each frame begin()
+    restores the regions drawn in the previous frame from that cache, the frame's drawing
+    calls register their rects with add(), and present() updates only those regions of the
+    display. After invalidate() the next frame is a full redraw, e.g. on a trial reset.
+    With enabled False every frame is a full redraw, as without this class.
+    """
+    def __init__(self, window, enabled=True):
+        self.window = window
+        self.enabled = enabled
+        self.background = None # cached static scene
+        self.previous = [] # rects drawn in the previous frame
+        self.current = []
+        self.full = True # next frame is a full redraw
+        self.full_frames = 0
+        self.partial_frames = 0
+        self.area = 0 # updated pixels of partial frames
+
+    def set_background(self, background):
+        """Static scene of the window size, a new one forces a full redraw."""
+        if background is not self.background:
+            self.background = background
+            self.full = True
+
+    def invalidate(self):
+        self.full = True
+
+    def begin(self):
+        """Draw the static scene, or only restore the regions drawn in the previous frame."""
+        if self.full or not self.enabled:
+            self.window.blit(self.background, (0, 0))
+        else:
+            for rect in self.previous:
+                self.window.blit(self.background, rect, rect)
+        self.current = []
+
+    def add(self, rect):
+        """Register the rect returned by a blit or draw call, None is ignored."""
+        if rect is not None:
+            self.current.append(rect)
+
+    def present(self):
+        if self.full or not self.enabled:
+            pygame.display.flip()
+            self.full_frames += 1
+            self.full = False
+        else:
+            rects = self.previous + self.current
+            pygame.display.update(rects)
+            self.partial_frames += 1
+            self.area += sum(rect.width * rect.height for rect in rects)
+        self.previous = self.current
+
+    def report(self):
+        window_area = self.window.get_width() * self.window.get_height()
+        mean = self.area / self.partial_frames / window_area if self.partial_frames else 0.0
+        return f"full redraws: {self.full_frames}, partial: {self.partial_frames}, mean updated area: {100 * mean:.1f} %"
@@ -0,0 +1,56 @@
+import time
+
+class FixedTimestep:
+    """Monotonic fixed-timestep accumulator used to pace the simulation loop."""
+    def __init__(self, dt, max_catchup_steps=10, clock=time.perf_counter, sleep=time.sleep):
+        self.dt = dt
+        self.max_catchup_steps = max_catchup_steps # ticks run back-to-back before the backlog is dropped
+        self.clock = clock
+        self.sleep = sleep
+        self.accumulator = 0.0
+        self.last_time = None
+        # Statistics
+        self.ticks = 0
+        self.late_ticks = 0 # ticks that started after their deadline
+        self.dropped_ticks = 0 # ticks skipped after a stall longer than max_catchup_steps
+        self.max_lag = 0.0 # largest backlog seen (s)
+
+    def wait(self):
+        """Block until the next tick is due. Returns True if more ticks are already due (loop is behind)."""
+        now = self.clock()
+        if self.last_time is None:
+            self.last_time = now
+            self.accumulator = self.dt
+        self.accumulator += now - self.last_time
+        self.last_time = now
+
+        # Not yet due, sleep for the remainder of the step
+        if self.accumulator < self.dt:
+            self.sleep(self.dt - self.accumulator)
+            now = self.clock()
+            self.accumulator += now - self.last_time
+            self.last_time = now
+
+        lag = self.accumulator - self.dt
+        if lag > self.max_lag:
+            self.max_lag = lag
+        if lag >= self.dt:
+            self.late_ticks += 1
+        # Stalled for too long, drop the backlog instead of spiralling
+        if self.accumulator > self.max_catchup_steps * self.dt:
+            dropped = int(self.accumulator / self.dt) - self.max_catchup_steps
+            self.dropped_ticks += dropped
+            self.accumulator -= dropped * self.dt
+
+        self.accumulator -= self.dt
+        self.ticks += 1
+        return self.accumulator >= self.dt
+
+    def report(self):
+        return (f"ticks: {self.ticks}, late: {self.late_ticks}, dropped: {self.dropped_ticks}, "
+                f"max lag: {self.max_lag * 1000:.1f} ms")
+
+    def reset_stats(self):
+        self.late_ticks = 0
+        self.dropped_ticks = 0
+        self.max_lag = 0.0
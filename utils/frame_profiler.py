@@ -0,0 +1,136 @@
+import csv
+import time
+from time import perf_counter_ns
+import pygame
+
+# Colors of the stages in the overlay, in drawing order from the bottom of a bar
+STAGE_COLORS = [(230, 25, 75), (60, 180, 75), (255, 225, 25), (0, 130, 200), (245, 130, 48), (145, 30, 180),
+                (70, 240, 240), (240, 50, 230), (210, 245, 60), (250, 190, 212), (0, 128, 128), (170, 110, 40)]
+IDLE = "wait" # stage spent waiting for the next frame, logged but not drawn as load
+
+class FrameProfiler:
+    """Time the stages of every client frame, draw them as a stacked-bar overlay and log them per frame.
+
+    Same use as TickProfiler: start() at the top of the frame, lap(stage) after each stage and
+    end() at the bottom. The overlay scrolls by one bar per frame, so drawing it costs a few
+    rectangles. With a log path every frame is written as a CSV row in ms, for offline comparison.
+    """
+    def __init__(self, stages, budget, overlay=False, log=None, history=120, bar_width=2, height=100):
+        self.stages = list(stages)
+        self.index = {stage: k for k, stage in enumerate(self.stages)}
+        self.budget = budget # frame time budget (s), drawn as a line at half the overlay height
+        self.enabled = overlay or bool(log) # timing runs while the overlay is shown or while logging
+        self.overlay = overlay
+        self.history = history
+        self.bar_width = bar_width
+        self.height = height
+        self.scale = height / (2 * budget * 1e9) # px per ns
+        self.times = [0] * len(self.stages) # current frame (ns)
+        self.sums = [0] * len(self.stages) # since the last legend update (ns)
+        self.frames = 0
+        self.frame = 0
+        self.last = 0
+        self.tick_start = 0
+        self.graph = None
+        self.legend = None
+        self.last_legend = 0.0
+        self.log_file = None
+        self.writer = None
+        if log:
+            self.log_file = open(log, "w", newline="")
+            self.writer = csv.writer(self.log_file)
+            self.writer.writerow(["frame", "time"] + self.stages + ["total"])
+
+    def toggle_overlay(self):
+        """Show or hide the overlay."""
+        self.overlay = not self.overlay
+        self.enabled = self.overlay or self.writer is not None
+        self.tick_start = 0
+        return self.overlay
+
+    def start(self):
+        if not self.enabled:
+            return
+        self.last = self.tick_start = perf_counter_ns()
+
+    def lap(self, stage):
+        """Attribute the time since the previous mark to a stage."""
+        if not self.tick_start:
+            return
+        now = perf_counter_ns()
+        self.times[self.index[stage]] += now - self.last
+        self.last = now
+
+    def end(self):
+        if not self.tick_start:
+            self.frame += 1
+            return
+        times = self.times
+        if self.writer is not None:
+            self.writer.writerow([self.frame, f"{time.perf_counter():.6f}"] + [f"{t / 1e6:.3f}" for t in times]
+                                 + [f"{(self.last - self.tick_start) / 1e6:.3f}"])
+        if self.overlay:
+            self._add_bar(times)
+            for k, t in enumerate(times):
+                self.sums[k] += t
+            self.frames += 1
+        self.times = [0] * len(self.stages)
+        self.tick_start = 0
+        self.frame += 1
+
+    def _add_bar(self, times):
+        if self.graph is None:
+            self.graph = pygame.Surface((self.history * self.bar_width, self.height))
+            self.graph.fill((0, 0, 0))
+        graph = self.graph
+        graph.scroll(-self.bar_width, 0)
+        x = graph.get_width() - self.bar_width
+        graph.fill((0, 0, 0), (x, 0, self.bar_width, self.height))
+        y = self.height
+        for k, t in enumerate(times):
+            if self.stages[k] == IDLE or not t:
+                continue
+            h = t * self.scale
+            if h < 1 and y > 0: # keep short stages visible
+                h = 1
+            top = max(0.0, y - h)
+            graph.fill(STAGE_COLORS[k % len(STAGE_COLORS)], (x, int(top), self.bar_width, int(y) - int(top)))
+            y = top
+        graph.fill((255, 255, 255), (x, self.height // 2, self.bar_width, 1)) # budget line
+
+    def _render_legend(self, font):
+        frames = max(1, self.frames)
+        lines = [font.render(f"budget {self.budget * 1000:.1f} ms", True, (255, 255, 255))]
+        for k, stage in enumerate(self.stages):
+            lines.append(font.render(f"{stage} {self.sums[k] / frames / 1e6:.2f} ms", True, STAGE_COLORS[k % len(STAGE_COLORS)]))
+        width = max(line.get_width() for line in lines)
+        legend = pygame.Surface((width + 8, sum(line.get_height() for line in lines) + 4))
+        y = 2
+        for line in lines:
+            legend.blit(line, (4, y))
+            y += line.get_height()
+        self.legend = legend
+        self.sums = [0] * len(self.stages)
+        self.frames = 0
+
+    def draw(self, window, font, position=None):
+        """Blit the overlay, bottom right unless a position is given, returns its rect (None if hidden).
+
+        The legend shows the mean stage times, updated twice a second."""
+        if not self.overlay or self.graph is None:
+            return None
+        now = time.perf_counter()
+        if self.legend is None or now - self.last_legend >= 0.5:
+            self._render_legend(font)
+            self.last_legend = now
+        width = self.graph.get_width() + self.legend.get_width()
+        height = max(self.height, self.legend.get_height())
+        if position is None:
+            position = (window.get_width() - width - 10, window.get_height() - height - 10)
+        graph = window.blit(self.graph, (position[0], position[1] + height - self.height))
+        return graph.union(window.blit(self.legend, (position[0] + self.graph.get_width(), position[1] + height - self.legend.get_height())))
+
+    def close(self):
+        if self.log_file is not None:
+            self.log_file.close()
+            self.log_file = self.writer = None
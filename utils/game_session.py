@@ -0,0 +1,363 @@
+import math
+import numpy as np
+import os, time, random
+import pymunk
+from utils.post_collision import post_collision, ensure_no_overlap
+from utils.create_arm import create_arm
+from utils.pymunk_simple_objects import create_ball, create_static_wall
+from utils.remake_objects import remake_blackhole
+from utils.append_to_csv import append_to_csv
+from utils.telemetry import TelemetryRecorder
+from utils.input_log import InputLog, EVENT_START_OBJECT, EVENT_FORCE_RESET, EVENT_SUCCESS, EVENT_FAIL
+from utils.profiler import TickProfiler
+from utils import protocol
+
+# Collision filters
+WALL_CATEGORY = 0b001
+BALL_CATEGORY = 0b010
+ARM_CATEGORY = 0b100
+LINK_CATEGORY = 0b1000
+LINK_MASK = 0b0000
+WALL_MASK = BALL_CATEGORY
+BALL_MASK = WALL_CATEGORY | ARM_CATEGORY
+ARM_MASK = BALL_CATEGORY
+
+# Collision types
+circle1_type = 1
+circle2_type = 2
+ball_type = 3
+
+class GameSession:
+    """One two-player game: its own pymunk space, arms, collision handlers and trial counters.
+
+    The session is deterministic: random trials come from a seeded generator per trial and the
+    trial timers run on simulation time, so the same inputs always give the same game.
+    With write_data False no CSV, telemetry or input log files are written (used for replays).
+    The phases of a tick are timed by profiler, shared with the loop running the session.
+    """
+    def __init__(self, settings, cfg_simulation, csv_prefix="", seed=None, write_data=True, profiler=None):
+        self.screen_size = [settings['screen_size']['width'], settings['screen_size']['height']]
+        self.dt = cfg_simulation['timeStep'] # simulation step time
+        self.error_margin = cfg_simulation["error_margin"]
+        self.max_force = cfg_simulation["max_force"]
+        self.crush_force_factor = cfg_simulation["crush_force_factor"]
+        self.contact_stiffness = settings["server"]["contact_model"]["stiffness"] # force per px of penetration
+        self.trial_version = settings["server"]["trial_version"]
+        self.debug = settings["server"]["debug"]
+        self.csv_prefix = csv_prefix # data files of this session, empty for the first room
+        self.write_data = write_data
+        self.profiler = profiler if profiler is not None else TickProfiler() # disabled unless given
+        if seed is None:
+            seed = settings["server"]["seed"]
+        if seed is None:
+            seed = random.SystemRandom().randrange(2**32)
+        self.seed = seed
+        self.trial_index = 0 # every new asteroid and goal, including forced resets
+        self.rng = self._trial_rng()
+        xc, yc = self.screen_size[0] // 2, self.screen_size[1] // 2 # window center
+
+        # initial conditions
+        self.t = 0.0 # time
+        self.pm = {1: np.zeros(2), 2: np.zeros(2)} # mouse position of each player, updated in place
+        self.input_seq = {1: protocol.NO_ACK, 2: protocol.NO_ACK} # newest input sequence applied
+        self.f1 = np.zeros(2) # endpoint force player 1
+        self.f2 = np.zeros(2) # endpoint force player 2
+        self.i = 0 # tick counter
+        self.score = 0
+
+        # Pymunk setup
+        self.space = space = pymunk.Space()
+        space.gravity = (0, int(100 * cfg_simulation['gravity']))
+
+        self.init_object_pos = list(np.array(self.screen_size) * np.array(cfg_simulation['object']['init_position']))
+        self.object_mass = cfg_simulation['object']['mass']
+
+        self.player_collisions = {
+            player_number: {"position": (0, 0), "normal": (0, 0), "impulse": (0, 0), "time": 0, "active": False}
+            for player_number in (1, 2)
+        }
+
+        self.ball = create_ball(space, self.init_object_pos, mass=self.object_mass, radius=self.rng.randint(30, 70))
+        self.floor = create_static_wall(space, (0, self.screen_size[1]), (self.screen_size[0], self.screen_size[1]), category=WALL_CATEGORY, mask=WALL_MASK)
+        self.ceiling = create_static_wall(space, (0, 0), (self.screen_size[0], 0), category=WALL_CATEGORY, mask=WALL_MASK)
+        self.arm1_link1, self.arm1_link2, self.end_effector_shape1 = create_arm(space, (xc-350, yc), 250, 200)
+        self.arm2_link1, self.arm2_link2, self.end_effector_shape2 = create_arm(space, (xc+350, yc), 250, 200)
+
+        # Create mouse circles
+        self.end_effector_shape1.color = (255, 0, 0, 255)
+        self.mouse_body1 = pymunk.Body(body_type=pymunk.Body.KINEMATIC)
+        self.mouse_joint1 = pymunk.PivotJoint(self.arm1_link2, self.mouse_body1, (200, 0), (0, 0))
+        self.mouse_joint1.max_force = cfg_simulation["mouse_joint"]["max_force"]  # the force of following
+        self.mouse_joint1.error_bias = cfg_simulation["mouse_joint"]["error_bias"]   # the smoothness of following
+        space.add(self.mouse_body1, self.mouse_joint1)
+
+        self.end_effector_shape2.color = (255, 255, 0, 0)
+        self.mouse_body2 = pymunk.Body(body_type=pymunk.Body.KINEMATIC)
+        self.mouse_joint2 = pymunk.PivotJoint(self.arm2_link2, self.mouse_body2, (200, 0), (0, 0))
+        self.mouse_joint2.max_force = cfg_simulation["mouse_joint"]["max_force"]  # the force of following
+        self.mouse_joint2.error_bias = cfg_simulation["mouse_joint"]["error_bias"]   # the smoothness of following
+        space.add(self.mouse_body2, self.mouse_joint2)
+
+        self.end_effector_shape1.filter = pymunk.ShapeFilter(categories=ARM_CATEGORY, mask=ARM_MASK)
+        self.end_effector_shape2.filter = pymunk.ShapeFilter(categories=ARM_CATEGORY, mask=ARM_MASK)
+        # Assign collision filters to the links
+        self.arm1_link1.filter = pymunk.ShapeFilter(categories=LINK_CATEGORY, mask=LINK_MASK)
+        self.arm1_link2.filter = pymunk.ShapeFilter(categories=LINK_CATEGORY, mask=LINK_MASK)
+        self.arm2_link1.filter = pymunk.ShapeFilter(categories=LINK_CATEGORY, mask=LINK_MASK)
+        self.arm2_link2.filter = pymunk.ShapeFilter(categories=LINK_CATEGORY, mask=LINK_MASK)
+
+        # Assign these types to your shapes
+        self.end_effector_shape1.collision_type = circle1_type
+        self.end_effector_shape2.collision_type = circle2_type
+        self._setup_ball()
+
+        # Create a collision handler, the callback writes into this session's collision data
+        self.handler1 = space.add_collision_handler(circle1_type, ball_type)
+        self.handler1.post_solve = post_collision
+        self.handler1.data["player_collisions"] = self.player_collisions
+        self.handler2 = space.add_collision_handler(circle2_type, ball_type)
+        self.handler2.post_solve = post_collision
+        self.handler2.data["player_collisions"] = self.player_collisions
+
+        # Initial impulse
+        self.initial_impulse = pymunk.Vec2d(cfg_simulation['object']['init_impulse']["x"], cfg_simulation['object']['init_impulse']["y"])
+
+        # initialize variables
+        self.fail = False
+        self.success = False
+        self.reset_required = False
+        self.force_reset = False
+        self.high_force_start_time = None
+        self.force_threshold_time = 1
+        self.timer = 3
+        self.trials = 1
+        self.success_time = 0
+        self.blackhole_x, self.blackhole_y = remake_blackhole(self.screen_size, rng=self.rng)
+        self.start_time = self.now()
+        self.last_timer_update = self.now()
+        self.events = 0 # EVENT_START_OBJECT if start_object was called since the last tick
+
+        # Tick telemetry, one file per trial
+        self.recorder = None
+        cfg_telemetry = settings["server"]["telemetry"]
+        if cfg_telemetry["enabled"] and write_data:
+            directory = os.path.join(os.path.dirname(__file__), "..", cfg_telemetry["directory"])
+            self.recorder = TelemetryRecorder(directory, prefix=csv_prefix, chunk_size=cfg_telemetry["chunk_size"], max_ticks=cfg_telemetry["max_ticks"])
+            self.recorder.start_trial(self.trials)
+
+        # Input log for replays, one file per session
+        self.input_log = None
+        cfg_replay = settings["server"]["replay"]
+        if cfg_replay["enabled"] and write_data:
+            directory = os.path.join(os.path.dirname(__file__), "..", cfg_replay["directory"])
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f"{csv_prefix}session_{time.strftime('%Y%m%d_%H%M%S')}_{self.seed}.log")
+            self.input_log = InputLog(path, {"seed": self.seed, "settings": settings, "simulation": cfg_simulation})
+
+    def _trial_rng(self):
+        return random.Random(f"{self.seed}:{self.trial_index}")
+
+    def now(self):
+        """Simulation time (s), used for all trial timers."""
+        return self.i * self.dt
+
+    def _setup_ball(self):
+        self.ball.filter = pymunk.ShapeFilter(categories=BALL_CATEGORY, mask=BALL_MASK)
+        self.ball.collision_type = ball_type
+
+    def _new_trial(self):
+        """Move the goal and replace the asteroid with a new random one."""
+        self.trial_index += 1
+        self.rng = self._trial_rng()
+        self.start_time = self.now()
+        self.success = False
+        self.fail = False
+        self.blackhole_x, self.blackhole_y = remake_blackhole(self.screen_size, rng=self.rng)
+        self.space.remove(self.ball.body, self.ball)
+        self.ball = create_ball(self.space, self.init_object_pos, mass=self.object_mass, radius=self.rng.randint(30, 70))
+        self._setup_ball()
+        self.reset_required = False
+        self.force_reset = False
+        self.high_force_start_time = None
+        if self.recorder is not None:
+            self.recorder.start_trial(self.trials)
+        if self.input_log is not None:
+            self.input_log.flush()
+
+    def close(self):
+        """Write the telemetry of the running trial and the input log."""
+        if self.recorder is not None:
+            self.recorder.close()
+        if self.input_log is not None:
+            self.input_log.close()
+
+    def set_input(self, player_number, x, y, seq):
+        pm = self.pm[player_number]
+        pm[0], pm[1] = x, y
+        self.input_seq[player_number] = seq
+
+    def start_object(self):
+        """Give the asteroid its initial velocity."""
+        self.ball.body.velocity = self.initial_impulse
+        self.events |= EVENT_START_OBJECT
+
+    def tick(self, state=True):
+        """Advance the game by one time step, returns the STATE field values sent to the clients.
+
+        With state False nothing is returned, for runs without clients (batch trials).
+        """
+        profiler = self.profiler
+        ball = self.ball
+        p1 = self.pm[1]
+        p2 = self.pm[2]
+        # Flags set from outside since the last tick, logged so a replay can set them again
+        events = (self.events | EVENT_FORCE_RESET * self.force_reset
+                  | EVENT_SUCCESS * self.success | EVENT_FAIL * self.fail)
+        self.events = 0
+        # Create random goal position
+        if self.reset_required and self.now() - self.success_time >= 1 and not self.trial_version:
+            self._new_trial()
+            ball = self.ball
+        if self.force_reset:
+            self._new_trial()
+            ball = self.ball
+
+        # Update circle for mouse position
+        self.mouse_body1.position = tuple(p1)
+        self.mouse_body2.position = tuple(p2)
+
+        # Update circle for mouse position
+        overlap1 = ensure_no_overlap(self.end_effector_shape1, ball)
+        overlap2 = ensure_no_overlap(self.end_effector_shape2, ball)
+        if overlap1:
+            p1 = np.array(self.end_effector_shape1.body.position)
+        if overlap2:
+            p2 = np.array(self.end_effector_shape2.body.position)
+
+        impulse1 = pymunk.Vec2d(0, 0)  # Zero vector for player 1
+        impulse2 = pymunk.Vec2d(0, 0)  # Zero vector for player 2
+        # For player 1
+        collision = self.player_collisions[1]
+        if collision["active"] and not collision["processed"]:
+            impulse1 = collision["impulse"]
+            if self.debug: print(f"Player 1 collision impulse: {impulse1}")
+            # Mark as processed so it doesn't get used again
+            collision["processed"] = True
+        # For player 2
+        collision = self.player_collisions[2]
+        if collision["active"] and not collision["processed"]:
+            impulse2 = collision["impulse"]
+            if self.debug: print(f"Player 2 collision impulse: {impulse2}")
+            collision["processed"] = True
+
+        self.f1 = f1 = np.array([impulse1[0], impulse1[1]]) / self.dt
+        self.f2 = f2 = np.array([impulse2[0], impulse2[1]]) / self.dt
+        profiler.lap("collisions")
+
+        state_values = None
+        if state:
+            # Get positions
+            arm1_link1_x, arm1_link1_y = self.arm1_link1.position
+            arm1_link2_x, arm1_link2_y = self.arm1_link2.position
+            arm2_link1_x, arm2_link1_y = self.arm2_link1.position
+            arm2_link2_x, arm2_link2_y = self.arm2_link2.position
+            # Get end effector positions
+            end_effector1_position_x, end_effector1_position_y = self.end_effector_shape1.body.position
+            end_effector2_position_x, end_effector2_position_y = self.end_effector_shape2.body.position
+
+            # State sent to clients
+            state_values = (
+                self.t,
+                int(p1[0]), int(p1[1]),
+                int(p2[0]), int(p2[1]),
+                int(ball.body.position[0]), int(ball.body.position[1]),
+                int(ball.radius),
+                int(self.blackhole_x), int(self.blackhole_y),
+                self.score, self.success, self.fail, self.timer,
+                int(f1[0]), int(f1[1]),
+                int(f2[0]), int(f2[1]),
+                float(arm1_link1_x), float(arm1_link1_y),
+                float(arm1_link2_x), float(arm1_link2_y),
+                float(arm2_link1_x), float(arm2_link1_y),
+                float(arm2_link2_x), float(arm2_link2_y),
+                float(end_effector1_position_x), float(end_effector1_position_y),
+                float(end_effector2_position_x), float(end_effector2_position_y),
+                self.input_seq[1], self.input_seq[2]
+            )
+        if self.recorder is not None:
+            self.recorder.record((
+                self.i, self.now(),
+                self.pm[1], self.pm[2], p1, p2, f1, f2,
+                impulse1, impulse2,
+                ball.body.position, ball.body.velocity, ball.radius,
+                (self.blackhole_x, self.blackhole_y),
+                self.timer, self.score, self.success, self.fail
+            ))
+        profiler.lap("state")
+
+        # Success/Fail conditions
+        if self.success and not self.reset_required:
+            self.success_time = self.now()
+            self.reset_required = True
+            self.score += 1
+            self.timer = 3
+            self.force_threshold_time = 5
+            if self.write_data:
+                append_to_csv(1, filename=self.csv_prefix + "succes_rate.csv")
+                append_to_csv(self.now() - self.start_time, filename=self.csv_prefix + "times.csv")
+                append_to_csv(self.trials, filename=self.csv_prefix + "trials.csv")
+            self.trials += 1
+
+        if self.fail and not self.reset_required:
+            self.success_time = self.now()
+            self.reset_required = True
+            self.timer = 3
+            self.force_threshold_time = 5
+            if self.write_data:
+                append_to_csv(0, filename=self.csv_prefix + "succes_rate.csv")
+                append_to_csv(self.trials, filename=self.csv_prefix + "trials.csv")
+                append_to_csv(0, filename=self.csv_prefix + "times.csv")
+            self.trials += 1
+
+        # timer for goal position
+        position_asteroid = ball.body.position
+        if not self.reset_required:
+            if (abs(position_asteroid[0] - self.blackhole_x) <= self.error_margin and
+                abs(position_asteroid[1] - self.blackhole_y) <= self.error_margin):
+                # Check if 1 second has passed since the last timer update
+                current_time = self.now()
+                if current_time - self.last_timer_update >= 1 and self.timer > 0:
+                    self.timer -= 1
+                    self.last_timer_update = current_time  # Update the last timer update time
+                if self.timer == 0:
+                    self.success = True
+            else:
+                self.timer = 3
+                self.last_timer_update = self.now()
+
+        # Check if force exceeds threshold
+        crush_force = self.max_force*self.crush_force_factor
+        if math.hypot(f1[0], f1[1]) > crush_force or math.hypot(f2[0], f2[1]) > crush_force:
+            # Start/continue counting time
+            if self.high_force_start_time is None:
+                self.high_force_start_time = self.now()
+            # Check if enough time has passed
+            if self.now() - self.high_force_start_time >= self.force_threshold_time:
+                self.fail = True
+        else:
+            # Reset timer when force is below threshold
+            self.high_force_start_time = None
+        profiler.lap("checks")
+
+        self.space.step(self.dt)
+        if self.input_log is not None:
+            self.input_log.write(self.pm[1], self.pm[2], events, ball.body.position)
+        profiler.lap("step")
+        self.i += 1
+        return state_values
+
+    def contact_values(self):
+        """CONTACT field values: the asteroid after the last step, for the clients' local force rendering."""
+        body = self.ball.body
+        return (body.position[0], body.position[1], self.ball.radius,
+                body.velocity[0], body.velocity[1], self.contact_stiffness)
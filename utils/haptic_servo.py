@@ -0,0 +1,106 @@
+import threading
+import time
+from time import perf_counter_ns
+import numpy as np
+from utils.mailbox import LatestValue
+from utils.profiler import Histogram
+
+class HapticServo:
+    """Read the haptic device and write its force at a fixed high rate, in a thread of its own.
+
+    The render and network loops never touch the device: they put the newest force target
+    (N, screen axes) in the force slot and read the newest pantograph points from the position
+    slot, both LatestValue mailboxes, so neither side ever waits for the other. Deadlines are
+    absolute, a late iteration is followed by a shorter sleep instead of drifting, and the
+    periods are recorded to report the achieved rate and the jitter.
+    With render_force(device position, force target), the force written is computed every
+    iteration from the newest position, e.g. from a local contact model (see ContactModel).
+    """
+    def __init__(self, physics, rate=1000, report_interval=5.0, DEBUG=False, render_force=None):
+        self.physics = physics
+        self.render_force = render_force
+        self.rate = rate
+        self.period = int(1e9 / rate) # ns
+        self.report_interval = report_interval
+        self.DEBUG = DEBUG
+        self.force = LatestValue() # force target, written by the render loop
+        self.position = LatestValue() # (pA0, pB0, pA, pB, pE), written by the servo
+        self.periods = Histogram() # ns between iterations since the last report
+        self.jitter = Histogram() # ns of deviation from the period
+        self.iterations = 0
+        self.reads = 0 # iterations with fresh device data
+        self.overruns = 0 # iterations that started a full period late
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name="haptic servo", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """Stop the thread, the device keeps the last force until it is released by the caller."""
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def set_force(self, force):
+        self.force.put(np.array(force, dtype=float))
+
+    def get_position(self):
+        """Newest pantograph points, None until the device has been read once."""
+        slot = self.position.peek()
+        return None if slot is None else slot[2]
+
+    def step(self):
+        """One servo iteration: device read if data is ready, then the newest force is written."""
+        physics = self.physics
+        if physics.haplyBoard.data_available():
+            self.position.put(physics.get_device_pos())
+            self.reads += 1
+        slot = self.force.peek()
+        force = np.zeros(2) if slot is None else slot[2]
+        if self.render_force is not None:
+            position = self.position.peek()
+            if position is not None:
+                force = self.render_force(position[2], force)
+        physics.write_force(force)
+
+    def run(self):
+        period = self.period
+        deadline = perf_counter_ns()
+        last = 0
+        last_report = time.perf_counter()
+        while self.running:
+            now = perf_counter_ns()
+            if last:
+                elapsed = now - last
+                self.periods.record(elapsed)
+                self.jitter.record(abs(elapsed - period))
+            last = now
+            self.step()
+            self.iterations += 1
+            deadline += period
+            now = perf_counter_ns()
+            if now >= deadline + period: # too far behind, restart the schedule from now
+                self.overruns += 1
+                deadline = now
+            elif now < deadline:
+                time.sleep((deadline - now) / 1e9)
+            if self.report_interval and time.perf_counter() - last_report >= self.report_interval:
+                if self.DEBUG: print(self.report())
+                self.periods = Histogram()
+                self.jitter = Histogram()
+                last_report = time.perf_counter()
+
+    def achieved_rate(self):
+        """Iterations per second over the current report window."""
+        return 1e9 * self.periods.count / self.periods.total if self.periods.total else 0.0
+
+    def report(self):
+        jitter = self.jitter.summary()
+        return (f"Haptic servo: {self.achieved_rate():.0f} Hz (target {self.rate} Hz), "
+                f"jitter mean {jitter['mean']:.0f} us p99 {jitter['p99']:.0f} us max {jitter['max']:.0f} us, "
+                f"overruns: {self.overruns}, reads: {self.reads}/{self.iterations}")
@@ -0,0 +1,77 @@
+import pygame
+
+class CachedText:
+    """A text that is rendered again only when it changes."""
+    def __init__(self, font, color, background=None):
+        self.font = font
+        self.color = color
+        self.background = background
+        self.text = None
+        self.surface = None
+        self.renders = 0
+
+    def render(self, text):
+        if text != self.text:
+            self.surface = self.font.render(text, True, self.color, self.background)
+            self.text = text
+            self.renders += 1
+        return self.surface
+
+    def draw(self, surface, position, text):
+        """Blit the text, returns its rect."""
+        return surface.blit(self.render(text), position)
+
+
+class GlyphAtlas:
+    """Pre-rendered glyphs of one font and color, numbers are composed by placing them side by side.
+
+    Digits of a font have the same advance in most fonts, so composing them loses no kerning.
+    Other characters are rendered the first time they are drawn.
+    """
+    def __init__(self, font, color, background=None, chars="0123456789-.:% "):
+        self.font = font
+        self.color = color
+        self.background = background
+        self.glyphs = {char: font.render(char, True, color, background) for char in chars}
+
+    def glyph(self, char):
+        glyph = self.glyphs.get(char)
+        if glyph is None:
+            glyph = self.glyphs[char] = self.font.render(char, True, self.color, self.background)
+        return glyph
+
+
+class FieldText:
+    """A template such as "SCORE: {}/10" whose words are rendered once and whose values come from a glyph atlas.
+
+    The text is composed again only when a value changes, from the pre-rendered parts, so no
+    font is rasterized while drawing and an unchanged text costs one blit.
+    """
+    def __init__(self, atlas, template):
+        self.atlas = atlas
+        self.parts = [atlas.font.render(part, True, atlas.color, atlas.background) for part in template.split("{}")]
+        self.values = None
+        self.surface = None
+        self.composes = 0
+
+    def compose(self, values):
+        pieces = []
+        for k, part in enumerate(self.parts):
+            pieces.append(part)
+            if k < len(values):
+                pieces.extend(self.atlas.glyph(char) for char in str(values[k]))
+        surface = pygame.Surface((sum(piece.get_width() for piece in pieces), max(piece.get_height() for piece in pieces)), pygame.SRCALPHA)
+        x = 0
+        for piece in pieces:
+            # Copied, not blended, so antialiased edges keep their alpha
+            surface.blit(piece, (x, 0), special_flags=pygame.BLEND_RGBA_MAX)
+            x += piece.get_width()
+        self.composes += 1
+        return surface
+
+    def draw(self, surface, position, *values):
+        """Blit the template with values in place of the {} fields, returns the rect drawn."""
+        if values != self.values:
+            self.surface = self.compose(values)
+            self.values = values
+        return surface.blit(self.surface, position)
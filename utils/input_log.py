@@ -0,0 +1,43 @@
+import json
+import struct
+import numpy as np
+
+# A log is one JSON header line followed by one fixed-size binary row per tick
+LOG_VERSION = 1
+ROW = struct.Struct('<4iB2f') # mouse positions of both players, events, asteroid position after the step
+ROW_DTYPE = np.dtype([("pm1", "<i4", 2), ("pm2", "<i4", 2), ("events", "u1"), ("ball_position", "<f4", 2)])
+
+# Event bits, the flags set outside the step logic before the tick
+EVENT_START_OBJECT = 0b0001
+EVENT_FORCE_RESET = 0b0010
+EVENT_SUCCESS = 0b0100
+EVENT_FAIL = 0b1000
+
+class InputLog:
+    """Per-tick input log of a session, enough to re-simulate it with the same seed (25 bytes per tick)."""
+    def __init__(self, path, header):
+        self.path = path
+        self.file = open(path, "wb")
+        self.file.write((json.dumps(dict(header, version=LOG_VERSION)) + "\n").encode())
+        self.ticks = 0
+
+    def write(self, pm1, pm2, events, ball_position):
+        self.file.write(ROW.pack(int(pm1[0]), int(pm1[1]), int(pm2[0]), int(pm2[1]), events, ball_position[0], ball_position[1]))
+        self.ticks += 1
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def read_input_log(path):
+    """Return the header and the rows of a log as a structured array."""
+    with open(path, "rb") as file:
+        header = json.loads(file.readline())
+        data = file.read()
+    if header.get("version") != LOG_VERSION:
+        raise ValueError(f"Unsupported input log version {header.get('version')} in {path}")
+    n = len(data) // ROW.size # a log cut off by a crash may end with a partial row
+    return header, np.frombuffer(data, dtype=ROW_DTYPE, count=n)
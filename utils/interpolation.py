@@ -0,0 +1,76 @@
+import time
+import threading
+from collections import deque
+import numpy as np
+
+# STATE fields that are positions and can be interpolated (same order as protocol.STATE):
+# p1, p2, ball position, arm links and end effectors. Everything else is taken as is.
+POSITION_FIELDS = (1, 2, 3, 4, 5, 6) + tuple(range(18, 30))
+
+class SnapshotBuffer:
+    """Jitter buffer of server snapshots keyed by tick, sampled with a fixed render delay.
+
+    The network thread pushes every snapshot, the render loop samples the positions at
+    (estimated server time - delay), interpolating between the two bracketing snapshots
+    and extrapolating for at most max_extrapolation seconds when snapshots are late.
+    """
+    def __init__(self, dt, delay=0.05, max_extrapolation=0.1, capacity=64, fields=POSITION_FIELDS):
+        self.dt = dt # server time step
+        self.delay = delay # render delay behind the newest snapshot (s)
+        self.max_extrapolation = max_extrapolation
+        self.fields = np.array(fields)
+        self.snapshots = deque(maxlen=capacity) # (tick, values, positions) sorted by tick
+        self.lock = threading.Lock()
+        self.offset = None # estimate of local clock - server clock (s)
+        # Statistics
+        self.depth = 0 # snapshots ahead of the render time at the last sample
+        self.underruns = 0 # samples with no snapshot ahead of the render time
+        self.late = 0 # snapshots older than the newest buffered one
+
+    def push(self, tick, values, arrival=None):
+        arrival = time.perf_counter() if arrival is None else arrival
+        offset = arrival - tick * self.dt
+        positions = np.array([values[j] for j in self.fields], dtype=float)
+        with self.lock:
+            # Follow delay decreases immediately and increases slowly, so jitter does not move the render time
+            if self.offset is None or offset < self.offset:
+                self.offset = offset
+            else:
+                self.offset += 0.01 * (offset - self.offset)
+            if self.snapshots and tick <= self.snapshots[-1][0]:
+                self.late += 1
+                return
+            self.snapshots.append((tick, values, positions))
+
+    def sample(self, now=None):
+        """Values at the render time with interpolated positions, None before the first snapshot."""
+        now = time.perf_counter() if now is None else now
+        with self.lock:
+            if not self.snapshots:
+                return None
+            render_tick = (now - self.offset - self.delay) / self.dt
+            snapshots = self.snapshots
+            # Find the bracketing snapshots, newest first since the render time is close to the end
+            k = len(snapshots) - 1
+            while k > 0 and snapshots[k - 1][0] > render_tick:
+                k -= 1
+            self.depth = len(snapshots) - k if snapshots[k][0] > render_tick else 0
+            if k == 0 and snapshots[0][0] >= render_tick: # render time older than the buffer
+                return snapshots[0][1]
+            if snapshots[k][0] <= render_tick: # nothing newer, extrapolate from the last two snapshots
+                self.underruns += 1
+                if len(snapshots) < 2:
+                    return snapshots[-1][1]
+                a, b = snapshots[-2], snapshots[-1]
+                render_tick = min(render_tick, b[0] + self.max_extrapolation / self.dt)
+            else:
+                a, b = snapshots[k - 1], snapshots[k]
+        alpha = (render_tick - a[0]) / (b[0] - a[0])
+        positions = a[2] + (b[2] - a[2]) * alpha
+        values = list(a[1] if alpha < 1 else b[1])
+        for j, position in zip(self.fields, positions.tolist()):
+            values[j] = position
+        return values
+
+    def report(self):
+        return f"Buffer: {self.depth} Underruns: {self.underruns}"
@@ -0,0 +1,112 @@
+import numpy as np
+
+# Link lengths (m) of the pantograph: proximal l1, distal l2 and distance d between the motors
+L1 = 0.07
+L2 = 0.09
+
+def base_distance(hardware_version=2):
+    return 0.038 if hardware_version == 3 else 0.0
+
+
+def forward_kinematics(angles, d=0.0, l1=L1, l2=L2, jacobian=False):
+    """End effector positions (..., 2) of motor angles (..., 2) in degrees, as Pantograph.forwardKinematics.
+
+    With jacobian True the Jacobians (..., 2, 2) are returned too, in the convention of
+    Pantograph.torqueCalculation: torques = J @ forces.
+    """
+    angles = np.radians(np.asarray(angles, dtype=float))
+    th1, th2 = angles[..., 0], angles[..., 1]
+    c1, s1 = np.cos(th1), np.sin(th1)
+    c2, s2 = np.cos(th2), np.sin(th2)
+    xA, yA = l1 * c1, l1 * s1
+    xB, yB = d + l1 * c2, l1 * s2
+    hx, hy = xB - xA, yB - yA
+    hh = hx**2 + hy**2
+    hm = np.sqrt(hh)
+    degenerate = hm == 0
+    hm_safe = np.where(degenerate, 1.0, hm)
+    cB = np.where(degenerate, 0.0, hh / (2 * l2 * hm_safe)) # law of cosines, both distal links have length l2
+    h1x = np.where(degenerate, 0.0, l2 * cB * hx / hm_safe)
+    h1y = np.where(degenerate, 0.0, l2 * cB * hy / hm_safe)
+    h1m = np.sqrt(h1x**2 + h1y**2)
+    sB = np.sqrt(1 - cB**2)
+    h1m_safe = np.where(h1m == 0, 1.0, h1m)
+    lx = np.where(h1m == 0, 0.0, -l2 * sB * h1y / h1m_safe)
+    ly = np.where(h1m == 0, 0.0, l2 * sB * h1x / h1m_safe)
+    x = xA + h1x + lx
+    y = yA + h1y + ly
+    positions = np.stack((x, y), axis=-1)
+    if not jacobian:
+        return positions
+
+    phi1 = np.arccos(np.clip((x - l1 * c1) / l2, -1.0, 1.0))
+    phi2 = np.arccos(np.clip((x - d - l1 * c2) / l2, -1.0, 1.0))
+    c11, s11 = np.cos(phi1), np.sin(phi1)
+    c22, s22 = np.cos(phi2), np.sin(phi2)
+    dn = l2 * (c11 * s22 - c22 * s11)
+    dn_safe = np.where(dn == 0, 1.0, dn)
+    eta = np.where(dn == 0, 0.0, (-l2 * c11 * s22 + l2 * c22 * s11 - c1 * l1 * s22 + c22 * l1 * s1) / dn_safe)
+    nu = np.where(dn == 0, 0.0, l1 * (c2 * s22 - c22 * s2) / dn_safe)
+    J = np.empty(positions.shape[:-1] + (2, 2))
+    J[..., 0, 0] = -l2 * eta * s11 - l2 * s11 - l1 * s1
+    J[..., 0, 1] = l2 * c11 * eta + l2 * c11 + c1 * l1
+    J[..., 1, 0] = -l2 * s11 * nu
+    J[..., 1, 1] = l2 * c11 * nu
+    return positions, J
+
+
+def inverse_kinematics(positions, d=0.0, l1=L1, l2=L2, margin=0.0005):
+    """Motor angles (..., 2) in degrees and the reachable positions (..., 2), as Physics.derive_device_pos.
+
+    Positions out of reach are moved onto the reach of the farther motor, positions too close
+    to the motors are raised. Positions without a solution get zero angles.
+    """
+    p = np.array(positions, dtype=float)
+    x, y = p[..., 0], p[..., 1]
+    dA = np.hypot(x, y)
+    dB = np.hypot(x - d, y)
+    max_arm_length = l1 + l2 - margin
+    min_dist = l2 - l1 + margin
+    # Pantograph overextended: back onto the reach of the motor farther away
+    over = (dA > max_arm_length) | (dB > max_arm_length)
+    from_A = over & (dA > dB)
+    from_B = over & ~(dA > dB)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        x = np.where(from_A, x / dA * max_arm_length, np.where(from_B, d + (x - d) / dB * max_arm_length, x))
+        y = np.where(from_A, y / dA * max_arm_length, np.where(from_B, y / dB * max_arm_length, y))
+    # Too close to the base: restrict y
+    y = np.where(~over & (y < min_dist), min_dist, y)
+
+    dA = np.hypot(x, y)
+    dB = np.hypot(x - d, y)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        theta_A = np.arctan2(y, x) + np.arccos((l1**2 + dA**2 - l2**2) / (2 * l1 * dA))
+        theta_B = np.arctan2(y, x - d) - np.arccos((l1**2 + dB**2 - l2**2) / (2 * l1 * dB))
+    invalid = ~(np.isfinite(theta_A) & np.isfinite(theta_B)) # domain errors of the scalar version
+    theta_A = np.where(invalid, 0.0, theta_A)
+    theta_B = np.where(invalid, 0.0, theta_B)
+    return np.degrees(np.stack((theta_A, theta_B), axis=-1)), np.stack((x, y), axis=-1)
+
+
+def joint_positions(angles, d=0.0, l1=L1):
+    """Elbows pA and pB (..., 2) of motor angles (..., 2) in degrees."""
+    angles = np.radians(np.asarray(angles, dtype=float))
+    pA = l1 * np.stack((np.cos(angles[..., 0]), np.sin(angles[..., 0])), axis=-1)
+    pB = l1 * np.stack((np.cos(angles[..., 1]), np.sin(angles[..., 1])), axis=-1)
+    pB[..., 0] += d
+    return pA, pB
+
+
+def forces_to_torques(J, forces):
+    """Motor torques (..., 2) of end effector forces (..., 2), as Pantograph.torqueCalculation."""
+    return np.einsum("...ij,...j->...i", J, forces)
+
+
+def torques_to_forces(J, torques):
+    """End effector forces (..., 2) of motor torques (..., 2), NaN where the Jacobian is singular."""
+    det = J[..., 0, 0] * J[..., 1, 1] - J[..., 0, 1] * J[..., 1, 0]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        fx = (J[..., 1, 1] * torques[..., 0] - J[..., 0, 1] * torques[..., 1]) / det
+        fy = (J[..., 0, 0] * torques[..., 1] - J[..., 1, 0] * torques[..., 0]) / det
+    return np.stack((fx, fy), axis=-1)
+
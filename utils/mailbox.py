@@ -0,0 +1,46 @@
+import time
+
+class LatestValue:
+    """Single-slot mailbox that only keeps the newest sample.
+
+    One thread writes, another reads. The slot is replaced with a single tuple
+    assignment, so no lock is needed and the reader always sees a complete sample.
+    """
+    def __init__(self):
+        self._slot = None # (seq, timestamp, value)
+        self._next_seq = 0
+        self._read_seq = -1
+        # Statistics
+        self.written = 0 # samples accepted
+        self.superseded = 0 # samples overwritten before they were read
+        self.stale = 0 # samples rejected because a newer one was already stored
+
+    def put(self, value, seq=None, timestamp=None):
+        """Store a sample, returns False if it is older than the one already stored."""
+        slot = self._slot
+        if seq is None:
+            seq = self._next_seq
+        elif slot is not None and seq <= slot[0]:
+            self.stale += 1
+            return False
+        if slot is not None and slot[0] > self._read_seq:
+            self.superseded += 1
+        self._slot = (seq, time.perf_counter() if timestamp is None else timestamp, value)
+        self._next_seq = seq + 1
+        self.written += 1
+        return True
+
+    def take(self):
+        """Return (seq, timestamp, value) of the newest sample if it was not read yet, otherwise None."""
+        slot = self._slot
+        if slot is None or slot[0] <= self._read_seq:
+            return None
+        self._read_seq = slot[0]
+        return slot
+
+    def peek(self):
+        """Return the newest sample without marking it as read."""
+        return self._slot
+
+    def report(self):
+        return f"written: {self.written}, superseded: {self.superseded}, stale: {self.stale}"
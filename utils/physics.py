@@ -1,190 +1,259 @@
-# -*- coding: utf-8 -*-
-
-import numpy as np
-import math
-import matplotlib.pyplot as plt
-from utils.HaplyHAPI import Board, Device, Mechanisms, Pantograph
-import sys, serial, glob
-from serial.tools import list_ports
-import time
-
-
-import serial.tools.list_ports
-
-
-class Physics:
-    def __init__(self,reverse_motor_order=False,hardware_version=3):
-        #return True if a device is found, False if no device is found
-        CW = 0
-        CCW = 1
-        haplyBoard = Board
-        device = Device
-        SimpleActuatorMech = Mechanisms
-        pantograph = Pantograph
-        
-        #########Open the connection with the arduino board#########
-        self.port = self.serial_ports()   ##port contains the communication port or False if no device
-        if hardware_version==3:
-            self.l1 = 0.07
-            self.l2 = 0.09
-            self.d = 0.038
-        else:
-            self.l1 = 0.07
-            self.l2 = 0.09
-            self.d = 0.0
-        
-        if self.port:
-            print("Board found on port %s"%self.port[0])
-            self.haplyBoard = Board("test", self.port[0], 0)
-            self.device = Device(5, self.haplyBoard)
-            self.pantograph = Pantograph(hardware_version)
-            self.device.set_mechanism(self.pantograph)
-            if hardware_version == 3:
-                if reverse_motor_order: #sometimes the motor wires for version 3 are connected in reverse
-                    self.device.add_actuator(2, CCW, 2)
-                    self.device.add_actuator(1, CCW, 1)
-                    self.device.add_encoder(2, CCW, 82.7, 4880, 2) #angle a1
-                    self.device.add_encoder(1, CCW, 97.3, 4880, 1) #angle a2
-                else:
-                    self.device.add_actuator(1, CCW, 2)
-                    self.device.add_actuator(2, CCW, 1)
-                    #self.device.add_encoder(1, CCW, 97.3, 4880, 2) #fully extended starting position
-                    #self.device.add_encoder(2, CCW, 82.7, 4880, 1)
-                    self.device.add_encoder(1, CCW, 168, 4880, 2) #fully retracted starting position
-                    self.device.add_encoder(2, CCW, 12, 4880, 1)
-            else: #not tested with hardware version 2
-                self.device.add_actuator(1, CCW, 2)
-                self.device.add_actuator(2, CW, 1)
-                self.device.add_encoder(1, CCW, 241, 10752, 2)
-                self.device.add_encoder(2, CW, -61, 10752, 1)
-            
-            self.device.device_set_parameters()
-            self.device_present = True
-            
-            #THE DEVICE MUST HAVE THE TORQUE WRITTEN BEFORE IT CAN PROVIDE DATA!!!!!!!
-            #This section prevents the program from not having available data for 1 to 2 initial frames
-            start_time = time.time()
-            while True:
-                if not self.haplyBoard.data_available():
-                    #port present, but no data available. Setting initial torques
-                    self.device.set_device_torques(np.zeros(2))
-                    self.device.device_write_torques()
-                    time.sleep(0.001) #pause for 1 millisecond
-                    if time.time()-start_time>5.0: #this is taking longer than 5 seconds...
-                        raise ValueError("Haply board present, but not providing data!")
-                else:
-                    #data now available! Proceed.
-                    print("[PHYSICS]: Haply found and data available. Ready to run!")
-                    break
-        else:
-            print("[PHYSICS]: No compatible device found.")
-            self.device_present = False
-    
-    def is_device_connected(self):
-        return self.device_present
-    
-    def get_device_pos(self):
-        #Get pantograph joint positions. Only works if a device is connected!
-        if self.device_present and self.port and self.haplyBoard.data_available():    ##If Haply is present
-            #get device angles
-            self.device.device_read_data()
-            motorAngle = self.device.get_device_angles()
-            
-            #forward kinematics to get position
-            device_position = self.device.get_device_position(motorAngle)
-        else:
-            print("debug vals:",self.device_present,self.port,self.haplyBoard.data_available())
-            raise ValueError("[PHYSICS] Cannot get device position if no device is connected!")
-        #get other device positions
-        pA0 = (0.0,0.0)
-        pB0 = (self.d,0.0)
-        a1 = math.radians(motorAngle[0])
-        a2 = math.radians(motorAngle[1])
-        pA = ( self.l1*math.cos(a1),self.l1*math.sin(a1) )
-        pB = ( self.l1*math.cos(a2)+self.d, self.l1*math.sin(a2) )
-        return pA0,pB0,pA,pB,device_position
-    
-    def update_force(self,f):
-        #Send forces to the device. Only works if a device is connected!
-        if self.device_present and self.port:
-            #update and send torques
-            f[1] = -f[1] #graphical y axis is reversed
-            self.device.set_device_torques( f ) #forces in cartesian coordinates. Calculates the needed motor torques.
-            self.device.device_write_torques()
-            time.sleep(0.001) #pause for 1 millisecond
-        elif not self.device_present:
-            print("debug vals:",self.device_present,self.port)
-            raise ValueError("[PHYSICS] Cannot set device force if no device is connected!")
-        
-    def serial_ports(self):
-        #Detect and Connect Physical device
-        """ Lists serial port names """
-        ports = list(serial.tools.list_ports.comports())
-        result = []
-        for p in ports:
-            try:
-                port = p.device
-                s = serial.Serial(port)
-                s.close()
-                if p.description[0:12] == "Arduino Zero":
-                    result.append(port)
-                    print(p.description[0:12])
-            except (OSError, serial.SerialException):
-                pass
-        return result
-        
-    def derive_device_pos(self,pe,recursive_call=0):
-        #given the endpoint location pe, find the locations of the intermediate points
-        #pe: endpoint location
-        pA0 = (0.0,0.0) #pA: origin location
-        pB0 = (pA0[0]+self.d,pA0[1]) #pB is assumed to be at pA_x+d !!!!
-        dA0 = math.sqrt( (pe[0]-pA0[0])**2+(pe[1]-pA0[1])**2 ) #distance from point A0 to the endpoint
-        dB0 = math.sqrt( (pe[0]-pB0[0])**2+(pe[1]-pB0[1])**2 ) #distance from point B0 to the endpoint
-        uVA0 = ( (pe[0]-pA0[0])/dA0, (pe[1]-pA0[1])/dA0 ) #unit vector from A0 to the endpoint
-        uVB0 = ( (pe[0]-pB0[0])/dB0, (pe[1]-pB0[1])/dB0 ) #unit vector from B0 to the endpoint
-        #check for invalid positions
-        distance_margin = 0.0005 #m
-        max_arm_length = self.l1+self.l2-distance_margin
-        min_dist = self.l2-self.l1+distance_margin
-        if dA0>max_arm_length or dB0>max_arm_length: #pantograph overextended
-            #for this limited setting, being outside the reach of the pantograph would always mean at least one arm has two segments that are colinear
-            #thus find the base point with the longest distance, and imagine a line from the given pE to that base point
-            #at the distance l1+l2 along this line from the base point is the maximum extension of the pantograph
-            #(subtract a little bit of distance to accomodate for floating point and pixel errors)
-            if dA0>dB0:
-                pe = ( pA0[0]+uVA0[0]*max_arm_length, pA0[1]+uVA0[1]*max_arm_length )
-            else:
-                pe = ( pB0[0]+uVB0[0]*max_arm_length, pB0[1]+uVB0[1]*max_arm_length )
-        elif pe[1]<pA0[1]+min_dist: #pantograph too close to the base
-            #the endpoint is so close to base joints that the inverse kinematics starts having issues.
-            #limit motion by simply restricting y
-            pe[1] = pA0[1]+min_dist
-        
-        #find valid angles
-        try:
-            dA0 = math.sqrt( (pe[0]-pA0[0])**2+(pe[1]-pA0[1])**2 ) #distance from point A0 to the endpoint
-            theta_dA0 = math.atan2(pe[1]-pA0[1],pe[0]-pA0[0]) #angle to the line connecting point A to the endpoint
-            theta_cA = math.acos( (self.l1**2+dA0**2-self.l2**2)/(2*self.l1*dA0) )
-            theta_A0 = theta_dA0 + theta_cA
-
-            dB0 = math.sqrt( (pe[0]-pB0[0])**2+(pe[1]-pB0[1])**2 ) #distance from point B0 to the endpoint
-            theta_dB0 = math.atan2(pe[1]-pB0[1],pe[0]-pB0[0]) #angle to the line connecting point B to the endpoint
-            theta_cB = math.acos( (self.l1**2+dB0**2-self.l2**2)/(2*self.l1*dB0) )        
-            theta_B0 = theta_dB0 - theta_cB
-        except Exception as e:
-            theta_A0 = 0.0
-            theta_B0 = 0.0
-            print("[Physics] Unclassified pantograph domain error")
-        
-        pA = ( self.l1*math.cos(theta_A0)+pA0[0],self.l1*math.sin(theta_A0)+pA0[1] ) #intermediate point A
-        pB = ( self.l1*math.cos(theta_B0)+pB0[0],self.l1*math.sin(theta_B0)+pB0[1] ) #intermediate point B
-        
-        #pA0,pB0,pA,pB,pE
-        return pA0,pB0,pA,pB,pe
-    
-    def close(self):
-        if self.device_present and self.port:
-            #reset the force to 0, otherwise it will stay nonzero
-            self.device.set_device_torques( [0,0] )
-            self.device.device_write_torques()
-            time.sleep(0.001) #pause for 1 millisecond
\ No newline at end of file
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import math
+from utils.HaplyHAPI import Board, Device, Mechanisms, Pantograph
+import sys, serial, glob
+from serial.tools import list_ports
+import time
+import os, json, threading
+
+
+import serial.tools.list_ports
+
+# USB vendor and product IDs of the Arduino Zero boards of the Haply: native port and bootloader
+BOARD_USB_IDS = {(0x2341, 0x804D), (0x2341, 0x004D)}
+# Last port that provided data and the serial number of its board, checked first on the next start
+STATE_FILE = os.path.join(os.path.abspath(os.path.join(os.path.dirname(__file__), "../")), "data", "haply_state.json")
+
+CW = 0
+CCW = 1
+# (hardware version, reverse motor order): actuators (actuator, rotation, port), encoders (encoder, rotation, offset, resolution, port)
+CALIBRATIONS = {
+    #sometimes the motor wires for version 3 are connected in reverse
+    (3, True): {"actuators": [(2, CCW, 2), (1, CCW, 1)],
+                "encoders": [(2, CCW, 82.7, 4880, 2), (1, CCW, 97.3, 4880, 1)]}, #angle a1, angle a2
+    #fully extended starting position: encoder 1 offset 97.3, encoder 2 offset 82.7
+    (3, False): {"actuators": [(1, CCW, 2), (2, CCW, 1)],
+                 "encoders": [(1, CCW, 168, 4880, 2), (2, CCW, 12, 4880, 1)]}, #fully retracted starting position
+    #not tested with hardware version 2
+    (2, False): {"actuators": [(1, CCW, 2), (2, CW, 1)],
+                 "encoders": [(1, CCW, 241, 10752, 2), (2, CW, -61, 10752, 1)]},
+}
+
+
+class Physics:
+    def __init__(self,reverse_motor_order=False,hardware_version=3,background_reader=False,port=None,wait=True,state_file=STATE_FILE):
+        #return True if a device is found, False if no device is found
+        #background_reader: the board replies are read by a thread, reading the device never waits on the port
+        #port: port name or serial-like object (e.g. VirtualHaply) to use instead of searching for a board
+        #wait: False returns while waiting for the first data in a thread, call wait_ready() before using the device
+        #state_file: cached port, None to always search
+        haplyBoard = Board
+        device = Device
+        SimpleActuatorMech = Mechanisms
+        pantograph = Pantograph
+        self.state_file = state_file
+        self.background_reader = background_reader
+        self.ready_error = None
+        self.ready_thread = None
+        state = self.load_state()
+        
+        #########Open the connection with the arduino board#########
+        self.port = [port] if port is not None else self.serial_ports(state)   ##port contains the communication port or False if no device
+        if hardware_version==3:
+            self.l1 = 0.07
+            self.l2 = 0.09
+            self.d = 0.038
+        else:
+            self.l1 = 0.07
+            self.l2 = 0.09
+            self.d = 0.0
+        
+        if self.port:
+            print("Board found on port %s"%self.port[0])
+            self.haplyBoard = Board("test", self.port[0], 0)
+            self.device = Device(5, self.haplyBoard)
+            self.pantograph = Pantograph(hardware_version)
+            self.device.set_mechanism(self.pantograph)
+            #in-code calibration only, the state file caches the port and nothing that could outdate a change here
+            self.calibration = CALIBRATIONS[(3, reverse_motor_order)] if hardware_version == 3 else CALIBRATIONS[(2, False)]
+            for actuator in self.calibration["actuators"]:
+                self.device.add_actuator(*actuator)
+            for encoder in self.calibration["encoders"]:
+                self.device.add_encoder(*encoder)
+            
+            self.device.device_set_parameters()
+            self.device_present = True
+            
+            if wait:
+                self.wait_for_data()
+            else: #e.g. while the client waits in the lobby
+                self.ready_thread = threading.Thread(target=self.wait_for_data, daemon=True)
+                self.ready_thread.start()
+        else:
+            print("[PHYSICS]: No compatible device found.")
+            self.device_present = False
+    
+    def wait_for_data(self):
+        #THE DEVICE MUST HAVE THE TORQUE WRITTEN BEFORE IT CAN PROVIDE DATA!!!!!!!
+        #This section prevents the program from not having available data for 1 to 2 initial frames
+        start_time = time.time()
+        while True:
+            if not self.haplyBoard.data_available():
+                #port present, but no data available. Setting initial torques
+                self.device.set_device_torques(np.zeros(2))
+                self.device.device_write_torques()
+                time.sleep(0.001) #pause for 1 millisecond
+                if time.time()-start_time>5.0: #this is taking longer than 5 seconds...
+                    self.ready_error = ValueError("Haply board present, but not providing data!")
+                    self.save_state(None) #search again on the next start
+                    if self.ready_thread is None:
+                        raise self.ready_error
+                    return
+            else:
+                #data now available! Proceed.
+                print("[PHYSICS]: Haply found and data available. Ready to run!")
+                break
+        self.save_state(self.port[0])
+        if self.background_reader:
+            self.device.device_start_reader()
+    
+    def wait_ready(self):
+        #Wait for the first data when created with wait=False, raises if the board never provided any
+        if self.ready_thread is not None:
+            self.ready_thread.join()
+            self.ready_thread = None
+        if self.ready_error is not None:
+            raise self.ready_error
+    
+    def load_state(self):
+        if not self.state_file:
+            return None
+        try:
+            with open(self.state_file, "r") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+    
+    def save_state(self, port):
+        #Remember the port that provided data and the serial number of its board, or forget it (port None)
+        if not self.state_file or (port is not None and not isinstance(port, str)): #emulated devices are not cached
+            return
+        if port is None:
+            if os.path.exists(self.state_file):
+                os.remove(self.state_file)
+            return
+        info = next((p for p in serial.tools.list_ports.comports() if p.device == port), None)
+        state = {"port": port, "serial_number": info.serial_number if info is not None else None}
+        directory = os.path.dirname(self.state_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        #written aside and renamed, so an interrupted start never leaves a partial file
+        temporary = f"{self.state_file}.{os.getpid()}.tmp"
+        with open(temporary, "w") as file:
+            json.dump(state, file)
+        os.replace(temporary, self.state_file)
+    
+    def is_device_connected(self):
+        return self.device_present
+    
+    def get_device_pos(self):
+        #Get pantograph joint positions. Only works if a device is connected!
+        if self.device_present and self.port and self.haplyBoard.data_available():    ##If Haply is present
+            #get device angles
+            self.device.device_read_data()
+            motorAngle = self.device.get_device_angles()
+            
+            #forward kinematics to get position
+            device_position = self.device.get_device_position(motorAngle)
+        else:
+            print("debug vals:",self.device_present,self.port,self.haplyBoard.data_available())
+            raise ValueError("[PHYSICS] Cannot get device position if no device is connected!")
+        #get other device positions
+        pA0 = (0.0,0.0)
+        pB0 = (self.d,0.0)
+        a1 = math.radians(motorAngle[0])
+        a2 = math.radians(motorAngle[1])
+        pA = ( self.l1*math.cos(a1),self.l1*math.sin(a1) )
+        pB = ( self.l1*math.cos(a2)+self.d, self.l1*math.sin(a2) )
+        return pA0,pB0,pA,pB,device_position
+    
+    def update_force(self,f):
+        #Send forces to the device. Only works if a device is connected!
+        self.write_force(f)
+        time.sleep(0.001) #pause for 1 millisecond
+    
+    def write_force(self,f):
+        #Send forces to the device without pausing, for a loop that keeps its own rate (see HapticServo)
+        if self.device_present and self.port:
+            #update and send torques
+            f = [f[0], -f[1]] #graphical y axis is reversed, the caller's force is left unchanged
+            self.device.set_device_torques( f ) #forces in cartesian coordinates. Calculates the needed motor torques.
+            self.device.device_write_torques()
+        elif not self.device_present:
+            print("debug vals:",self.device_present,self.port)
+            raise ValueError("[PHYSICS] Cannot set device force if no device is connected!")
+        
+    def serial_ports(self, state=None):
+        #Detect and Connect Physical device
+        """ Lists serial port names, from their USB metadata without opening them.
+
+        The port of the last run (state) comes first when it is still attached, with the same serial number."""
+        ports = list(serial.tools.list_ports.comports())
+        if state:
+            for p in ports:
+                if p.device == state["port"] and p.serial_number == state["serial_number"]:
+                    return [p.device]
+        result = []
+        for p in ports:
+            if (p.vid, p.pid) in BOARD_USB_IDS or (p.description or "")[0:12] == "Arduino Zero":
+                result.append(p.device)
+        return result
+        
+    def derive_device_pos(self,pe,recursive_call=0):
+        #given the endpoint location pe, find the locations of the intermediate points
+        #pe: endpoint location
+        pA0 = (0.0,0.0) #pA: origin location
+        pB0 = (pA0[0]+self.d,pA0[1]) #pB is assumed to be at pA_x+d !!!!
+        dA0 = math.sqrt( (pe[0]-pA0[0])**2+(pe[1]-pA0[1])**2 ) #distance from point A0 to the endpoint
+        dB0 = math.sqrt( (pe[0]-pB0[0])**2+(pe[1]-pB0[1])**2 ) #distance from point B0 to the endpoint
+        uVA0 = ( (pe[0]-pA0[0])/dA0, (pe[1]-pA0[1])/dA0 ) #unit vector from A0 to the endpoint
+        uVB0 = ( (pe[0]-pB0[0])/dB0, (pe[1]-pB0[1])/dB0 ) #unit vector from B0 to the endpoint
+        #check for invalid positions
+        distance_margin = 0.0005 #m
+        max_arm_length = self.l1+self.l2-distance_margin
+        min_dist = self.l2-self.l1+distance_margin
+        if dA0>max_arm_length or dB0>max_arm_length: #pantograph overextended
+            #for this limited setting, being outside the reach of the pantograph would always mean at least one arm has two segments that are colinear
+            #thus find the base point with the longest distance, and imagine a line from the given pE to that base point
+            #at the distance l1+l2 along this line from the base point is the maximum extension of the pantograph
+            #(subtract a little bit of distance to accomodate for floating point and pixel errors)
+            if dA0>dB0:
+                pe = ( pA0[0]+uVA0[0]*max_arm_length, pA0[1]+uVA0[1]*max_arm_length )
+            else:
+                pe = ( pB0[0]+uVB0[0]*max_arm_length, pB0[1]+uVB0[1]*max_arm_length )
+        elif pe[1]<pA0[1]+min_dist: #pantograph too close to the base
+            #the endpoint is so close to base joints that the inverse kinematics starts having issues.
+            #limit motion by simply restricting y
+            pe[1] = pA0[1]+min_dist
+        
+        #find valid angles
+        try:
+            dA0 = math.sqrt( (pe[0]-pA0[0])**2+(pe[1]-pA0[1])**2 ) #distance from point A0 to the endpoint
+            theta_dA0 = math.atan2(pe[1]-pA0[1],pe[0]-pA0[0]) #angle to the line connecting point A to the endpoint
+            theta_cA = math.acos( (self.l1**2+dA0**2-self.l2**2)/(2*self.l1*dA0) )
+            theta_A0 = theta_dA0 + theta_cA
+
+            dB0 = math.sqrt( (pe[0]-pB0[0])**2+(pe[1]-pB0[1])**2 ) #distance from point B0 to the endpoint
+            theta_dB0 = math.atan2(pe[1]-pB0[1],pe[0]-pB0[0]) #angle to the line connecting point B to the endpoint
+            theta_cB = math.acos( (self.l1**2+dB0**2-self.l2**2)/(2*self.l1*dB0) )        
+            theta_B0 = theta_dB0 - theta_cB
+        except Exception as e:
+            theta_A0 = 0.0
+            theta_B0 = 0.0
+            print("[Physics] Unclassified pantograph domain error")
+        
+        pA = ( self.l1*math.cos(theta_A0)+pA0[0],self.l1*math.sin(theta_A0)+pA0[1] ) #intermediate point A
+        pB = ( self.l1*math.cos(theta_B0)+pB0[0],self.l1*math.sin(theta_B0)+pB0[1] ) #intermediate point B
+        
+        #pA0,pB0,pA,pB,pE
+        return pA0,pB0,pA,pB,pe
+    
+    def close(self):
+        if self.device_present and self.port:
+            #reset the force to 0, otherwise it will stay nonzero
+            self.device.set_device_torques( [0,0] )
+            self.device.device_write_torques()
+            time.sleep(0.001) #pause for 1 millisecond
+            self.haplyBoard.stop_reader()
\ No newline at end of file
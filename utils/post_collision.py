@@ -21,7 +21,8 @@ player_collisions = {
 }
 
 def post_collision(arbiter, space, data):
-    global player_collisions
+    # Sessions pass their own collision data through the handler, otherwise use the module one
+    collisions = data.get("player_collisions", player_collisions)
     
     # Get collision data
     impulse = arbiter.total_impulse
@@ -43,7 +44,7 @@ def post_collision(arbiter, space, data):
     normal = arbiter.contact_point_set.normal
 
     # Update that player's collision data
-    player_collisions[player_num] = {
+    collisions[player_num] = {
         "position": contact_position,
         "normal": normal,
         "impulse": impulse,
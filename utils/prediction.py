@@ -0,0 +1,74 @@
+import math
+import numpy as np
+from utils import protocol
+
+def two_link_elbow(base, target, l1, l2, hint):
+    """Elbow position of a two link arm reaching for target, the solution closest to hint is chosen."""
+    dx, dy = target[0] - base[0], target[1] - base[1]
+    d = min(max(math.hypot(dx, dy), abs(l1 - l2) + 1e-6), l1 + l2 - 1e-6) # clamp to the reachable annulus
+    a = (l1**2 - l2**2 + d**2) / (2 * d) # distance from the base to the chord through both elbow solutions
+    h = math.sqrt(max(l1**2 - a**2, 0.0))
+    heading = math.atan2(dy, dx)
+    ux, uy = math.cos(heading), math.sin(heading)
+    mx, my = base[0] + a * ux, base[1] + a * uy
+    elbow_a = (mx - h * uy, my + h * ux)
+    elbow_b = (mx + h * uy, my - h * ux)
+    if math.dist(elbow_a, hint) <= math.dist(elbow_b, hint):
+        return elbow_a
+    return elbow_b
+
+
+class EndEffectorPredictor:
+    """Client-side prediction of the local end effector.
+
+    The server echoes the sequence number of the last input it applied. The prediction is the
+    authoritative end effector moved by how far the input moved since that acknowledged input,
+    so the own arm follows the hand without waiting a round trip. While in contact the server
+    resolves the collision, so the authoritative position is used as is.
+    """
+    def __init__(self, history=256):
+        self.history = history
+        self.inputs = {} # input seq -> input position
+        self.predictions = {} # input seq -> end effector predicted when the input was sent
+        self.ack = protocol.NO_ACK
+        self.authoritative = None # end effector after the acknowledged input
+        # Statistics
+        self.error = 0.0 # smoothed prediction error (px)
+        self.max_error = 0.0
+
+    def record_input(self, seq, position):
+        self.inputs[seq] = (float(position[0]), float(position[1]))
+        self.inputs.pop(seq - self.history, None)
+
+    def reconcile(self, ack, end_effector):
+        """Take the authoritative end effector of a snapshot that acknowledged input ack."""
+        self.authoritative = (float(end_effector[0]), float(end_effector[1]))
+        if ack == self.ack or ack == protocol.NO_ACK:
+            return
+        self.ack = ack
+        predicted = self.predictions.pop(ack, None)
+        if predicted is not None:
+            error = math.dist(predicted, self.authoritative)
+            self.error += 0.1 * (error - self.error)
+            self.max_error = max(self.max_error, error)
+        for seq in [seq for seq in self.predictions if seq < ack]: # never acknowledged, skipped by the server
+            del self.predictions[seq]
+
+    def predict(self, seq, in_contact=False):
+        """Predicted end effector after input seq, None until the server acknowledged an input."""
+        acked_input = self.inputs.get(self.ack)
+        if self.authoritative is None or acked_input is None or seq not in self.inputs:
+            return None
+        if in_contact:
+            predicted = self.authoritative
+        else:
+            latest = self.inputs[seq]
+            predicted = (self.authoritative[0] + latest[0] - acked_input[0],
+                         self.authoritative[1] + latest[1] - acked_input[1])
+        self.predictions[seq] = predicted
+        if len(self.predictions) > self.history:
+            del self.predictions[min(self.predictions)]
+        return np.array(predicted)
+
+    def report(self):
+        return f"Prediction error: {self.error:.1f} px"
@@ -0,0 +1,154 @@
+import json
+import time
+import socket
+from time import perf_counter_ns
+
+# Log-linear buckets as in HDR histograms: 16 sub-buckets per power of two, about 6 % precision
+SUB_BUCKET_BITS = 4
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+N_BUCKETS = 48 * SUB_BUCKETS # up to 2^47 ns, about 39 hours
+
+def bucket_index(value):
+    shift = max(0, value.bit_length() - SUB_BUCKET_BITS - 1)
+    return min(N_BUCKETS - 1, shift * SUB_BUCKETS + (value >> shift))
+
+def bucket_value(index):
+    """Middle of the values falling in a bucket."""
+    if index < 2 * SUB_BUCKETS:
+        return index
+    shift = index // SUB_BUCKETS - 1
+    return ((index - shift * SUB_BUCKETS) << shift) + (1 << shift) // 2
+
+
+class Histogram:
+    """Durations in ns with a fixed relative precision, constant time to record."""
+    def __init__(self):
+        self.counts = [0] * N_BUCKETS
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, value):
+        self.counts[bucket_index(value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, p):
+        if not self.count:
+            return 0
+        rank = p / 100 * self.count
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if n and seen >= rank:
+                return min(bucket_value(index), self.max)
+        return self.max
+
+    def summary(self):
+        """Count, mean, p50, p99 and max in µs."""
+        return {"count": self.count, "mean": self.total / self.count / 1000 if self.count else 0.0,
+                "p50": self.percentile(50) / 1000, "p99": self.percentile(99) / 1000, "max": self.max / 1000}
+
+
+class TickProfiler:
+    """Time the phases of a loop iteration with perf_counter_ns and report their percentiles.
+
+    The loop calls start() at the top of an iteration, lap(phase) after each phase and
+    end() at the bottom. While disabled these return after a single attribute check, so the
+    profiler can stay in the loop and be switched on at runtime, from the next iteration on. Every report_interval
+    seconds the histograms are written to the log file and/or sent as JSON to a UDP
+    metrics address, then cleared.
+    """
+    def __init__(self, name="server", enabled=False, report_interval=5.0, log=None, metrics_address=None, deadline=None):
+        self.name = name
+        self.enabled = enabled
+        self.report_interval = report_interval
+        self.log = log # file the reports are appended to
+        self.metrics_address = tuple(metrics_address) if metrics_address else None # (host, port) receiving JSON reports
+        self.deadline = int(deadline * 1e9) if deadline else None # iteration time budget (ns)
+        self.metrics_sock = None
+        self.histograms = {}
+        self.last = 0 # time of the previous mark (ns)
+        self.tick_start = 0 # start of the current iteration (ns), 0 if not timed
+        self.missed = 0 # iterations longer than the deadline
+        self.last_report = time.perf_counter()
+
+    @classmethod
+    def from_settings(cls, name, settings, deadline=None):
+        cfg = settings["server"]["profiler"]
+        return cls(name, cfg["enabled"], cfg["report_interval"], cfg["log"], cfg["metrics_address"], deadline)
+
+    def toggle(self, enabled=None):
+        """Switch profiling on or off, the histograms start empty."""
+        self.enabled = not self.enabled if enabled is None else enabled
+        self.clear()
+        return self.enabled
+
+    def clear(self):
+        self.tick_start = 0
+        self.histograms = {}
+        self.missed = 0
+        self.last_report = time.perf_counter()
+
+    def start(self):
+        if not self.enabled:
+            return
+        self.last = self.tick_start = perf_counter_ns()
+
+    def lap(self, phase):
+        """Attribute the time since the previous mark to a phase."""
+        if not self.tick_start:
+            return
+        now = perf_counter_ns()
+        self.record(phase, now - self.last)
+        self.last = now
+
+    def record(self, phase, value):
+        histogram = self.histograms.get(phase)
+        if histogram is None:
+            histogram = self.histograms[phase] = Histogram()
+        histogram.record(value)
+
+    def end(self):
+        """Close an iteration, reports once report_interval has passed."""
+        if not self.tick_start:
+            return
+        self.lap("other") # time after the last phase
+        duration = self.last - self.tick_start
+        self.record("tick", duration)
+        if self.deadline and duration > self.deadline:
+            self.missed += 1
+        self.tick_start = 0
+        if time.perf_counter() - self.last_report >= self.report_interval:
+            self.report()
+
+    def summary(self):
+        return {phase: histogram.summary() for phase, histogram in self.histograms.items()}
+
+    def format(self, summary=None):
+        summary = self.summary() if summary is None else summary
+        lines = [f"Profile {self.name}, {self.missed} iterations over the deadline:"]
+        for phase, s in summary.items():
+            lines.append(f"  {phase:<10} n={s['count']:<6} mean={s['mean']:8.1f} us  p50={s['p50']:8.1f} us  "
+                         f"p99={s['p99']:8.1f} us  max={s['max']:8.1f} us")
+        return "\n".join(lines)
+
+    def report(self):
+        """Write the histograms to the configured outputs and start new ones."""
+        summary = self.summary()
+        if self.log:
+            with open(self.log, "a") as f:
+                f.write(f"{time.strftime('%Y-%m-%d %H:%M:%S')} {self.format(summary)}\n")
+        if self.metrics_address:
+            if self.metrics_sock is None:
+                self.metrics_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            message = {"source": self.name, "time": time.time(), "missed": self.missed, "phases": summary}
+            try:
+                self.metrics_sock.sendto(json.dumps(message).encode(), self.metrics_address)
+            except OSError:
+                pass # the metrics collector is optional
+        if not self.log and not self.metrics_address:
+            print(self.format(summary))
+        self.clear()
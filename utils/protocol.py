@@ -0,0 +1,61 @@
+import struct
+
+# Wire protocol shared by the server and the clients.
+# Every datagram starts with a header: protocol version, message type and sequence number.
+PROTOCOL_VERSION = 1
+
+# Message types
+MSG_HELLO = 1 # client -> server, join request
+MSG_ASSIGN = 2 # server -> client, assigned player number
+MSG_START = 3 # server -> client, game start
+MSG_SHUTDOWN = 4 # server -> client, server is closing
+MSG_INPUT = 5 # client -> server, mouse or device position
+MSG_STATE = 6 # server -> client, game state snapshot, sequence is the server tick
+MSG_LATENCY_CHECK = 7 # client -> server latency port
+MSG_LATENCY_RESPONSE = 8 # server -> client, echoes the check sequence
+MSG_KEYFRAME = 9 # server -> client, complete quantized snapshot (see snapshot_codec)
+MSG_DELTA = 10 # server -> client, changed fields against an acknowledged snapshot
+MSG_CONTACT = 11 # server -> client, asteroid contact model for local force rendering, sequence is the server tick
+
+NO_ACK = 0xFFFFFFFF # acknowledged tick before any snapshot was received
+
+_HEADER_FORMAT = '=BBI' # version, message type, sequence
+HEADER = struct.Struct(_HEADER_FORMAT)
+CONTROL = HEADER # control messages carry no payload
+ASSIGN = struct.Struct(_HEADER_FORMAT + 'B') # player number
+INPUT = struct.Struct(_HEADER_FORMAT + '2iI') # position, newest snapshot tick received
+# t, p1, p2, ball position, ball radius, blackhole position, score, success, fail, timer,
+# f1, f2, arm1 link1, arm1 link2, arm2 link1, arm2 link2, end effector 1, end effector 2,
+# last input sequence applied for player 1 and 2
+STATE = struct.Struct(_HEADER_FORMAT + 'f2i2i2ii2iiiii2f2f2f2f2f2f2f2f2I')
+# asteroid center, radius, velocity, contact stiffness
+CONTACT = struct.Struct(_HEADER_FORMAT + '2ff2ff')
+SNAPSHOT = struct.Struct(_HEADER_FORMAT + 'II') # baseline tick, changed field mask, followed by the fields
+
+def new_buffer(codec):
+    """Preallocated send buffer that fits exactly one message of the codec."""
+    return bytearray(codec.size)
+
+def pack_into(codec, buffer, msg_type, seq, *fields):
+    """Write a message into a preallocated buffer, returns the buffer."""
+    codec.pack_into(buffer, 0, PROTOCOL_VERSION, msg_type, seq & 0xFFFFFFFF, *fields)
+    return buffer
+
+def pack(codec, msg_type, seq, *fields):
+    """Allocate and pack a message, meant for rare messages outside the hot loops."""
+    return codec.pack(PROTOCOL_VERSION, msg_type, seq & 0xFFFFFFFF, *fields)
+
+def message_type(data):
+    """Message type of a datagram, None if it is too short or from another protocol version."""
+    if len(data) < HEADER.size or data[0] != PROTOCOL_VERSION:
+        return None
+    return data[1]
+
+def sequence(data):
+    return HEADER.unpack_from(data)[2]
+
+def unpack(codec, data):
+    """Return (sequence, *fields) of a message, None if the size does not match the codec."""
+    if len(data) != codec.size:
+        return None
+    return codec.unpack_from(data)[2:]
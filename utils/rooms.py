@@ -0,0 +1,105 @@
+import itertools
+import socket
+from utils.mailbox import LatestValue
+from utils.snapshot_codec import SnapshotEncoder
+from utils import protocol
+
+class Room:
+    """Two player slots, their network state and the game session once both players joined."""
+    def __init__(self, room_id, keyframe_interval=50):
+        self.room_id = room_id
+        self.players = {} # player number -> address
+        self.mailboxes = {1: LatestValue(), 2: LatestValue()} # newest input of each player
+        self.encoders = {1: SnapshotEncoder(keyframe_interval), 2: SnapshotEncoder(keyframe_interval)}
+        self.acks = {1: protocol.NO_ACK, 2: protocol.NO_ACK} # newest snapshot tick each client received
+        self.session = None
+        self.inbox = None # queue of the worker process running the room, None if it runs in this process
+
+    def is_full(self):
+        return len(self.players) == 2
+
+    def is_started(self):
+        return self.session is not None or self.inbox is not None
+
+
+def tick_room(room, sock, state_buffer, snapshot_encoding="full", DEBUG=False, contact_buffer=None):
+    """Apply the newest inputs, advance the room's session by one step and send the state to both players.
+
+    With a contact_buffer the asteroid contact model is sent to both players after the state."""
+    session = room.session
+    profiler = session.profiler
+    # Process data from players, only the newest input of each player matters
+    for player_number, mailbox in room.mailboxes.items():
+        sample = mailbox.take()
+        if sample is not None:
+            x, y, room.acks[player_number] = protocol.INPUT.unpack_from(sample[2])[3:]
+            session.set_input(player_number, x, y, sample[0])
+    profiler.lap("inputs")
+
+    tick = session.i
+    state_values = session.tick()
+
+    # Send state to clients
+    if snapshot_encoding != "delta":
+        # Serialize into the preallocated state buffer, the tick is the sequence number
+        serialized_state = protocol.pack_into(protocol.STATE, state_buffer, protocol.MSG_STATE, tick, *state_values)
+        profiler.lap("pack")
+    if contact_buffer is not None:
+        contact = protocol.pack_into(protocol.CONTACT, contact_buffer, protocol.MSG_CONTACT, tick, *session.contact_values())
+    # Send the serialized state to both players of the room
+    for player_number, player in room.players.items():
+        if snapshot_encoding == "delta":
+            serialized_state = room.encoders[player_number].encode(tick, state_values, room.acks[player_number])
+            profiler.lap("pack")
+        try:
+            sock.sendto(serialized_state, player)
+            if contact_buffer is not None:
+                sock.sendto(contact, player)
+        except socket.error as e:
+            if DEBUG:
+                print(f"Error sending game state to {player}: {e}")
+        profiler.lap("send")
+
+def room_report(room, snapshot_encoding="full"):
+    """Input and snapshot statistics of both players, one line each."""
+    lines = []
+    for player_number, mailbox in room.mailboxes.items():
+        lines.append(f"Room {room.room_id} player {player_number} inputs: {mailbox.report()}")
+        if snapshot_encoding == "delta":
+            lines.append(f"Room {room.room_id} player {player_number} snapshots: {room.encoders[player_number].report()}")
+    return "\n".join(lines)
+
+
+class RoomRegistry:
+    """Assigns incoming clients to rooms, filling a room before opening the next one.
+
+    Only the main loop changes the registry. The networking thread only looks up
+    addresses, which is a single dictionary read and safe without a lock.
+    """
+    def __init__(self, max_rooms=32, keyframe_interval=50):
+        self.max_rooms = max_rooms
+        self.keyframe_interval = keyframe_interval
+        self.rooms = {} # room id -> Room
+        self.addresses = {} # address -> (room, player number)
+
+    def join(self, addr):
+        """Give the address a free player slot, returns (room, player number) or None if all rooms are full."""
+        if addr in self.addresses: # already joined, e.g. a repeated hello
+            return self.addresses[addr]
+        room = next((room for room in self.rooms.values() if not room.is_full()), None)
+        if room is None:
+            if len(self.rooms) >= self.max_rooms:
+                return None
+            room_id = next(k for k in itertools.count() if k not in self.rooms)
+            room = self.rooms[room_id] = Room(room_id, self.keyframe_interval)
+        player_number = 1 if 1 not in room.players else 2
+        room.players[player_number] = addr
+        self.addresses[addr] = (room, player_number)
+        return room, player_number
+
+    def lookup(self, addr):
+        return self.addresses.get(addr)
+
+    def active_rooms(self):
+        """Rooms whose session runs in this process."""
+        return [room for room in self.rooms.values() if room.session is not None]
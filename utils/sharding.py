@@ -0,0 +1,171 @@
+import time
+import signal
+import multiprocessing
+from queue import Empty
+from utils.fixed_timestep import FixedTimestep
+from utils.game_session import GameSession
+from utils.rooms import Room, tick_room, room_report
+from utils.profiler import TickProfiler
+from utils import protocol
+
+# Messages on a worker's inbox
+ROUTE_INPUT = 0 # (ROUTE_INPUT, room id, player number, input datagram)
+ROUTE_START = 1 # (ROUTE_START, room id, {player number: address})
+ROUTE_STOP = 2 # (ROUTE_STOP,)
+ROUTE_PROFILE = 3 # (ROUTE_PROFILE, enabled)
+ROOM_LOAD = 0.02 # load counted for a room until a report has measured it (fraction of the time step)
+
+def room_worker(worker_id, sock, settings, cfg_simulation, inbox, stats, report_interval=1.0):
+    """Worker process: runs the sessions of its rooms at the simulation rate and sends their snapshots.
+
+    The game socket is inherited from the server, so snapshots come from the server port
+    as in the single process server. Every report_interval seconds the tick time is sent
+    to the supervisor on the stats queue.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN) # stopped by the supervisor, not by Ctrl+C
+    DEBUG = settings["server"]["debug"]
+    snapshot_encoding = settings["server"]["snapshot_encoding"]
+    keyframe_interval = settings["server"]["keyframe_interval"]
+    dt = cfg_simulation['timeStep']
+    rooms = {} # room id -> Room
+    state_buffer = protocol.new_buffer(protocol.STATE)
+    contact_buffer = protocol.new_buffer(protocol.CONTACT) if settings["server"]["contact_model"]["enabled"] else None
+    ticker = FixedTimestep(dt)
+    profiler = TickProfiler.from_settings(f"worker {worker_id}", settings, deadline=dt)
+    busy = 0.0 # time spent ticking since the last report (s)
+    max_tick = 0.0
+    ticks = 0
+    last_report = time.perf_counter()
+    run = True
+    while run:
+        ticker.wait()
+        start = time.perf_counter()
+        profiler.start()
+
+        # Inputs and commands routed by the supervisor
+        while True:
+            try:
+                message = inbox.get_nowait()
+            except Empty:
+                break
+            if message[0] == ROUTE_INPUT:
+                room = rooms.get(message[1])
+                if room is not None:
+                    # Inputs older than the stored one are rejected and counted by the mailbox
+                    room.mailboxes[message[2]].put(message[3], seq=protocol.sequence(message[3]))
+            elif message[0] == ROUTE_START:
+                room = Room(message[1], keyframe_interval)
+                room.players = message[2]
+                room.session = GameSession(settings, cfg_simulation, csv_prefix=f"room{room.room_id}_" if room.room_id else "", profiler=profiler)
+                rooms[room.room_id] = room
+                if DEBUG: print(f"Worker {worker_id} started room {room.room_id}")
+            elif message[0] == ROUTE_PROFILE:
+                profiler.toggle(message[1])
+            elif message[0] == ROUTE_STOP:
+                run = False
+        profiler.lap("inbox")
+
+        for room in rooms.values():
+            tick_room(room, sock, state_buffer, snapshot_encoding, DEBUG, contact_buffer)
+        profiler.end()
+
+        elapsed = time.perf_counter() - start
+        busy += elapsed
+        max_tick = max(max_tick, elapsed)
+        ticks += 1
+        if start - last_report >= report_interval:
+            stats.put((worker_id, busy / ticks, max_tick, len(rooms), ticker.late_ticks))
+            busy, max_tick, ticks = 0.0, 0.0, 0
+            last_report = start
+            ticker.reset_stats()
+
+    for room in rooms.values():
+        room.session.close()
+        if DEBUG: print(room_report(room, snapshot_encoding))
+
+
+class Worker:
+    """Supervisor side handle of a worker process and its last reported tick time."""
+    def __init__(self, worker_id, process, inbox):
+        self.worker_id = worker_id
+        self.process = process
+        self.inbox = inbox
+        self.rooms = set() # ids of the rooms assigned to the worker
+        self.tick_time = 0.0 # mean time per tick over the last report (s)
+        self.max_tick_time = 0.0
+        self.late_ticks = 0
+        self.load = 0.0 # fraction of the time step spent ticking
+        self.measured_rooms = 0 # rooms ticked during the last report
+
+    def expected_load(self, room_load):
+        """Measured load plus room_load for each room assigned since the last report."""
+        return self.load + (len(self.rooms) - self.measured_rooms) * room_load
+
+    def report(self):
+        state = "" if self.process.is_alive() else ", stopped"
+        return (f"worker {self.worker_id}: {len(self.rooms)} rooms, tick {self.tick_time * 1000:.2f} ms "
+                f"(max {self.max_tick_time * 1000:.2f} ms), load {100 * self.load:.1f} %, late: {self.late_ticks}{state}")
+
+
+class WorkerPool:
+    """Spreads rooms over worker processes so the number of sessions scales with the CPU cores.
+
+    Each new room is placed on the worker with the lowest measured load. Workers are forked,
+    since they inherit the bound game socket and the server script has no main guard.
+    """
+    def __init__(self, n_workers, sock, settings, cfg_simulation):
+        context = multiprocessing.get_context("fork")
+        self.dt = cfg_simulation['timeStep']
+        self.stats = context.Queue()
+        self.workers = []
+        for worker_id in range(n_workers):
+            inbox = context.Queue()
+            process = context.Process(target=room_worker, args=(worker_id, sock, settings, cfg_simulation, inbox, self.stats),
+                                      name=f"room-worker-{worker_id}", daemon=True)
+            process.start()
+            self.workers.append(Worker(worker_id, process, inbox))
+
+    @staticmethod
+    def available():
+        return "fork" in multiprocessing.get_all_start_methods()
+
+    def assign(self, room):
+        """Start the room on the least loaded worker, returns that worker."""
+        # Rooms not yet measured count with the mean measured cost of a room, but never less than
+        # ROOM_LOAD, since rooms that are still waiting for their players are measured close to zero
+        measured = [w.load / w.measured_rooms for w in self.workers if w.measured_rooms]
+        room_load = max(ROOM_LOAD, sum(measured) / len(measured)) if measured else ROOM_LOAD
+        worker = min(self.workers, key=lambda worker: (worker.expected_load(room_load), len(worker.rooms)))
+        worker.rooms.add(room.room_id)
+        room.inbox = worker.inbox
+        worker.inbox.put((ROUTE_START, room.room_id, dict(room.players)))
+        return worker
+
+    def poll(self):
+        """Take the tick time reports of the workers."""
+        while True:
+            try:
+                worker_id, tick_time, max_tick_time, n_rooms, late_ticks = self.stats.get_nowait()
+            except Empty:
+                break
+            worker = self.workers[worker_id]
+            worker.tick_time = tick_time
+            worker.max_tick_time = max_tick_time
+            worker.late_ticks = late_ticks
+            worker.load = tick_time / self.dt
+            worker.measured_rooms = n_rooms
+
+    def report(self):
+        return "\n".join(worker.report() for worker in self.workers)
+
+    def set_profiling(self, enabled):
+        for worker in self.workers:
+            worker.inbox.put((ROUTE_PROFILE, enabled))
+
+    def close(self, timeout=2.0):
+        for worker in self.workers:
+            worker.inbox.put((ROUTE_STOP,))
+        for worker in self.workers:
+            worker.process.join(timeout)
+            if worker.process.is_alive():
+                worker.process.terminate()
@@ -0,0 +1,142 @@
+import struct
+from utils import protocol
+
+# Wire type of every STATE field (same order as protocol.STATE):
+# 'f' float32, 'h' int16, 'i' int32, 'I' uint32 and 'q' screen position as 16-bit fixed point
+FIELD_KINDS = (
+    'f',                        # t
+    'h', 'h', 'h', 'h',         # p1, p2
+    'h', 'h', 'h',              # ball position, ball radius
+    'h', 'h',                   # blackhole position
+    'h', 'h', 'h', 'h',         # score, success, fail, timer
+    'i', 'i', 'i', 'i',         # f1, f2
+    'q', 'q', 'q', 'q',         # arm 1 links
+    'q', 'q', 'q', 'q',         # arm 2 links
+    'q', 'q', 'q', 'q',         # end effectors
+    'I', 'I',                   # applied input sequences
+)
+N_FIELDS = len(FIELD_KINDS)
+FULL_MASK = (1 << N_FIELDS) - 1
+Q_SCALE = 8 # fixed point resolution: 1/8 px, range +-4096 px
+HISTORY_SIZE = 128 # snapshots kept as delta baselines (ticks)
+
+_INT16_MIN, _INT16_MAX = -0x8000, 0x7FFF
+_WIRE_FORMAT = {'f': 'f', 'h': 'h', 'i': 'i', 'I': 'I', 'q': 'h'}
+_MAX_SIZE = protocol.SNAPSHOT.size + struct.calcsize('=' + ''.join(_WIRE_FORMAT[k] for k in FIELD_KINDS))
+_field_structs = {} # mask -> precompiled struct of the fields present in the mask
+
+def _fields_struct(mask):
+    codec = _field_structs.get(mask)
+    if codec is None:
+        if len(_field_structs) > 4096: # masks of a session are few, this only bounds pathological cases
+            _field_structs.clear()
+        codec = struct.Struct('=' + ''.join(_WIRE_FORMAT[FIELD_KINDS[j]] for j in range(N_FIELDS) if mask >> j & 1))
+        _field_structs[mask] = codec
+    return codec
+
+def quantize(values):
+    """Convert STATE field values to their wire integers (floats are kept for 'f' fields)."""
+    out = []
+    for kind, value in zip(FIELD_KINDS, values):
+        if kind == 'f':
+            out.append(struct.unpack('=f', struct.pack('=f', value))[0]) # float32 rounding, compares like the client copy
+        elif kind == 'q':
+            out.append(min(max(int(round(value * Q_SCALE)), _INT16_MIN), _INT16_MAX))
+        elif kind == 'h':
+            out.append(min(max(int(value), _INT16_MIN), _INT16_MAX))
+        else:
+            out.append(int(value))
+    return out
+
+def dequantize(quantized):
+    return tuple(value / Q_SCALE if kind == 'q' else value for kind, value in zip(FIELD_KINDS, quantized))
+
+
+class SnapshotEncoder:
+    """Per-client encoder: periodic keyframes and deltas against the last acknowledged snapshot."""
+    def __init__(self, keyframe_interval=50):
+        self.keyframe_interval = keyframe_interval # ticks between forced keyframes
+        self.history = {} # tick -> quantized snapshot
+        self.last_keyframe = None
+        self.buffer = bytearray(_MAX_SIZE)
+        # Statistics
+        self.keyframes = 0
+        self.deltas = 0
+        self.bytes_sent = 0
+
+    def encode(self, tick, values, ack=protocol.NO_ACK):
+        """Encode the STATE values of a tick, returns a memoryview of the datagram."""
+        quantized = quantize(values)
+        baseline = self.history.get(ack)
+        if (baseline is None or self.last_keyframe is None
+                or tick - self.last_keyframe >= self.keyframe_interval):
+            msg_type, base_tick, mask = protocol.MSG_KEYFRAME, tick, FULL_MASK
+            fields = quantized
+            self.last_keyframe = tick
+            self.keyframes += 1
+        else:
+            msg_type, base_tick, mask = protocol.MSG_DELTA, ack, 0
+            fields = []
+            for j in range(N_FIELDS):
+                if quantized[j] != baseline[j]:
+                    mask |= 1 << j
+                    fields.append(quantized[j])
+            self.deltas += 1
+
+        self.history[tick] = quantized
+        self.history.pop(tick - HISTORY_SIZE, None)
+
+        protocol.SNAPSHOT.pack_into(self.buffer, 0, protocol.PROTOCOL_VERSION, msg_type, tick & 0xFFFFFFFF, base_tick & 0xFFFFFFFF, mask)
+        codec = _fields_struct(mask)
+        codec.pack_into(self.buffer, protocol.SNAPSHOT.size, *fields)
+        size = protocol.SNAPSHOT.size + codec.size
+        self.bytes_sent += size
+        return memoryview(self.buffer)[:size]
+
+    def report(self):
+        return f"keyframes: {self.keyframes}, deltas: {self.deltas}, bytes: {self.bytes_sent}"
+
+
+class SnapshotDecoder:
+    """Client side counterpart of SnapshotEncoder, also accepts plain STATE messages."""
+    def __init__(self):
+        self.history = [None] * HISTORY_SIZE # (tick, quantized snapshot) at tick % HISTORY_SIZE
+        self.last_tick = protocol.NO_ACK # newest decoded tick, sent back to the server as acknowledgement
+        # Statistics
+        self.missing_baselines = 0
+
+    def decode(self, data):
+        """Return (tick, STATE field values) or None if the message cannot be decoded."""
+        msg_type = protocol.message_type(data)
+        if msg_type == protocol.MSG_STATE:
+            fields = protocol.unpack(protocol.STATE, data)
+            if fields is None:
+                return None
+            self.last_tick = fields[0]
+            return fields[0], fields[1:]
+        if msg_type not in (protocol.MSG_KEYFRAME, protocol.MSG_DELTA) or len(data) < protocol.SNAPSHOT.size:
+            return None
+
+        tick, base_tick, mask = protocol.SNAPSHOT.unpack_from(data)[2:]
+        codec = _fields_struct(mask)
+        if len(data) != protocol.SNAPSHOT.size + codec.size:
+            return None
+        values = codec.unpack_from(data, protocol.SNAPSHOT.size)
+        if msg_type == protocol.MSG_KEYFRAME:
+            quantized = list(values)
+        else:
+            entry = self.history[base_tick % HISTORY_SIZE]
+            if entry is None or entry[0] != base_tick:
+                self.missing_baselines += 1
+                return None
+            quantized = list(entry[1])
+            k = 0
+            for j in range(N_FIELDS):
+                if mask >> j & 1:
+                    quantized[j] = values[k]
+                    k += 1
+
+        self.history[tick % HISTORY_SIZE] = (tick, quantized)
+        if self.last_tick == protocol.NO_ACK or tick > self.last_tick:
+            self.last_tick = tick
+        return tick, dequantize(quantized)
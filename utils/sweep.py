@@ -0,0 +1,162 @@
+import os
+import json
+import random
+import hashlib
+import itertools
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import pymunk
+from utils.batch import run_config, configure
+
+# Modules that decide the outcome of a batch trial, a change to any of them invalidates the cache
+CODE_FILES = ("game_session.py", "batch.py", "bots.py", "create_arm.py", "post_collision.py",
+              "pymunk_simple_objects.py", "remake_objects.py")
+
+# Summary values of run_config that describe how the trials ended, the rest are forces
+OUTCOMES = ("success_rate", "completion_time", "crush_rate", "overload_time", "max_overload_time")
+
+def parse_values(text):
+    """Comma separated values, parsed as JSON where possible (numbers, true/false, null)."""
+    values = []
+    for item in text.split(","):
+        try:
+            values.append(json.loads(item))
+        except json.JSONDecodeError:
+            values.append(item)
+    return values
+
+def config_grid(assignments):
+    """Every combination of "key=v1,v2" assignments, as a list of {key: value} dicts."""
+    keys, choices = [], []
+    for assignment in assignments:
+        key, _, text = assignment.partition("=")
+        keys.append(key.strip())
+        choices.append(parse_values(text))
+    return [dict(zip(keys, values)) for values in itertools.product(*choices)]
+
+def config_samples(ranges, n, seed=0):
+    """n random points from "key=low:high" ranges, integers if both bounds are integers."""
+    rng = random.Random(seed)
+    bounds = []
+    for assignment in ranges:
+        key, _, text = assignment.partition("=")
+        low, high = (json.loads(bound) for bound in text.split(":"))
+        bounds.append((key.strip(), low, high))
+    return [{key: rng.randint(low, high) if isinstance(low, int) and isinstance(high, int) else rng.uniform(low, high)
+             for key, low, high in bounds} for _ in range(n)]
+
+def code_version():
+    """Hash of the simulation and bot sources and of the physics engine version."""
+    digest = hashlib.sha256(pymunk.version.encode())
+    directory = os.path.dirname(os.path.abspath(__file__))
+    for name in CODE_FILES:
+        with open(os.path.join(directory, name), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+def config_key(settings, cfg_simulation, run_args, version):
+    """Content address of one sweep point: the configuration it resolves to, the run arguments and the code version."""
+    content = {
+        "simulation": cfg_simulation,
+        "screen_size": settings["screen_size"],
+        "haptic_device": settings["haptic_device"],
+        "trial_version": settings["server"]["trial_version"],
+        "run": run_args,
+        "code": version,
+    }
+    return hashlib.sha256(json.dumps(content, sort_keys=True).encode()).hexdigest()
+
+
+class ResultCache:
+    """Results on disk, one JSON file per key, so repeated sweeps only compute new points."""
+    def __init__(self, directory):
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + ".json")
+
+    def get(self, key):
+        try:
+            with open(self._path(key)) as f:
+                result = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return result
+
+    def put(self, key, result):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Written aside and renamed, so an interrupted sweep never leaves a partial entry
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "w") as f:
+            json.dump(result, f)
+        os.replace(temporary, path)
+
+
+def run_sweep(settings, cfg_simulation, points, trials=100, policy="squeeze_and_carry", policy_args=None,
+              seed=0, timeout=30.0, workers=None, cache=None, progress=None):
+    """Run every point (a dict of overrides) over a process pool, returns one result dict per point, in order.
+
+    Points found in the cache are not run again. Each result holds the overrides, the
+    summary of run_config and whether it came from the cache. progress(done, total) is
+    called after each computed point.
+    """
+    run_args = {"trials": trials, "policy": policy, "policy_args": policy_args or {}, "seed": seed, "timeout": timeout}
+    version = code_version()
+    results = [None] * len(points)
+    pending = {} # key -> indices of the points resolving to it
+    for index, overrides in enumerate(points):
+        key = config_key(*configure(settings, cfg_simulation, overrides), run_args, version)
+        cached = cache.get(key) if cache is not None else None
+        if cached is not None:
+            results[index] = dict(overrides, **cached, cached=True)
+        else:
+            pending.setdefault(key, []).append(index)
+
+    if pending:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(run_config, settings, cfg_simulation, points[indices[0]], **run_args): key
+                       for key, indices in pending.items()}
+            for done, future in enumerate(as_completed(futures), 1):
+                key = futures[future]
+                result = future.result()
+                if cache is not None:
+                    cache.put(key, result)
+                for index in pending[key]:
+                    results[index] = dict(points[index], **result, cached=False)
+                if progress is not None:
+                    progress(done, len(futures))
+    return results
+
+
+def keys_without_effect(points, results):
+    """Swept keys whose values never change an outcome while the other keys stay the same.
+
+    Points are grouped by the values of all other keys, a key is reported if it takes more
+    than one value in some group and every group has the same outcomes for all its values.
+    Keys that are only sampled at random never share the other values and are not judged.
+    """
+    keys = []
+    for key in dict.fromkeys(key for point in points for key in point):
+        groups = {} # values of the other keys -> {value of key: outcomes}
+        for point, result in zip(points, results):
+            rest = json.dumps({k: v for k, v in point.items() if k != key}, sort_keys=True)
+            groups.setdefault(rest, {})[json.dumps(point.get(key))] = tuple(result[name] for name in OUTCOMES)
+        varied = [outcomes for outcomes in groups.values() if len(outcomes) > 1]
+        if varied and all(len(set(outcomes.values())) == 1 for outcomes in varied):
+            keys.append(key)
+    return keys
+
+def best_point(results):
+    """Index of the point with the highest success rate, then the shortest completion time, None if tied."""
+    def rank(result):
+        completion_time = result["completion_time"]
+        return (result["success_rate"], -completion_time if completion_time is not None else float("-inf"))
+    if not results:
+        return None
+    ranks = [rank(result) for result in results]
+    top = max(ranks)
+    return ranks.index(top) if ranks.count(top) == 1 else None
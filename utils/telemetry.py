@@ -0,0 +1,111 @@
+import os
+import threading
+from queue import Queue
+import numpy as np
+from numpy.lib import format as npy_format
+
+# One row per tick, positions in px, forces in the units sent to the clients
+TICK_DTYPE = np.dtype([
+    ("tick", "u4"), ("t", "f8"),
+    ("pm1", "f4", 2), ("pm2", "f4", 2), # mouse (input) positions
+    ("p1", "f4", 2), ("p2", "f4", 2), # end effector positions
+    ("f1", "f4", 2), ("f2", "f4", 2), # endpoint forces
+    ("impulse1", "f4", 2), ("impulse2", "f4", 2), # collision impulses
+    ("ball_position", "f4", 2), ("ball_velocity", "f4", 2), ("ball_radius", "f4"),
+    ("blackhole", "f4", 2),
+    ("timer", "i1"), ("score", "i4"), ("success", "?"), ("fail", "?"),
+])
+
+def _close_trial(holder, n, path):
+    """Shrink a trial file to the recorded ticks, the result is a normal .npy file."""
+    rows = holder.pop() # the holder keeps the only reference, so deleting it unmaps the file
+    offset = rows.offset
+    rows.flush()
+    del rows # unmap before truncating, which Windows requires
+    with open(path, "r+b") as file:
+        # numpy reserves room in the header for the shape to change in place
+        npy_format.write_array_header_1_0(file, {"descr": npy_format.dtype_to_descr(TICK_DTYPE), "fortran_order": False, "shape": (n,)})
+        if file.tell() != offset:
+            raise ValueError(f"Header of {path} does not fit in place")
+        file.truncate(offset + n * TICK_DTYPE.itemsize)
+
+
+class TelemetryRecorder:
+    """Records every tick of a session into a memory-mapped .npy file, one file per trial.
+
+    Each trial file is preallocated for max_ticks rows (sparse on disk until written) and the
+    loop only assigns one row per tick. Completed chunks are flushed to disk and finished trials
+    are shrunk to their length by a background thread, so the loop never waits for the disk.
+    """
+    def __init__(self, directory, prefix="", chunk_size=256, max_ticks=60000):
+        self.directory = directory
+        self.prefix = prefix
+        self.chunk_size = chunk_size # ticks between background flushes
+        self.max_ticks = max_ticks # capacity of a trial file
+        self.rows = None
+        self.path = None
+        self.closing = set() # paths of trial files with a close job still queued
+        self.n = 0 # ticks recorded in the current trial
+        self.queue = Queue() # flush and close jobs for the writer thread
+        self.thread = threading.Thread(target=self._writer, daemon=True)
+        self.thread.start()
+        # Statistics
+        self.files = 0
+        self.overflow = 0 # ticks not recorded because a trial file was full
+        os.makedirs(directory, exist_ok=True)
+
+    def start_trial(self, trial):
+        """Finish the current trial file and open the file of the given trial.
+
+        A trial started again (a forced reset) overwrites its file, after its queued close
+        has run, since truncating it would shrink the new mapping under the loop.
+        """
+        self.end_trial()
+        self.path = os.path.join(self.directory, f"{self.prefix}trial_{trial:04d}.npy")
+        if self.path in self.closing:
+            self.queue.join()
+        self.rows = npy_format.open_memmap(self.path, mode="w+", dtype=TICK_DTYPE, shape=(self.max_ticks,))
+        self.n = 0
+        self.files += 1
+
+    def end_trial(self):
+        if self.rows is not None:
+            self.closing.add(self.path)
+            self.queue.put((_close_trial, [self.rows], self.n, self.path))
+            self.rows = None
+
+    def record(self, row):
+        """Store one tick, row is a tuple in TICK_DTYPE order."""
+        if self.rows is None:
+            return
+        if self.n >= self.max_ticks:
+            self.overflow += 1
+            return
+        self.rows[self.n] = row
+        self.n += 1
+        if self.n % self.chunk_size == 0:
+            self.queue.put((np.memmap.flush, self.rows))
+
+    def close(self):
+        """Finish the current trial and wait until everything is on disk."""
+        self.end_trial()
+        self.queue.put(None)
+        self.thread.join()
+
+    def _writer(self):
+        while True:
+            job = self.queue.get()
+            if job is None:
+                self.queue.task_done()
+                break
+            function, *args = job
+            try:
+                function(*args)
+            except (OSError, ValueError) as e:
+                print(f"Telemetry write failed: {e}")
+            if function is _close_trial:
+                self.closing.discard(args[2])
+            self.queue.task_done()
+
+    def report(self):
+        return f"trial files: {self.files}, ticks: {self.n}, overflow: {self.overflow}"
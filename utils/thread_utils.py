@@ -1,62 +1,135 @@
 import time
 import socket
+import selectors
+from utils import protocol
+from utils.sharding import ROUTE_INPUT
+
+class NetworkStats:
+    """Packet counters shared between the networking thread and the main loop."""
+    def __init__(self):
+        self.received = 0 # game packets accepted
+        self.dropped = 0 # game packets rejected (unknown sender, socket errors)
+        self.latency_checks = 0 # latency requests answered
+        self.wakeups = 0 # selector wakeups
+        self._last_time = time.perf_counter()
+        self._last_received = 0
+
+    def packet_rate(self):
+        """Accepted packets per second since the previous call."""
+        now = time.perf_counter()
+        rate = (self.received - self._last_received) / max(now - self._last_time, 1e-9)
+        self._last_time = now
+        self._last_received = self.received
+        return rate
+
+    def report(self):
+        return (f"{self.packet_rate():.0f} packets/s, received: {self.received}, dropped: {self.dropped}, "
+                f"latency checks: {self.latency_checks}, wakeups: {self.wakeups}")
 
 # Server
-def server_networking_thread(sock, buffer_size, network_queue, players, DEBUG=False):
+def server_networking_thread(sock, latency_sock, buffer_size, registry, join_queue, stats, DEBUG=False):
+    """Event-driven networking for the game and latency ports, sleeps until a packet arrives.
+
+    Join requests are queued for the main loop, the newest input of each player overwrites
+    that player's mailbox in its room or is forwarded to the worker process running the room.
+    """
     print("Starting networking thread...")
+    sock.setblocking(False)
+    latency_sock.setblocking(False)
+    selector = selectors.DefaultSelector()
+    selector.register(sock, selectors.EVENT_READ, "game")
+    selector.register(latency_sock, selectors.EVENT_READ, "latency")
     while True:
-        try:
-            # Receive data from players
-            data, addr = sock.recvfrom(buffer_size)
-            
-            # Check if the player is already registered
-            if addr not in players.values():
-                continue
-            
-            # Add received data to the queue
-            network_queue.put((data, addr))
-        except socket.error:
-            pass
+        for key, _ in selector.select():
+            stats.wakeups += 1
+            # Drain everything that is queued on the socket before sleeping again
+            while True:
+                try:
+                    data, addr = key.fileobj.recvfrom(buffer_size)
+                except BlockingIOError:
+                    break
+                except socket.error as e:
+                    if key.data == "game":
+                        stats.dropped += 1
+                    if DEBUG: print(f"{key.data.capitalize()} socket error: {e}")
+                    break
 
-def server_latency_thread(latency_sock, buffer_size, DEBUG=False):
-    """Thread to handle latency checks."""
-    print("Starting latency thread...")
-    while True:
-        try:
-            # Wait for latency check messages
-            data, addr = latency_sock.recvfrom(buffer_size)
-            if data == b"latency_check":
-                # Respond with latency response
-                latency_sock.sendto(b"latency_response", addr)
-                if DEBUG:
-                    print(f"Latency check received from {addr}, responded with latency_response")
-        except socket.error as e:
-            if DEBUG:
-                print(f"Latency socket error: {e}")
+                msg_type = protocol.message_type(data)
+                if key.data == "latency":
+                    if msg_type == protocol.MSG_LATENCY_CHECK:
+                        # Respond with latency response
+                        try:
+                            latency_sock.sendto(protocol.pack(protocol.CONTROL, protocol.MSG_LATENCY_RESPONSE, protocol.sequence(data)), addr)
+                        except socket.error as e:
+                            if DEBUG: print(f"Latency socket error: {e}")
+                            continue
+                        stats.latency_checks += 1
+                        if DEBUG:
+                            print(f"Latency check received from {addr}, responded with latency_response")
+                    continue
+
+                if msg_type == protocol.MSG_HELLO:
+                    join_queue.put(addr)
+                    continue
+
+                # Drop anything that is not a well-formed input from a registered player
+                player = registry.lookup(addr)
+                if msg_type != protocol.MSG_INPUT or len(data) != protocol.INPUT.size or player is None:
+                    stats.dropped += 1
+                    continue
+
+                room, player_number = player
+                if room.inbox is not None: # the room runs in a worker process, forward the input there
+                    room.inbox.put((ROUTE_INPUT, room.room_id, player_number, data))
+                else:
+                    # Inputs older than the stored one are rejected and counted by the mailbox
+                    room.mailboxes[player_number].put(data, seq=protocol.sequence(data))
+                stats.received += 1
 
 
 # Client
-def client_networking_rec_thread(sock, buffer_size, network_queue, DEBUG=False):
+def client_networking_rec_thread(sock, buffer_size, state_decoder, state_mailbox, control_queue, snapshot_buffer=None, DEBUG=False, contact_mailbox=None):
+    """Decodes every state snapshot but keeps only the newest, control messages are queued so none are lost.
+
+    If a snapshot_buffer is given, every decoded snapshot is also pushed to it for interpolation.
+    Contact models go to contact_mailbox, newest only, and are dropped without one.
+    """
     if DEBUG: print("Starting networking thread...")
     while True:
         try:
             data, addr = sock.recvfrom(buffer_size)
-            network_queue.put((data, addr))  # Add received data to the queue
         except socket.error:
-            pass
+            continue
+        msg_type = protocol.message_type(data)
+        if msg_type in (protocol.MSG_STATE, protocol.MSG_KEYFRAME, protocol.MSG_DELTA):
+            # Every snapshot is decoded here since deltas need their baselines
+            decoded = state_decoder.decode(data)
+            if decoded is not None:
+                state_mailbox.put(decoded[1], seq=decoded[0]) # out of order snapshots are rejected
+                if snapshot_buffer is not None:
+                    snapshot_buffer.push(decoded[0], decoded[1])
+        elif msg_type == protocol.MSG_CONTACT:
+            if contact_mailbox is not None:
+                contact = protocol.unpack(protocol.CONTACT, data)
+                if contact is not None:
+                    contact_mailbox.put(contact[1:], seq=contact[0])
+        elif msg_type is not None:
+            control_queue.put((msg_type, data))
 
 def client_latency_thread(sock, buffer_size, server_ip, latency_port, latency_queue, interval=0.5, DEBUG=False):
     """Thread to measure latency periodically."""
     if DEBUG: print(f"Starting latency thread with {interval} s interval...")
+    seq = 0
     while True:
         start_time = time.time()
+        seq += 1
         try:
             # Send a latency check message
-            sock.sendto(b"latency_check", (server_ip, latency_port))
+            sock.sendto(protocol.pack(protocol.CONTROL, protocol.MSG_LATENCY_CHECK, seq), (server_ip, latency_port))
             
             # Wait for the server's response
             data, addr = sock.recvfrom(buffer_size)
-            if data == b"latency_response":
+            if protocol.message_type(data) == protocol.MSG_LATENCY_RESPONSE and protocol.sequence(data) == seq:
                 latency = (time.time() - start_time) * 1000  # Convert to milliseconds
                 latency_queue.put(latency)  # Store latency in the queue
                 if DEBUG: print(f"Latency: {latency:.2f} ms")
@@ -0,0 +1,213 @@
+import math
+import struct
+import threading
+import time
+from utils.HaplyHAPI import Pantograph
+
+# Message types of Board.transmit
+RESET = 0
+SET_PARAMETERS = 1
+WRITE_TORQUES = 2
+
+def circle_trajectory(center=(0.0, 0.08), radius=0.03, period=4.0):
+    """Hand moving around a circle of the workspace, position (m) at time t (s)."""
+    def trajectory(t):
+        angle = 2 * math.pi * t / period
+        return center[0] + radius * math.cos(angle), center[1] + radius * math.sin(angle)
+    return trajectory
+
+def sweep_trajectory(center=(0.0, 0.08), amplitude=0.04, period=3.0):
+    """Hand moving left and right through the middle of the workspace."""
+    def trajectory(t):
+        return center[0] + amplitude * math.sin(2 * math.pi * t / period), center[1]
+    return trajectory
+
+def hold_trajectory(position=(0.0, 0.08)):
+    """Hand held still, only the device forces move the end effector."""
+    def trajectory(t):
+        return position
+    return trajectory
+
+TRAJECTORIES = {"circle": circle_trajectory, "sweep": sweep_trajectory, "hold": hold_trajectory}
+
+
+class VirtualHaply:
+    """Software Haply board behind a serial-like object, for running the haptic path without the hardware.
+
+    It speaks the byte protocol of Board.transmit and receive: parameter messages configure the
+    reply size, and each torque message is answered with the encoder angles. The end effector is
+    a point mass held by a spring-damper hand that follows a scripted trajectory, and pushed by
+    the force that the received torques produce through the pantograph Jacobian. The dynamics
+    run on wall-clock time, so the host loop sees a device moving at the rate it polls it.
+    Board and Physics accept it in place of a port name (Physics(port=VirtualHaply())).
+    Every received force is kept with its arrival time when record is True, to measure latencies.
+    """
+    def __init__(self, trajectory=None, hardware_version=2, encoder_ports=(2, 1), actuator_ports=(2, 1),
+                 mass=0.1, hand_stiffness=200.0, hand_damping=8.0, substep=0.0005, record=False):
+        self.trajectory = trajectory if trajectory is not None else hold_trajectory()
+        self.pantograph = Pantograph(hardware_version)
+        self.l1, self.l2 = 0.07, 0.09
+        self.d = 0.038 if hardware_version == 3 else 0.0
+        self.encoder_ports = encoder_ports # port of encoder 1 and 2 (angles th1 and th2)
+        self.actuator_ports = actuator_ports # port of actuator 1 and 2
+        self.mass = mass # kg, effective mass of the end effector and hand
+        self.hand_stiffness = hand_stiffness # N/m
+        self.hand_damping = hand_damping # Ns/m
+        self.substep = substep # s, integration step
+        self.record = record
+        self.timeout = None # serial.Serial read timeout, set by the Board reader
+        self.device_id = 0
+        self.sensors = 0 # analog sensors sent before the encoder angles
+        self.pwms = 0 # pwm bytes in front of the torques
+        self.configured = False
+        self.encoder_parameters = [] # offset and resolution of each encoder, as sent by the host
+        self.start = time.perf_counter()
+        self.last = self.start # time the dynamics were advanced to
+        self.position = list(self.trajectory(0.0))
+        self.velocity = [0.0, 0.0]
+        self.force = (0.0, 0.0) # device force of the newest torques (N)
+        self.forces = [] # (arrival time, fx, fy) of every torque message while recording
+        self.torque_messages = 0
+        self.replies = 0
+        self.output = bytearray()
+        self.lock = threading.Condition()
+
+    # Serial interface used by Board
+    def write(self, data):
+        data = bytes(data) # one message per write, as Board.transmit sends them
+        if data[0] == RESET:
+            self.configured = False
+        elif data[0] == SET_PARAMETERS:
+            self._set_parameters(data)
+        elif data[0] == WRITE_TORQUES:
+            self._write_torques(data)
+        return len(data)
+
+    @property
+    def in_waiting(self):
+        return len(self.output)
+
+    def readinto(self, b):
+        """Wait up to timeout for a reply and copy the available bytes, returns how many."""
+        with self.lock:
+            if not self.output and not self.lock.wait_for(lambda: self.output, self.timeout):
+                return 0
+            n = min(len(b), len(self.output))
+            b[:n] = self.output[:n]
+            del self.output[:n]
+            return n
+
+    def read(self, size=1):
+        data = bytearray(size)
+        n = 0
+        while n < size:
+            read = self.readinto(memoryview(data)[n:])
+            if not read:
+                break
+            n += read
+        return bytes(data[:n])
+
+    def reset_input_buffer(self):
+        with self.lock:
+            self.output.clear()
+
+    def close(self):
+        pass
+
+    # Protocol
+    def _set_parameters(self, data):
+        self.device_id = data[1]
+        k = 2
+        actuators = bin(data[k]).count("1")
+        k += 1 + actuators
+        encoders = bin(data[k]).count("1")
+        k += 1 + encoders
+        self.sensors = data[k]
+        k += 1 + self.sensors
+        self.pwms = data[k]
+        k += 1 + self.pwms
+        self.encoder_parameters = list(struct.unpack_from('<%df' % (2 * encoders), data, k))
+        self.configured = True
+
+    def _write_torques(self, data):
+        now = time.perf_counter()
+        self.device_id = data[1]
+        n = (len(data) - 2 - self.pwms) // 4
+        by_port = struct.unpack_from('<%df' % n, data, 2 + self.pwms)
+        ports = sorted(self.actuator_ports)
+        torques = [by_port[ports.index(port)] for port in self.actuator_ports]
+        self.advance(now)
+        angles = self.angles()
+        self.force = self.torque_to_force(angles, torques)
+        self.torque_messages += 1
+        if self.record:
+            self.forces.append((now, self.force[0], self.force[1]))
+        # Reply: sensor values, then the angles of the encoders in port order
+        ports = sorted(self.encoder_ports)
+        values = [0.0] * self.sensors + [angles[self.encoder_ports.index(port)] for port in ports]
+        with self.lock:
+            self.output += struct.pack('<B%df' % len(values), self.device_id, *values)
+            self.replies += 1
+            self.lock.notify_all()
+
+    # Device model
+    def advance(self, now):
+        """Integrate the end effector up to now (s, perf_counter), at most 0.1 s at once."""
+        elapsed = min(now - self.last, 0.1)
+        steps = max(1, int(math.ceil(elapsed / self.substep)))
+        dt = elapsed / steps
+        x, v = self.position, self.velocity
+        t = self.last - self.start
+        for _ in range(steps):
+            t += dt
+            hand = self.trajectory(t)
+            for i in (0, 1):
+                a = (self.hand_stiffness * (hand[i] - x[i]) - self.hand_damping * v[i] + self.force[i]) / self.mass
+                v[i] += a * dt
+                x[i] += v[i] * dt
+        self.position = self.reachable(x)
+        self.last = now
+
+    def reachable(self, p):
+        """Closest point to p reachable by both arms and not too close to the base."""
+        margin = 0.0005
+        reach = self.l1 + self.l2 - margin
+        lowest = self.l2 - self.l1 + margin
+        x, y = p[0], max(p[1], lowest)
+        base = 0.0 if math.hypot(x, y) >= math.hypot(x - self.d, y) else self.d # the farther motor limits the reach
+        dx = x - base
+        distance = math.hypot(dx, y)
+        if distance > reach:
+            x, y = base + dx * reach / distance, y * reach / distance
+            if y < lowest: # onto the reach at the lowest height
+                x, y = base + math.copysign(math.sqrt(reach**2 - lowest**2), dx), lowest
+            if math.hypot(x - (self.d - base), y) > reach: # past the other reach too, where both meet
+                x, y = self.d / 2, math.sqrt(reach**2 - (self.d / 2)**2)
+        return [x, y]
+
+    def angles(self):
+        """Motor angles (deg) of the current end effector position, elbows outwards."""
+        x, y = self.position
+        dA = math.hypot(x, y)
+        dB = math.hypot(x - self.d, y)
+        cA = math.acos(max(-1.0, min(1.0, (self.l1**2 + dA**2 - self.l2**2) / (2 * self.l1 * dA))))
+        cB = math.acos(max(-1.0, min(1.0, (self.l1**2 + dB**2 - self.l2**2) / (2 * self.l1 * dB))))
+        return [math.degrees(math.atan2(y, x) + cA), math.degrees(math.atan2(y, x - self.d) - cB)]
+
+    def torque_to_force(self, angles, torques):
+        """Endpoint force (N) of motor torques, inverting the Jacobian the host used to compute them."""
+        pantograph = self.pantograph
+        pantograph.forwardKinematics(angles)
+        pantograph.torqueCalculation([1.0, 0.0])
+        j11, j21 = pantograph.get_torque()
+        pantograph.torqueCalculation([0.0, 1.0])
+        j12, j22 = pantograph.get_torque()
+        det = j11 * j22 - j12 * j21
+        if abs(det) < 1e-12: # singular configuration, the torques give no endpoint force
+            return (0.0, 0.0)
+        return ((j22 * torques[0] - j12 * torques[1]) / det, (j11 * torques[1] - j21 * torques[0]) / det)
+
+    def report(self):
+        return (f"Virtual Haply: {self.torque_messages} torque messages, {self.replies} replies, "
+                f"position ({self.position[0]:.4f}, {self.position[1]:.4f}) m, force ({self.force[0]:.2f}, {self.force[1]:.2f}) N")
+